@@ -1,6 +1,6 @@
 "use client"
 
-import { useState } from "react"
+import { useEffect, useState } from "react"
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from "@/components/ui/card"
 import { Button } from "@/components/ui/button"
 import { 
@@ -15,6 +15,7 @@ import {
 } from "lucide-react"
 import Link from "next/link"
 import { formatDate, formatRelativeTime, getStatusColor } from "@/lib/utils"
+import { perksApi, handleApiError, ScraperStatus } from "@/lib/api"
 
 // Mock data - replace with actual API calls
 const perksData = [
@@ -82,14 +83,28 @@ export default function PerksPage() {
     return matchesSearch && matchesStatus && matchesCategory
   })
 
+  const [scraperStatus, setScraperStatus] = useState<ScraperStatus | null>(null)
+
+  // Live scraper progress pushed by the API (one event per perk state change, no polling)
+  useEffect(() => {
+    const unsubscribe = perksApi.subscribeScraperStatus(setScraperStatus)
+    return unsubscribe
+  }, [])
+
   const handleRunScraper = async () => {
-    // This would trigger the Python API endpoint
-    console.log("Running scraper for all perks...")
+    try {
+      setScraperStatus(await perksApi.runScraper())
+    } catch (error) {
+      console.error(handleApiError(error))
+    }
   }
 
   const handleRefreshPerk = async (perkId: number) => {
-    // This would trigger the Python API endpoint for a specific perk
-    console.log(`Refreshing perk ${perkId}...`)
+    try {
+      setScraperStatus(await perksApi.scrapePerk(perkId))
+    } catch (error) {
+      console.error(handleApiError(error))
+    }
   }
 
   return (
@@ -101,6 +116,14 @@ export default function PerksPage() {
             <p className="mt-2 text-gray-600">
               Manage and monitor startup perks and benefits
             </p>
+            {scraperStatus?.state === "running" && (
+              <p className="mt-1 text-sm text-gray-500">
+                Scraping {scraperStatus.completed + scraperStatus.failed}/{scraperStatus.total} perks
+                {scraperStatus.failed > 0 && ` (${scraperStatus.failed} failed)`}
+                {` · ${scraperStatus.throughput_per_minute.toFixed(1)}/min`}
+                {scraperStatus.eta_seconds !== null && ` · ETA ${Math.ceil(scraperStatus.eta_seconds / 60)} min`}
+              </p>
+            )}
           </div>
           <div className="flex space-x-3">
             <Button onClick={handleRunScraper} variant="outline">
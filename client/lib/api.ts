@@ -29,13 +29,27 @@ async function apiCall(endpoint: string, options: RequestInit = {}) {
 
 // Perks API functions
 export const perksApi = {
-  // Get all perks
-  getPerks: async () => {
-    return apiCall('/api/perks')
+  // Get a page of perks (served from the API's local Airtable mirror)
+  getPerks: async (options?: {
+    cursor?: string
+    limit?: number
+    fields?: string[]
+    status?: string
+    category?: string
+  }) => {
+    const params = new URLSearchParams()
+    if (options?.cursor) params.append('cursor', options.cursor)
+    if (options?.limit) params.append('limit', options.limit.toString())
+    if (options?.fields?.length) params.append('fields', options.fields.join(','))
+    if (options?.status) params.append('status', options.status)
+    if (options?.category) params.append('category', options.category)
+
+    const queryString = params.toString()
+    return apiCall(`/api/perks${queryString ? `?${queryString}` : ''}`)
   },
 
   // Get single perk by ID
-  getPerk: async (id: number) => {
+  getPerk: async (id: number | string) => {
     return apiCall(`/api/perks/${id}`)
   },
 
@@ -75,15 +89,28 @@ export const perksApi = {
   },
 
   // Run scraper for specific perk
-  scrapePerk: async (id: number) => {
+  scrapePerk: async (id: number | string) => {
     return apiCall(`/api/perks/${id}/scrape`, {
       method: 'POST'
     })
   },
 
   // Get scraper status
-  getScraperStatus: async () => {
+  getScraperStatus: async (): Promise<ScraperStatus> => {
     return apiCall('/api/perks/scraper-status')
+  },
+
+  // Follow scraper progress live (Server-Sent Events) instead of polling getScraperStatus.
+  // Returns a function that closes the stream.
+  subscribeScraperStatus: (onStatus: (status: ScraperStatus) => void, onError?: (event: Event) => void) => {
+    const source = new EventSource(`${API_BASE_URL}/api/perks/scraper-status/stream`)
+    source.addEventListener('progress', (event) => {
+      onStatus(JSON.parse((event as MessageEvent).data))
+    })
+    if (onError) {
+      source.onerror = onError
+    }
+    return () => source.close()
   }
 }
 
@@ -222,6 +249,22 @@ export interface Perk {
   availability: string
 }
 
+export interface ScraperStatus {
+  run_id: string | null
+  state: 'idle' | 'running' | 'finished'
+  total: number
+  queued: number
+  running: number
+  completed: number
+  failed: number
+  started_at: number | null
+  finished_at: number | null
+  throughput_per_minute: number
+  eta_seconds: number | null
+  last_record_id: string | null
+  last_record_status: string | null
+}
+
 export interface Application {
   id: number
   teamName: string
@@ -0,0 +1,53 @@
+# Deterministic completeness score over the PerkDetails gathered during a crawl
+
+import os
+from typing import Dict, List, Optional, Tuple
+
+from .models import PerkDetails
+
+# Weight of each PerkDetails field in the score; required fields must all be filled to stop crawling
+FIELD_WEIGHTS: Dict[str, float] = {
+    "name": 0.1,
+    "description": 0.25,
+    "funding_or_credits": 0.25,
+    "eligibility_criteria": 0.2,
+    "duration": 0.1,
+    "application_deadline": 0.1,
+}
+REQUIRED_FIELDS = [field.strip() for field in os.getenv(
+    "COMPLETENESS_REQUIRED_FIELDS", "name,description,funding_or_credits,eligibility_criteria"
+).split(",") if field.strip()]
+COMPLETENESS_THRESHOLD = float(os.getenv("COMPLETENESS_THRESHOLD", "0.7")) # Minimum weighted score to stop early
+MIN_TEXT_LENGTH = 15 # Shorter answers (except the name) are not considered confident
+
+PLACEHOLDERS = {"", "not found", "n/a", "na", "none", "unknown", "not specified", "not available", "not mentioned"}
+
+
+def field_filled(field: str, value: Optional[str]) -> bool:
+    if value is None:
+        return False
+    text = str(value).strip()
+    if text.lower().rstrip(".") in PLACEHOLDERS:
+        return False
+    return field == "name" or len(text) >= MIN_TEXT_LENGTH
+
+
+def score_details(details: List[PerkDetails]) -> Tuple[float, List[str]]:
+    """
+    Scores the union of all gathered details: a field counts once any page filled it confidently.
+
+    Returns:
+        (weighted score between 0 and 1, required fields still missing)
+    """
+    filled = {
+        field for field in FIELD_WEIGHTS
+        if any(field_filled(field, getattr(perk, field)) for perk in details)
+    }
+    score = round(sum(weight for field, weight in FIELD_WEIGHTS.items() if field in filled), 2)
+    missing = [field for field in REQUIRED_FIELDS if field not in filled]
+    return score, missing
+
+
+def is_complete(details: List[PerkDetails]) -> bool:
+    score, missing = score_details(details)
+    return not missing and score >= COMPLETENESS_THRESHOLD
@@ -0,0 +1,185 @@
+# In-process job queue for long-running perk updates
+
+import os
+import time
+import uuid
+import asyncio
+import sqlite3
+import threading
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from .models import JobInfo, AggregatedPerkInfo
+
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "3"))
+JOB_BACKEND = os.getenv("JOB_BACKEND", "sqlite") # "sqlite" (persistent) or "memory"
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(os.path.dirname(__file__), '..', 'jobs.db'))
+
+
+# --- Backends ---
+
+class MemoryJobBackend:
+    """Keeps jobs in a dict; everything is lost when the process stops."""
+
+    def __init__(self):
+        self._jobs: Dict[str, JobInfo] = {}
+
+    def save(self, job: JobInfo):
+        self._jobs[job.job_id] = job
+
+    def get(self, job_id: str) -> Optional[JobInfo]:
+        return self._jobs.get(job_id)
+
+    def list(self, status: Optional[str] = None, limit: int = 100) -> List[JobInfo]:
+        jobs = [job for job in self._jobs.values() if status is None or job.status == status]
+        return sorted(jobs, key=lambda job: job.created_at, reverse=True)[:limit]
+
+
+class SQLiteJobBackend:
+    """Stores jobs as JSON rows in a local SQLite file so queued work survives restarts."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_lock = threading.Lock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Opened on first use, so importing the API (tests, tooling) creates no database file."""
+        with self._conn_lock:
+            if self._conn is None:
+                self._conn = self._connect()
+            return self._conn
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " job_id TEXT PRIMARY KEY, status TEXT NOT NULL, created_at REAL NOT NULL, data TEXT NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+        conn.commit()
+        return conn
+
+    def save(self, job: JobInfo):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO jobs (job_id, status, created_at, data) VALUES (?, ?, ?, ?)",
+            (job.job_id, job.status, job.created_at, job.model_dump_json())
+        )
+        self.conn.commit()
+
+    def get(self, job_id: str) -> Optional[JobInfo]:
+        row = self.conn.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return JobInfo.model_validate_json(row[0]) if row else None
+
+    def list(self, status: Optional[str] = None, limit: int = 100) -> List[JobInfo]:
+        if status:
+            rows = self.conn.execute(
+                "SELECT data FROM jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?", (status, limit)
+            )
+        else:
+            rows = self.conn.execute("SELECT data FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,))
+        return [JobInfo.model_validate_json(row[0]) for row in rows]
+
+
+def make_backend(kind: str = JOB_BACKEND):
+    if kind == "memory":
+        return MemoryJobBackend()
+    return SQLiteJobBackend(JOB_DB_PATH)
+
+
+# --- Queue ---
+
+class JobQueue:
+    """
+    asyncio queue with a fixed number of workers.
+    Jobs are persisted through the backend on every state change; jobs left queued or running
+    by a previous process are re-queued when the queue starts.
+    """
+
+    def __init__(self, handler: Callable[[str], Awaitable[AggregatedPerkInfo]], backend=None, concurrency: int = JOB_CONCURRENCY):
+        self.handler = handler
+        self.backend = backend or MemoryJobBackend()
+        self.concurrency = max(1, concurrency)
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue()
+        self._workers: List[asyncio.Task] = []
+        self._done_events: Dict[str, asyncio.Event] = {}
+        self._listeners: List[Callable[[JobInfo], None]] = []
+
+    def add_listener(self, listener: Callable[[JobInfo], None]):
+        """Registers a callback invoked on every job state change."""
+        self._listeners.append(listener)
+
+    def _save(self, job: JobInfo):
+        self.backend.save(job)
+        for listener in self._listeners:
+            listener(job)
+
+    async def start(self):
+        for job in self.backend.list(status='running', limit=10_000) + self.backend.list(status='queued', limit=10_000):
+            print(f"Re-queueing job {job.job_id} for record {job.record_id} left over from a previous run")
+            job.status = 'queued'
+            job.started_at = None
+            self._save(job)
+            self._done_events[job.job_id] = asyncio.Event()
+            self._queue.put_nowait(job.job_id)
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.concurrency)]
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(self, record_id: str) -> JobInfo:
+        job = JobInfo(job_id=uuid.uuid4().hex, record_id=record_id, status='queued', created_at=time.time())
+        self._save(job)
+        self._done_events[job.job_id] = asyncio.Event()
+        self._queue.put_nowait(job.job_id)
+        return job
+
+    def submit_many(self, record_ids: List[str]) -> List[JobInfo]:
+        return [self.submit(record_id) for record_id in record_ids]
+
+    def get(self, job_id: str) -> Optional[JobInfo]:
+        return self.backend.get(job_id)
+
+    def list(self, status: Optional[str] = None, limit: int = 100) -> List[JobInfo]:
+        return self.backend.list(status=status, limit=limit)
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    async def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[JobInfo]:
+        """Waits until the job has finished (or the timeout expires) and returns its latest state."""
+        event = self._done_events.get(job_id)
+        if event:
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.get(job_id)
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = self.backend.get(job_id)
+                if not job:
+                    continue
+                job.status = 'running'
+                job.started_at = time.time()
+                self._save(job)
+                try:
+                    job.result = await self.handler(job.record_id)
+                    job.status = 'completed'
+                except Exception as e:
+                    print(f"Job {job_id} (record {job.record_id}) failed on worker {worker_id}: {e}")
+                    job.status = 'failed'
+                    job.error = str(e)
+                job.finished_at = time.time()
+                self._save(job)
+            finally:
+                event = self._done_events.pop(job_id, None)
+                if event:
+                    event.set()
+                self._queue.task_done()
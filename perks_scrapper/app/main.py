@@ -1,14 +1,42 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
-import uvicorn
+from fastapi import FastAPI, HTTPException, Request, Query, Response
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 import os
 
-from .models import PerkUpdateRequest, AggregatedPerkInfo
-from .services import process_perk_update, OPENAI_API_KEY, FIRECRAWL_API_KEY, EXA_API_KEY, AIRTABLE_API_KEY
+from contextlib import asynccontextmanager
+from typing import Dict, List, Literal, Optional
+
+from .models import PerkUpdateRequest, BulkPerkUpdateRequest, BulkJobResponse, JobInfo, AggregatedPerkInfo, UsageSummary, ScraperStatus, PerkListResponse, MirroredPerk
+from .services import process_perk_update, list_airtable_record_ids, list_airtable_records, OPENAI_API_KEY, FIRECRAWL_API_KEY, EXA_API_KEY, AIRTABLE_API_KEY
+from .usage import usage_ledger
+from .jobs import JobQueue, make_backend
+from .runs import RunManager
+from .mirror import perks_mirror
+
+# Background workers run process_perk_update; queued jobs survive restarts with the sqlite backend
+job_queue = JobQueue(process_perk_update, backend=make_backend())
+# Groups dashboard-triggered jobs into runs and streams their progress
+run_manager = RunManager(job_queue)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await job_queue.start()
+    yield
+    await job_queue.stop()
 
 app = FastAPI(
     title="Perks Scraper Agent",
     description="An AI agent to scrape, analyze, and update startup perk information in Airtable.",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
+)
+
+# The Next.js dashboard calls the API (and opens the progress stream) from the browser
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=os.getenv("CORS_ORIGINS", "http://localhost:3000").split(","),
+    allow_methods=["*"],
+    allow_headers=["*"],
 )
 
 # Simple check for essential API keys on startup
@@ -18,34 +46,149 @@ if not all([OPENAI_API_KEY, FIRECRAWL_API_KEY, EXA_API_KEY, AIRTABLE_API_KEY]):
     # raise RuntimeError("API Keys missing, cannot start application.")
 
 @app.post("/update-perk", response_model=AggregatedPerkInfo)
-async def update_perk_endpoint(request: PerkUpdateRequest, background_tasks: BackgroundTasks):
+async def update_perk_endpoint(request: PerkUpdateRequest):
     """
     Endpoint to trigger the perk update process for a given Airtable record ID.
-    This endpoint immediately returns a confirmation and runs the actual process
-    in the background to avoid timeouts for long-running scraping/analysis tasks.
-    (Note: For simplicity, it currently runs synchronously. Refactor needed for true background.)
+    The update runs on the background job queue and this endpoint waits for its result.
+    For long crawls or many records, submit to POST /jobs and poll GET /jobs/{job_id} instead.
     """
     print(f"Received request to update perk for Airtable record: {request.airtable_record_id}")
 
-    # --- Synchronous Execution (for simplicity in this example) ---
-    # For a real application, especially with multiple requests, use BackgroundTasks:
-    # background_tasks.add_task(process_perk_update, request.airtable_record_id)
-    # return {"message": "Perk update process started in background.", "record_id": request.airtable_record_id}
-    # However, BackgroundTasks doesn't easily allow returning the final result.
-    # Proper async handling might involve task queues (Celery, RQ) or WebSocket updates.
-
-    try:
-        result = await process_perk_update(request.airtable_record_id)
-        return result
-    except Exception as e:
-        # Catch unexpected errors during processing
-        print(f"Unhandled exception during perk update for {request.airtable_record_id}: {e}")
-        # Log the full traceback here in a real application
-        raise HTTPException(status_code=500, detail=f"Internal server error processing record {request.airtable_record_id}")
+    job = job_queue.submit(request.airtable_record_id)
+    job = await job_queue.wait(job.job_id)
+
+    if job.status == 'completed' and job.result:
+        return job.result
+    # Catch unexpected errors during processing
+    print(f"Unhandled exception during perk update for {request.airtable_record_id}: {job.error}")
+    raise HTTPException(status_code=500, detail=f"Internal server error processing record {request.airtable_record_id}")
+
+@app.post("/jobs", response_model=BulkJobResponse, status_code=202)
+async def submit_jobs_endpoint(request: BulkPerkUpdateRequest):
+    """
+    Queues one perk update job per Airtable record ID and returns immediately with the job IDs.
+    At most JOB_CONCURRENCY jobs run at the same time.
+    """
+    jobs = job_queue.submit_many(request.airtable_record_ids)
+    print(f"Queued {len(jobs)} perk update jobs ({job_queue.pending()} pending)")
+    return BulkJobResponse(jobs=jobs)
+
+@app.get("/jobs", response_model=List[JobInfo])
+async def list_jobs_endpoint(status: Optional[Literal['queued', 'running', 'completed', 'failed']] = None, limit: int = 100):
+    """Lists the most recent jobs, optionally filtered by status."""
+    return job_queue.list(status=status, limit=limit)
+
+@app.get("/jobs/{job_id}", response_model=JobInfo)
+async def get_job_endpoint(job_id: str):
+    """Returns the status of a job, and its result once completed."""
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+# --- Dashboard scraper endpoints (client/lib/api.ts) ---
+
+@app.post("/api/perks/scrape", response_model=ScraperStatus, status_code=202)
+async def run_scraper_endpoint():
+    """Queues every record of the Airtable table as one scraper run."""
+    record_ids = await list_airtable_record_ids()
+    if not record_ids:
+        raise HTTPException(status_code=502, detail="Could not list Airtable records")
+    print(f"Starting scraper run for {len(record_ids)} perks")
+    return run_manager.submit(record_ids)
+
+@app.get("/api/perks/scraper-status", response_model=ScraperStatus)
+async def scraper_status_endpoint():
+    """Snapshot of the current (or last) scraper run."""
+    return run_manager.status()
+
+@app.get("/api/perks/scraper-status/stream")
+async def scraper_status_stream_endpoint(request: Request):
+    """
+    Server-Sent Events stream of ScraperStatus snapshots: one on connect, one per perk state change,
+    and a comment line every 15 seconds to keep idle connections open.
+    """
+    async def event_stream():
+        async for status in run_manager.subscribe():
+            if await request.is_disconnected():
+                break
+            if status is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"event: progress\ndata: {status.model_dump_json()}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# --- Dashboard read API, served from the local Airtable mirror ---
+
+def _parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    return [name.strip() for name in fields.split(",") if name.strip()] if fields else None
+
+@app.get("/api/perks", response_model=PerkListResponse)
+async def list_perks_endpoint(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    fields: Optional[str] = Query(None, description="Comma-separated field names to return."),
+    status: Optional[str] = None,
+    category: Optional[str] = None
+):
+    """
+    Paginated perks list. Served from the local mirror (no Airtable call per request);
+    answers 304 when the client's If-None-Match still matches.
+    """
+    await perks_mirror.ensure_fresh(list_airtable_records)
+    etag = perks_mirror.etag("list", cursor, limit, fields, status, category)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    items, next_cursor = perks_mirror.list(cursor=cursor, limit=limit, fields=_parse_fields(fields), status=status, category=category)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, max-age=0, must-revalidate"
+    return PerkListResponse(items=items, next_cursor=next_cursor, total=perks_mirror.count(status=status, category=category))
+
+@app.post("/api/perks/mirror/refresh", status_code=202)
+async def refresh_mirror_endpoint():
+    """Marks the mirror stale (e.g. after a batch run of perks_updater.py wrote to Airtable); the next read re-syncs it."""
+    perks_mirror.invalidate()
+    return {"message": "Mirror invalidated."}
+
+@app.post("/api/perks/{record_id}/scrape", response_model=ScraperStatus, status_code=202)
+async def scrape_perk_endpoint(record_id: str):
+    """Queues a single record; it joins the active run if there is one."""
+    return run_manager.submit([record_id])
+
+@app.get("/api/perks/{record_id}", response_model=MirroredPerk)
+async def get_perk_endpoint(record_id: str, request: Request, response: Response, fields: Optional[str] = None):
+    """Single perk from the local mirror, with ETag support."""
+    await perks_mirror.ensure_fresh(list_airtable_records)
+    etag = perks_mirror.etag("get", record_id, fields)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    perk = perks_mirror.get(record_id, fields=_parse_fields(fields))
+    if not perk:
+        raise HTTPException(status_code=404, detail=f"Perk {record_id} not found")
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, max-age=0, must-revalidate"
+    return perk
+
+@app.get("/usage", response_model=Dict[str, UsageSummary])
+async def usage_endpoint(group_by: Literal['record_id', 'stage', 'model'] = 'record_id'):
+    """
+    Token usage and estimated cost of all LLM calls since the server started,
+    grouped by Airtable record, agent stage or model.
+    """
+    return usage_ledger.group_by(group_by)
 
 @app.get("/")
 async def root():
-    return {"message": "Perks Scraper Agent is running. POST to /update-perk with Airtable record ID."}
+    return {"message": "Perks Scraper Agent is running. POST to /update-perk with Airtable record ID, or POST many IDs to /jobs."}
 
 # Add command to run the app easily if needed (e.g., for local testing)
 # This part is typically handled by uvicorn command line directly
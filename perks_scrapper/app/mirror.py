@@ -0,0 +1,193 @@
+# Local SQLite mirror of the Airtable perks table, used to serve dashboard reads
+
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+MIRROR_DB_PATH = os.getenv("MIRROR_DB_PATH", os.path.join(os.path.dirname(__file__), '..', 'perks_mirror.db'))
+MIRROR_TTL_SECONDS = int(os.getenv("MIRROR_TTL_SECONDS", "900")) # Background re-sync after this age
+AIRTABLE_STATUS_FIELD = os.getenv("AIRTABLE_STATUS_FIELD", "Status")
+AIRTABLE_CATEGORY_FIELD = os.getenv("AIRTABLE_CATEGORY_FIELD", "Category")
+
+
+class PerksMirror:
+    """
+    Keeps a full copy of the perks table. Reads never touch Airtable: the mirror is filled by
+    a full sync (on first use, then in the background once older than MIRROR_TTL_SECONDS) and
+    patched in place whenever this service writes a record.
+    """
+
+    def __init__(self, path: str = MIRROR_DB_PATH):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_lock = threading.Lock()
+        self._sync_task: Optional[asyncio.Task] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Opened on first use, so importing the API (tests, tooling) creates no database file."""
+        with self._conn_lock:
+            if self._conn is None:
+                self._conn = self._connect()
+            return self._conn
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS perks (
+                record_id TEXT PRIMARY KEY,
+                created_time TEXT,
+                status TEXT,
+                category TEXT,
+                fields TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_perks_status ON perks (status, record_id);
+            CREATE INDEX IF NOT EXISTS idx_perks_category ON perks (category, record_id);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            """
+        )
+        conn.commit()
+        return conn
+
+    # --- Meta ---
+
+    def _meta(self, key: str, default: str = "0") -> str:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else default
+
+    def _set_meta(self, key: str, value: str):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    @property
+    def version(self) -> int:
+        return int(self._meta("version"))
+
+    @property
+    def last_sync(self) -> float:
+        return float(self._meta("last_sync"))
+
+    def _bump_version(self):
+        self._set_meta("version", str(self.version + 1))
+
+    def etag(self, *parts: Any) -> str:
+        """Weak ETag derived from the mirror version and the query that produced the response."""
+        digest = hashlib.sha1(json.dumps([self.version, *parts], default=str).encode()).hexdigest()[:16]
+        return f'W/"{digest}"'
+
+    # --- Writes ---
+
+    @staticmethod
+    def _row(record: Dict[str, Any]) -> Tuple:
+        fields = record.get('fields', {})
+        return (
+            record['id'],
+            record.get('createdTime'),
+            str(fields.get(AIRTABLE_STATUS_FIELD, "")).lower() or None,
+            fields.get(AIRTABLE_CATEGORY_FIELD),
+            json.dumps(fields),
+        )
+
+    def replace_all(self, records: List[Dict[str, Any]]):
+        """Replaces the mirror contents with a full table snapshot in one transaction."""
+        with self.conn:
+            self.conn.execute("DELETE FROM perks")
+            self.conn.executemany("INSERT INTO perks VALUES (?, ?, ?, ?, ?)", [self._row(r) for r in records])
+            self._set_meta("last_sync", str(time.time()))
+            self._bump_version()
+
+    def apply_update(self, record_id: str, fields: Dict[str, Any]):
+        """Merges fields written to Airtable into the mirrored record and invalidates cached responses."""
+        row = self.conn.execute("SELECT * FROM perks WHERE record_id = ?", (record_id,)).fetchone()
+        if not row:
+            self.invalidate() # Unknown record: let the next read trigger a full re-sync
+            return
+        merged = {**json.loads(row["fields"]), **fields}
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO perks VALUES (?, ?, ?, ?, ?)",
+                self._row({'id': record_id, 'createdTime': row["created_time"], 'fields': merged})
+            )
+            self._bump_version()
+
+    def invalidate(self):
+        """Marks the mirror as stale so the next read schedules a re-sync."""
+        with self.conn:
+            self._set_meta("last_sync", "0")
+            self._bump_version()
+
+    # --- Sync ---
+
+    async def sync(self, fetch_all: Callable[[], Awaitable[Optional[List[Dict[str, Any]]]]]):
+        records = await fetch_all()
+        if records is None:
+            print("Mirror sync failed: could not fetch Airtable records, keeping the current copy.")
+            return
+        self.replace_all(records)
+        print(f"Mirror synced: {len(records)} perks (version {self.version})")
+
+    async def ensure_fresh(self, fetch_all: Callable[[], Awaitable[Optional[List[Dict[str, Any]]]]]):
+        """
+        Syncs synchronously only when the mirror is empty; otherwise a stale mirror keeps
+        serving reads while a single background task refreshes it.
+        """
+        if self.last_sync == 0 and self.count() == 0:
+            await self.sync(fetch_all)
+        elif time.time() - self.last_sync > MIRROR_TTL_SECONDS:
+            if not self._sync_task or self._sync_task.done():
+                self._sync_task = asyncio.create_task(self.sync(fetch_all))
+
+    # --- Reads ---
+
+    def count(self, status: Optional[str] = None, category: Optional[str] = None) -> int:
+        where, params = self._filters(status, category)
+        return self.conn.execute(f"SELECT COUNT(*) FROM perks {where}", params).fetchone()[0]
+
+    @staticmethod
+    def _filters(status: Optional[str], category: Optional[str], after: Optional[str] = None) -> Tuple[str, List]:
+        clauses, params = [], []
+        if status:
+            clauses.append("status = ?")
+            params.append(status.lower())
+        if category:
+            clauses.append("category = ?")
+            params.append(category)
+        if after:
+            clauses.append("record_id > ?")
+            params.append(after)
+        return ("WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    @staticmethod
+    def _project(row: sqlite3.Row, fields: Optional[List[str]]) -> Dict[str, Any]:
+        record_fields = json.loads(row["fields"])
+        if fields:
+            record_fields = {name: record_fields[name] for name in fields if name in record_fields}
+        return {"id": row["record_id"], "created_time": row["created_time"], "fields": record_fields}
+
+    def list(self, cursor: Optional[str] = None, limit: int = 50, fields: Optional[List[str]] = None,
+             status: Optional[str] = None, category: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Keyset pagination ordered by record ID: `cursor` is the last ID of the previous page.
+
+        Returns:
+            (records, next_cursor) - next_cursor is None on the last page
+        """
+        where, params = self._filters(status, category, after=cursor)
+        rows = self.conn.execute(
+            f"SELECT * FROM perks {where} ORDER BY record_id LIMIT ?", [*params, limit + 1]
+        ).fetchall()
+        next_cursor = rows[limit - 1]["record_id"] if len(rows) > limit else None
+        return [self._project(row, fields) for row in rows[:limit]], next_cursor
+
+    def get(self, record_id: str, fields: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute("SELECT * FROM perks WHERE record_id = ?", (record_id,)).fetchone()
+        return self._project(row, fields) if row else None
+
+
+perks_mirror = PerksMirror()
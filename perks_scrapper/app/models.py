@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, HttpUrl
-from typing import List, Optional, Literal
+from typing import Any, Dict, List, Optional, Literal
 
 class PerkDetails(BaseModel):
     """Structured representation of the extracted perk information."""
@@ -18,6 +18,19 @@ class ScrapingDecision(BaseModel):
     search_query: Optional[str] = Field(None, description="Optimized search query for Exa if action is 'search_web'.")
     reasoning: str = Field(..., description="Brief explanation for the chosen action.")
 
+class UsageSummary(BaseModel):
+    """Token usage and estimated cost of the LLM calls behind a result."""
+    calls: int = Field(0, description="Number of LLM calls made.")
+    prompt_tokens: int = Field(0, description="Total prompt (input) tokens.")
+    completion_tokens: int = Field(0, description="Total completion (output) tokens.")
+    latency_seconds: float = Field(0.0, description="Summed wall time of the calls.")
+    estimated_cost_usd: float = Field(0.0, description="Estimated cost based on the model price table.")
+
+class PageAnalysis(BaseModel):
+    """Combined extraction and next-step decision for the pages of one crawl depth."""
+    details: PerkDetails = Field(..., description="Perk details found in the provided content.")
+    decision: ScrapingDecision = Field(..., description="The next action to take after this content.")
+
 class AggregatedPerkInfo(BaseModel):
     """Final aggregated information about the perk."""
     record_id: str
@@ -25,14 +38,63 @@ class AggregatedPerkInfo(BaseModel):
     updated_details: PerkDetails = Field(..., description="The aggregated and most up-to-date perk details found.")
     status: Literal['updated', 'needs_review', 'error'] = Field(..., description="Status of the update process.")
     message: Optional[str] = Field(None, description="Any relevant messages or error details.")
+    usage: Optional[UsageSummary] = Field(None, description="LLM token usage and cost of this update of the record.")
 
 class PerkUpdateRequest(BaseModel):
     """Request model for the API endpoint."""
     airtable_record_id: str = Field(..., description="The ID of the Airtable record to process.")
 
+class BulkPerkUpdateRequest(BaseModel):
+    """Request model for submitting many records to the job queue at once."""
+    airtable_record_ids: List[str] = Field(..., min_length=1, description="The IDs of the Airtable records to process.")
+
+class JobInfo(BaseModel):
+    """State of one background perk update job."""
+    job_id: str = Field(..., description="Unique job identifier, used for status polling.")
+    record_id: str = Field(..., description="The Airtable record processed by this job.")
+    status: Literal['queued', 'running', 'completed', 'failed'] = Field(..., description="Current state of the job.")
+    created_at: float = Field(..., description="Unix timestamp when the job was submitted.")
+    started_at: Optional[float] = Field(None, description="Unix timestamp when a worker picked the job up.")
+    finished_at: Optional[float] = Field(None, description="Unix timestamp when the job completed or failed.")
+    result: Optional[AggregatedPerkInfo] = Field(None, description="Result of the update once completed.")
+    error: Optional[str] = Field(None, description="Error details if the job failed.")
+
+class BulkJobResponse(BaseModel):
+    """Response for a bulk submission."""
+    jobs: List[JobInfo] = Field(default_factory=list, description="One queued job per submitted record ID.")
+
 # Potential model for Airtable interaction (can be expanded)
 class AirtableRecord(BaseModel):
     id: str
     url: HttpUrl
     current_description: Optional[str] = None
-    # Add other fields as needed based on AIRTABLE_*_FIELD env vars 
\ No newline at end of file
+    # Add other fields as needed based on AIRTABLE_*_FIELD env vars 
+
+
+class ScraperStatus(BaseModel):
+    """Progress of the current (or last) scraper run."""
+    run_id: Optional[str] = Field(None, description="Identifier of the run, None if no run was started yet.")
+    state: Literal['idle', 'running', 'finished'] = Field('idle', description="Whether a run is in progress.")
+    total: int = Field(0, description="Number of perks in the run.")
+    queued: int = Field(0, description="Perks waiting for a worker.")
+    running: int = Field(0, description="Perks being processed right now.")
+    completed: int = Field(0, description="Perks processed successfully.")
+    failed: int = Field(0, description="Perks whose job failed.")
+    started_at: Optional[float] = Field(None, description="Unix timestamp when the run started.")
+    finished_at: Optional[float] = Field(None, description="Unix timestamp when the last perk finished.")
+    throughput_per_minute: float = Field(0.0, description="Finished perks per minute since the run started.")
+    eta_seconds: Optional[float] = Field(None, description="Estimated time until the run finishes.")
+    last_record_id: Optional[str] = Field(None, description="Record whose state changed most recently.")
+    last_record_status: Optional[str] = Field(None, description="New state of that record's job.")
+
+class MirroredPerk(BaseModel):
+    """A perks table record as served from the local mirror."""
+    id: str = Field(..., description="Airtable record ID.")
+    created_time: Optional[str] = Field(None, description="Airtable creation time of the record.")
+    fields: Dict[str, Any] = Field(default_factory=dict, description="Record fields (only the requested ones if projected).")
+
+class PerkListResponse(BaseModel):
+    """One page of perks from the local mirror."""
+    items: List[MirroredPerk] = Field(default_factory=list, description="Perks on this page.")
+    next_cursor: Optional[str] = Field(None, description="Pass as `cursor` to fetch the next page; None on the last page.")
+    total: int = Field(0, description="Number of perks matching the filters.")
@@ -1,4 +1,6 @@
-from .models import PerkDetails, ScrapingDecision
+import json
+
+from .models import PageAnalysis
 
 # --- Developer Messages for OpenAI Responses API ---
 
@@ -21,6 +23,16 @@ Prioritize the most specific and recent information. Resolve conflicting details
 Output should conform to the PerkDetails model.
 """
 
+DEV_MSG_ANALYZE_PAGE = f"""
+You are given the perk information gathered so far, the original description (if available), and the content of the page(s) just scraped.
+In one response:
+1. Extract structured information about the startup perk from the new content (name, description, funding/credits, duration, deadlines, eligibility).
+2. Decide the next best action: scrape relevant links further, perform a web search for more/recent info, aggregate the findings, or stop if enough info is gathered or depth limit is reached.
+Only suggest scraping URLs highly likely to contain specific perk details (avoid generic links like 'contact us', 'blog', 'careers').
+Output a single JSON object that conforms to this JSON schema:
+{json.dumps(PageAnalysis.model_json_schema())}
+"""
+
 # --- User Messages (Templates) ---
 
 USER_MSG_EXTRACT_PERK_TEMPLATE = """
@@ -56,4 +68,18 @@ Scraped Data:
 
 Web Search Results:
 {search_results_json}
-""" 
\ No newline at end of file
+""" 
+
+USER_MSG_ANALYZE_PAGE_TEMPLATE = """
+Original Perk Description (from database): {original_description}
+
+Information Gathered So Far:
+{gathered_info_json}
+
+Content scraped from {scraped_urls}:
+```markdown
+{scraped_content}
+```
+
+Extract the perk details from this content and decide the next step. Current depth: {current_depth}/{max_depth}. Web search performed: {search_performed}.
+"""
@@ -0,0 +1,109 @@
+# Scraper run manager: groups queued jobs into a run and streams its progress
+
+import time
+import uuid
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional, Set
+
+from .jobs import JobQueue
+from .models import JobInfo, ScraperStatus
+
+SUBSCRIBER_QUEUE_SIZE = 100 # Slow clients drop old events instead of growing server memory
+
+
+class RunManager:
+    """
+    Tracks the jobs of the current scraper run and pushes a ScraperStatus snapshot to
+    every subscriber whenever one of those jobs changes state.
+    """
+
+    def __init__(self, job_queue: JobQueue):
+        self.job_queue = job_queue
+        self.run_id: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.job_states: Dict[str, str] = {} # job_id -> status
+        self.last_job: Optional[JobInfo] = None
+        self._subscribers: Set[asyncio.Queue] = set()
+        job_queue.add_listener(self._on_job_update)
+
+    def is_running(self) -> bool:
+        return self.run_id is not None and self.finished_at is None
+
+    def submit(self, record_ids: List[str]) -> ScraperStatus:
+        """Queues the records; they join the active run, or start a new one if none is running."""
+        if not self.is_running():
+            self.run_id = uuid.uuid4().hex
+            self.started_at = time.time()
+            self.finished_at = None
+            self.job_states = {}
+            self.last_job = None
+        for job in self.job_queue.submit_many(record_ids):
+            self.job_states[job.job_id] = job.status
+        status = self.status()
+        self._publish(status)
+        return status
+
+    def status(self) -> ScraperStatus:
+        if not self.run_id:
+            return ScraperStatus()
+
+        counts = {'queued': 0, 'running': 0, 'completed': 0, 'failed': 0}
+        for state in self.job_states.values():
+            counts[state] += 1
+        total = len(self.job_states)
+        done = counts['completed'] + counts['failed']
+
+        end = self.finished_at or time.time()
+        elapsed = max(end - self.started_at, 1e-6)
+        throughput = done / elapsed * 60
+        eta = None
+        if self.finished_at:
+            eta = 0.0
+        elif done:
+            eta = (total - done) / (done / elapsed)
+
+        return ScraperStatus(
+            run_id=self.run_id,
+            state='finished' if self.finished_at else 'running',
+            total=total,
+            started_at=self.started_at,
+            finished_at=self.finished_at,
+            throughput_per_minute=round(throughput, 2),
+            eta_seconds=round(eta, 1) if eta is not None else None,
+            last_record_id=self.last_job.record_id if self.last_job else None,
+            last_record_status=self.last_job.status if self.last_job else None,
+            **counts
+        )
+
+    def _on_job_update(self, job: JobInfo):
+        if job.job_id not in self.job_states:
+            return # Job not part of this run (e.g. a direct /update-perk call)
+        self.job_states[job.job_id] = job.status
+        self.last_job = job
+        if all(state in ('completed', 'failed') for state in self.job_states.values()):
+            self.finished_at = time.time()
+        self._publish(self.status())
+
+    def _publish(self, status: ScraperStatus):
+        for queue in list(self._subscribers):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(status)
+
+    async def subscribe(self, heartbeat: float = 15.0) -> AsyncIterator[Optional[ScraperStatus]]:
+        """
+        Yields the current status, then every status change. Yields None after `heartbeat`
+        seconds without changes so the caller can keep the connection alive.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        try:
+            yield self.status()
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            self._subscribers.discard(queue)
@@ -2,22 +2,24 @@
 
 import os
 import json
-from typing import List, Optional, Tuple, Dict
+import uuid
+from typing import Awaitable, Callable, List, Optional, Tuple, Dict, TypeVar
 import asyncio
 
 from dotenv import load_dotenv
 from pydantic import ValidationError
-from openai import OpenAI, AsyncOpenAI
-from firecrawl import FirecrawlApp
-from exa_py import Exa
 import requests # Using requests for basic Airtable interaction
 
 from .models import (
     PerkDetails,
     ScrapingDecision,
     AirtableRecord,
-    AggregatedPerkInfo
+    AggregatedPerkInfo,
+    PageAnalysis
 )
+from .usage import current_record_id, current_run_id, track_openai_call, usage_ledger
+from .mirror import perks_mirror
+from .completeness import score_details, is_complete
 from .prompts import (
     DEV_MSG_EXTRACT_PERK,
     USER_MSG_EXTRACT_PERK_TEMPLATE,
@@ -25,6 +27,8 @@ from .prompts import (
     USER_MSG_DECIDE_NEXT_STEP_TEMPLATE,
     DEV_MSG_AGGREGATE_INFO,
     USER_MSG_AGGREGATE_INFO_TEMPLATE,
+    DEV_MSG_ANALYZE_PAGE,
+    USER_MSG_ANALYZE_PAGE_TEMPLATE,
 )
 
 # Load environment variables
@@ -41,43 +45,64 @@ AIRTABLE_URL_FIELD = os.getenv("AIRTABLE_URL_FIELD", "URL") # Default field name
 AIRTABLE_DESCRIPTION_FIELD = os.getenv("AIRTABLE_DESCRIPTION_FIELD", "Description")
 
 MAX_SCRAPE_DEPTH = 3
+MAX_FRONTIER_WIDTH = int(os.getenv("MAX_FRONTIER_WIDTH", "3")) # URLs scraped and extracted concurrently per depth
+DECIDE_CONTENT_BUDGET = 4000 # Characters of page content sent to the decision step
+ANALYZE_CONTENT_BUDGET = 8000 # Characters of page content sent to the combined extract + decide step, shared by a depth's pages
 OPENAI_MODEL = "gpt-4o" # Using gpt-4o as gpt-4.1 is not a valid model ID
+OPENAI_CHEAP_MODEL = os.getenv("OPENAI_CHEAP_MODEL", "gpt-4o-mini") # Tried first for per-page extraction, OPENAI_MODEL if its output is unusable
 
-# --- API Clients ---
-try:
-    if not OPENAI_API_KEY:
-        raise ValueError("OPENAI_API_KEY not found in environment variables.")
-    # Using AsyncOpenAI for potential parallel calls later
-    openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY)
-
-    if not FIRECRAWL_API_KEY:
-        raise ValueError("FIRECRAWL_API_KEY not found in environment variables.")
-    firecrawl_client = FirecrawlApp(api_key=FIRECRAWL_API_KEY)
-
-    if not EXA_API_KEY:
-        raise ValueError("EXA_API_KEY not found in environment variables.")
-    exa_client = Exa(api_key=EXA_API_KEY)
+T = TypeVar("T")
 
+# --- API Clients ---
+# Created on first use with deferred SDK imports, so importing this module (worker boot, tests) needs no SDKs or
+# credentials; a missing key fails the job that needs the client instead of the whole process
+_clients: Dict[str, object] = {}
+
+def _require(value: Optional[str], name: str) -> str:
+    if not value:
+        raise ValueError(f"{name} not found in environment variables.")
+    return value
+
+def get_openai_client():
+    """Returns the shared AsyncOpenAI client."""
+    if "openai" not in _clients:
+        from openai import AsyncOpenAI
+        _clients["openai"] = AsyncOpenAI(api_key=_require(OPENAI_API_KEY, "OPENAI_API_KEY"))
+    return _clients["openai"]
+
+def get_firecrawl_client():
+    """Returns the shared Firecrawl client."""
+    if "firecrawl" not in _clients:
+        from firecrawl import FirecrawlApp
+        _clients["firecrawl"] = FirecrawlApp(api_key=_require(FIRECRAWL_API_KEY, "FIRECRAWL_API_KEY"))
+    return _clients["firecrawl"]
+
+def get_exa_client():
+    """Returns the shared Exa client."""
+    if "exa" not in _clients:
+        from exa_py import Exa
+        _clients["exa"] = Exa(api_key=_require(EXA_API_KEY, "EXA_API_KEY"))
+    return _clients["exa"]
+
+def airtable_api_url() -> str:
     if not all([AIRTABLE_API_KEY, AIRTABLE_BASE_ID, AIRTABLE_TABLE_NAME]):
         raise ValueError("Airtable configuration (API Key, Base ID, Table Name) missing in environment variables.")
-    AIRTABLE_API_URL = f"https://api.airtable.com/v0/{AIRTABLE_BASE_ID}/{AIRTABLE_TABLE_NAME}"
-    airtable_headers = {
-        "Authorization": f"Bearer {AIRTABLE_API_KEY}",
+    return f"https://api.airtable.com/v0/{AIRTABLE_BASE_ID}/{AIRTABLE_TABLE_NAME}"
+
+def airtable_headers() -> Dict[str, str]:
+    return {
+        "Authorization": f"Bearer {_require(AIRTABLE_API_KEY, 'AIRTABLE_API_KEY')}",
         "Content-Type": "application/json",
     }
 
-except ValueError as e:
-    print(f"Error initializing clients: {e}")
-    # Handle initialization errors appropriately (e.g., exit, raise)
-    raise SystemExit(f"Initialization failed: {e}")
-
 # Placeholder for business logic and service integrations (Firecrawl, Exa, OpenAI, Airtable)
 
 async def get_airtable_record(record_id: str) -> Optional[AirtableRecord]:
     """Fetches a specific record from Airtable by its ID."""
-    url = f"{AIRTABLE_API_URL}/{record_id}"
+    url = f"{airtable_api_url()}/{record_id}"
     try:
-        response = requests.get(url, headers=airtable_headers)
+        # requests is blocking: run it in a thread so queue workers don't stall the event loop
+        response = await asyncio.to_thread(requests.get, url, headers=airtable_headers())
         response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
         record_data = response.json()
         fields = record_data.get('fields', {})
@@ -95,14 +120,40 @@ async def get_airtable_record(record_id: str) -> Optional[AirtableRecord]:
         print(f"Missing expected key in Airtable response for {record_id}: {e}")
     return None
 
+async def list_airtable_records(fields: Optional[List[str]] = None) -> Optional[List[Dict]]:
+    """Lists all records in the Airtable table (follows pagination). Returns None on failure."""
+    records: List[Dict] = []
+    params = {"pageSize": 100}
+    if fields:
+        params["fields[]"] = fields
+    try:
+        while True:
+            response = await asyncio.to_thread(requests.get, airtable_api_url(), headers=airtable_headers(), params=params)
+            response.raise_for_status()
+            page = response.json()
+            records.extend(page.get('records', []))
+            if not page.get('offset'):
+                break
+            params["offset"] = page['offset']
+    except requests.exceptions.RequestException as e:
+        print(f"Error listing Airtable records: {e}")
+        return None
+    return records
+
+async def list_airtable_record_ids() -> List[str]:
+    """Lists the IDs of all records in the Airtable table."""
+    records = await list_airtable_records(fields=[AIRTABLE_URL_FIELD]) # Only the URL column, to keep pages small
+    return [record['id'] for record in records or []]
+
 async def update_airtable_record(record_id: str, data_to_update: Dict):
     """Updates specific fields of an Airtable record."""
-    url = f"{AIRTABLE_API_URL}/{record_id}"
+    url = f"{airtable_api_url()}/{record_id}"
     payload = json.dumps({"fields": data_to_update})
     try:
-        response = requests.patch(url, headers=airtable_headers, data=payload)
+        response = await asyncio.to_thread(requests.patch, url, headers=airtable_headers(), data=payload)
         response.raise_for_status()
         print(f"Successfully updated Airtable record {record_id}")
+        perks_mirror.apply_update(record_id, data_to_update) # Keep the read API's copy in sync
         return True
     except requests.exceptions.RequestException as e:
         print(f"Error updating Airtable record {record_id}: {e}")
@@ -126,7 +177,7 @@ async def scrape_url(url: str) -> Optional[dict]:
             'formats': ['markdown', 'html']
 
         }
-        scrape_result = firecrawl_client.scrape_url(url, params=scrape_params)
+        scrape_result = await asyncio.to_thread(get_firecrawl_client().scrape_url, url, params=scrape_params)
 
         # Check if scrape was successful and returned expected data
         if scrape_result and 'markdown' in scrape_result and 'html' in scrape_result:
@@ -143,27 +194,29 @@ async def search_web(query: str) -> Optional[List[Dict]]:
     print(f"Searching web with Exa: '{query}'")
     try:
         # Using search_and_contents to get snippets
-        search_results = exa_client.search_and_contents(query, num_results=5, use_autoprompt=True)
+        search_results = await asyncio.to_thread(get_exa_client().search_and_contents, query, num_results=5, use_autoprompt=True)
         return search_results.results
     except Exception as e:
         print(f"Error searching web with Exa: {e}")
         return None
 
-async def extract_perk_details_from_text(content: str, url: str) -> Optional[PerkDetails]:
+async def extract_perk_details_from_text(content: str, url: str, model: str = OPENAI_MODEL) -> Optional[PerkDetails]:
     """Uses OpenAI to extract PerkDetails from text."""
-    print(f"Extracting perk details from: {url}")
+    print(f"Extracting perk details from: {url} ({model})")
     user_message = USER_MSG_EXTRACT_PERK_TEMPLATE.format(url=url, scraped_content=content[:4000]) # Limit context size
 
     try:
-        response = await openai_client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": DEV_MSG_EXTRACT_PERK},
-                {"role": "user", "content": user_message}
-            ],
-            response_format={"type": "json_object"} # Request JSON output
-            # If using older OpenAI versions or need Pydantic integration, use the `.responses.parse` method shown in custom instructions
-        )
+        with track_openai_call("extract_perk_details", model) as call:
+            response = await get_openai_client().chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": DEV_MSG_EXTRACT_PERK},
+                    {"role": "user", "content": user_message}
+                ],
+                response_format={"type": "json_object"} # Request JSON output
+                # If using older OpenAI versions or need Pydantic integration, use the `.responses.parse` method shown in custom instructions
+            )
+            call["response"] = response
         response_content = response.choices[0].message.content
         if response_content:
             # Parse the JSON string into a dictionary
@@ -202,7 +255,7 @@ async def decide_next_action(
     user_message = USER_MSG_DECIDE_NEXT_STEP_TEMPLATE.format(
         original_description=original_description or "Not available",
         gathered_info_json=gathered_info_json,
-        last_scraped_content=last_scraped_content[:4000], # Limit context
+        last_scraped_content=last_scraped_content[:DECIDE_CONTENT_BUDGET], # Limit context
         last_scraped_url=last_scraped_url,
         current_depth=current_depth,
         max_depth=MAX_SCRAPE_DEPTH,
@@ -210,14 +263,16 @@ async def decide_next_action(
     )
 
     try:
-        response = await openai_client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": DEV_MSG_DECIDE_NEXT_STEP},
-                {"role": "user", "content": user_message}
-            ],
-            response_format={"type": "json_object"}
-        )
+        with track_openai_call("decide_next_action", OPENAI_MODEL) as call:
+            response = await get_openai_client().chat.completions.create(
+                model=OPENAI_MODEL,
+                messages=[
+                    {"role": "system", "content": DEV_MSG_DECIDE_NEXT_STEP},
+                    {"role": "user", "content": user_message}
+                ],
+                response_format={"type": "json_object"}
+            )
+            call["response"] = response
         response_content = response.choices[0].message.content
         if response_content:
             decision_dict = json.loads(response_content)
@@ -237,6 +292,73 @@ async def decide_next_action(
         print(f"Error calling OpenAI for decision making: {e}")
         return None
 
+async def analyze_pages(
+    original_description: Optional[str],
+    gathered_info: List[PerkDetails],
+    pages: List[Tuple[str, str]],
+    current_depth: int,
+    search_performed: bool,
+    model: str = OPENAI_MODEL
+) -> Optional[PageAnalysis]:
+    """
+    Uses a single OpenAI call to extract PerkDetails from the pages of one depth and decide the next step.
+    Returns None on any failure so the caller can fall back to separate extract/decide calls.
+    """
+    urls = [url for url, _ in pages]
+    print(f"Analyzing {len(pages)} page(s) in one call ({model}). Depth: {current_depth}, Search performed: {search_performed}")
+    gathered_info_json = json.dumps([p.model_dump(exclude_none=True, mode='json') for p in gathered_info], indent=2)
+    per_page_budget = ANALYZE_CONTENT_BUDGET // len(pages)
+    scraped_content = "\n\n".join(f"--- {url} ---\n{markdown[:per_page_budget]}" for url, markdown in pages)
+
+    user_message = USER_MSG_ANALYZE_PAGE_TEMPLATE.format(
+        original_description=original_description or "Not available",
+        gathered_info_json=gathered_info_json,
+        scraped_urls=", ".join(urls),
+        scraped_content=scraped_content,
+        current_depth=current_depth,
+        max_depth=MAX_SCRAPE_DEPTH,
+        search_performed=search_performed
+    )
+
+    response_content = None
+    try:
+        with track_openai_call("analyze_pages", model) as call:
+            response = await get_openai_client().chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": DEV_MSG_ANALYZE_PAGE},
+                    {"role": "user", "content": user_message}
+                ],
+                response_format={"type": "json_object"}
+            )
+            call["response"] = response
+        response_content = response.choices[0].message.content
+        if not response_content:
+            print("OpenAI did not return content for page analysis.")
+            return None
+        analysis = PageAnalysis.model_validate_json(response_content)
+        analysis.details.source_urls = urls # The pages analyzed are the sources
+        print(f"Decision: {analysis.decision.action}, Reason: {analysis.decision.reasoning}")
+        return analysis
+    except ValidationError as e:
+        print(f"Error validating combined page analysis: {e}. Response: {response_content}")
+        return None
+    except Exception as e:
+        print(f"Error calling OpenAI for page analysis: {e}")
+        return None
+
+async def run_tiered(run: Callable[[str], Awaitable[Optional[T]]], stage: str) -> Optional[T]:
+    """
+    Runs an extraction on OPENAI_CHEAP_MODEL and re-runs it on OPENAI_MODEL only if the output was
+    empty or not valid JSON for the schema (the batch updater's "repaired" reason, src/model_router.py).
+    Fields the page does not mention are not a reason: a bigger model will not find them either.
+    """
+    result = await run(OPENAI_CHEAP_MODEL)
+    if result is not None or OPENAI_CHEAP_MODEL == OPENAI_MODEL:
+        return result
+    print(f"Unusable output from {OPENAI_CHEAP_MODEL} for {stage}, escalating to {OPENAI_MODEL}")
+    return await run(OPENAI_MODEL)
+
 async def aggregate_information(
     initial_record: AirtableRecord,
     scraped_perks: List[PerkDetails],
@@ -256,14 +378,16 @@ async def aggregate_information(
     )
 
     try:
-        response = await openai_client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": DEV_MSG_AGGREGATE_INFO},
-                {"role": "user", "content": user_message}
-            ],
-            response_format={"type": "json_object"}
-        )
+        with track_openai_call("aggregate_information", OPENAI_MODEL) as call:
+            response = await get_openai_client().chat.completions.create(
+                model=OPENAI_MODEL,
+                messages=[
+                    {"role": "system", "content": DEV_MSG_AGGREGATE_INFO},
+                    {"role": "user", "content": user_message}
+                ],
+                response_format={"type": "json_object"}
+            )
+            call["response"] = response
         response_content = response.choices[0].message.content
         if response_content:
             aggregated_dict = json.loads(response_content)
@@ -289,85 +413,126 @@ async def aggregate_information(
 
 # --- Main Orchestration Logic ---
 
+async def scrape_markdown(url: str) -> Optional[Tuple[str, str]]:
+    """Scrapes one URL. Returns (url, markdown) or None if scraping failed."""
+    scraped_data = await scrape_url(url)
+    if not scraped_data or 'markdown' not in scraped_data:
+        print(f"Failed to scrape or get markdown for {url}.")
+        return None
+    return url, scraped_data['markdown']
+
+async def extract_pages(pages: List[Tuple[str, str]]) -> List[PerkDetails]:
+    """Extracts perk details from each page concurrently (one OpenAI call per page)."""
+    results = await asyncio.gather(*(
+        run_tiered(
+            lambda model, markdown=markdown, url=url: extract_perk_details_from_text(markdown, url, model=model),
+            stage="extract_perk_details"
+        )
+        for url, markdown in pages
+    ))
+    for (url, _), extracted_details in zip(pages, results):
+        if extracted_details:
+            print(f"Successfully extracted details from {url}")
+        else:
+            print(f"Could not extract structured details from {url}")
+    return [details for details in results if details]
+
 async def process_perk_update(record_id: str) -> AggregatedPerkInfo:
     """Orchestrates the entire process for a single Airtable record."""
     print(f"\n--- Starting update process for Airtable record: {record_id} ---")
+    current_record_id.set(record_id) # Tag every LLM call below with this record for usage accounting
+    run_id = uuid.uuid4().hex
+    current_run_id.set(run_id) # ... and with this run, so the response reports only this run's usage
     initial_record = await get_airtable_record(record_id)
 
     if not initial_record or not initial_record.url:
         msg = f"Could not fetch initial record or URL missing for {record_id}."
         print(msg)
-        return AggregatedPerkInfo(record_id=record_id, initial_url=None, updated_details=PerkDetails(), status='error', message=msg)
+        return AggregatedPerkInfo(record_id=record_id, initial_url=None, updated_details=PerkDetails(), status='error', message=msg, usage=usage_ledger.for_run(run_id))
 
-    current_url = str(initial_record.url)
     all_scraped_details: List[PerkDetails] = [] # Store details from all successful scrapes
     visited_urls = set()
+    frontier: List[str] = [str(initial_record.url)] # Suggested URLs, best first; top-K are taken per depth
     search_results: Optional[List[Dict]] = None
+    search_task: Optional[asyncio.Task] = None # Exa search runs alongside the crawl
     search_performed = False
-    tasks = [] # For potential parallel operations
 
     for depth in range(MAX_SCRAPE_DEPTH + 1): # +1 to allow initial scrape at depth 0
-        if not current_url or current_url in visited_urls:
-            print(f"Skipping already visited or invalid URL: {current_url}")
-            break # Stop if URL is invalid or visited
-
-        visited_urls.add(current_url)
-        print(f"\n[Depth {depth}] Processing URL: {current_url}")
-
-        scraped_data = await scrape_url(current_url)
-        if not scraped_data or 'markdown' not in scraped_data:
-            print(f"Failed to scrape or get markdown for {current_url}. Stopping crawl for this path.")
-            break # Stop this path if scraping fails
-
-        # Attempt to extract structured info from the current page
-        extracted_details = await extract_perk_details_from_text(scraped_data['markdown'], current_url)
-        if extracted_details:
-            all_scraped_details.append(extracted_details)
-            print(f"Successfully extracted details from {current_url}")
-        else:
-            print(f"Could not extract structured details from {current_url}")
+        batch = [url for url in frontier if url not in visited_urls][:MAX_FRONTIER_WIDTH]
+        frontier = [url for url in frontier if url not in visited_urls and url not in batch]
+        if not batch:
+            print("No unvisited URLs left in the frontier. Stopping crawl.")
+            break
+
+        visited_urls.update(batch)
+        print(f"\n[Depth {depth}] Processing {len(batch)} URL(s) in parallel: {batch}")
+
+        # Scrape every URL of this depth concurrently
+        pages = await asyncio.gather(*(scrape_markdown(url) for url in batch))
+        pages = [page for page in pages if page is not None]
+        if not pages:
+            print("Failed to scrape every URL of this depth. Stopping crawl.")
+            break
 
         # Decide next step (only if not at max depth)
         if depth < MAX_SCRAPE_DEPTH:
-            decision = await decide_next_action(
-                original_description=initial_record.current_description,
-                gathered_info=all_scraped_details,
-                last_scraped_content=scraped_data['markdown'],
-                last_scraped_url=current_url,
-                current_depth=depth,
-                search_performed=search_performed
+            # Extract and decide in one call on one copy of the content
+            analysis = await run_tiered(
+                lambda model: analyze_pages(
+                    original_description=initial_record.current_description,
+                    gathered_info=all_scraped_details,
+                    pages=pages,
+                    current_depth=depth,
+                    search_performed=search_performed,
+                    model=model
+                ),
+                stage="analyze_pages"
             )
+            if analysis:
+                all_scraped_details.append(analysis.details)
+                decision = analysis.decision
+            else:
+                # Fallback: separate extraction per page, then one decision over the merged pages
+                print("Combined analysis failed, falling back to separate extract and decide calls.")
+                all_scraped_details.extend(await extract_pages(pages))
+                per_page_budget = DECIDE_CONTENT_BUDGET // len(pages)
+                merged_content = "\n\n".join(f"--- {url} ---\n{markdown[:per_page_budget]}" for url, markdown in pages)
+                decision = await decide_next_action(
+                    original_description=initial_record.current_description,
+                    gathered_info=all_scraped_details,
+                    last_scraped_content=merged_content,
+                    last_scraped_url=", ".join(url for url, _ in pages),
+                    current_depth=depth,
+                    search_performed=search_performed
+                )
+
+            # Deterministic early exit: required fields are filled, no more pages needed
+            score, missing = score_details(all_scraped_details)
+            print(f"Completeness after depth {depth}: {score:.2f} (missing: {', '.join(missing) or 'none'})")
+            if is_complete(all_scraped_details):
+                print("All required perk fields are filled. Moving to aggregation.")
+                break
 
             if not decision:
                 print("Failed to get decision from AI. Stopping.")
                 break
 
             if decision.action == 'scrape_further' and decision.relevant_urls_to_scrape:
-                # Find the first valid, unvisited URL to scrape next
-                next_url_found = False
-                for next_url in decision.relevant_urls_to_scrape:
-                    str_next_url = str(next_url)
-                    if str_next_url not in visited_urls:
-                        current_url = str_next_url
-                        next_url_found = True
-                        print(f"AI decided to scrape further: {current_url}")
-                        break # Go to the next iteration with this URL
-                if not next_url_found:
+                suggested = [str(url) for url in decision.relevant_urls_to_scrape if str(url) not in visited_urls]
+                # New suggestions go first, leftovers from earlier depths stay queued behind them
+                frontier = suggested + [url for url in frontier if url not in suggested]
+                if not frontier:
                     print("AI suggested scraping further, but no valid unvisited URLs provided. Stopping crawl.")
                     break
+                print(f"AI decided to scrape further: {frontier[:MAX_FRONTIER_WIDTH]}")
             elif decision.action == 'search_web' and decision.search_query and not search_performed:
                 print(f"AI decided to search web. Query: '{decision.search_query}'")
-                # Run search in parallel (or could be sequential)
-                search_results = await search_web(decision.search_query)
+                # Run the search in the background and keep crawling any queued URLs meanwhile
+                search_task = asyncio.create_task(search_web(decision.search_query))
                 search_performed = True
-                # After search, we might need another decision or just proceed to aggregation
-                # For simplicity here, we'll proceed to aggregation after the loop finishes
-                # or if the decision is 'aggregate'
-                print("Continuing scraping process after initiating web search.")
-                # Need to decide what URL to process next if search is done in parallel
-                # For now, let's assume we stop scraping this path after search
-                break
-
+                if not frontier:
+                    break
+                print(f"Continuing crawl of {len(frontier)} queued URL(s) while the search runs.")
             elif decision.action == 'aggregate':
                 print("AI decided to aggregate information now.")
                 break # Exit loop to aggregate
@@ -379,9 +544,14 @@ async def process_perk_update(record_id: str) -> AggregatedPerkInfo:
                  print(f"AI returned action '{decision.action}' which requires no further scraping action now. Proceeding to aggregation.")
                  break
         else:
+            # No decision needed at max depth: extraction only
+            all_scraped_details.extend(await extract_pages(pages))
             print(f"Reached max depth ({MAX_SCRAPE_DEPTH}). Moving to aggregation.")
             break # Reached max depth
 
+    if search_task:
+        search_results = await search_task
+
     # Aggregation Step
     print("\n--- Aggregating final results ---")
     final_perk_details = await aggregate_information(
@@ -415,7 +585,8 @@ async def process_perk_update(record_id: str) -> AggregatedPerkInfo:
             initial_url=initial_record.url,
             updated_details=final_perk_details,
             status=status,
-            message=message
+            message=message,
+            usage=usage_ledger.for_run(run_id)
         )
     else:
         msg = f"Failed to aggregate information for {record_id}."
@@ -425,5 +596,6 @@ async def process_perk_update(record_id: str) -> AggregatedPerkInfo:
             initial_url=initial_record.url,
             updated_details=PerkDetails(), # Empty details
             status='error',
-            message=msg
+            message=msg,
+            usage=usage_ledger.for_run(run_id)
         ) 
\ No newline at end of file
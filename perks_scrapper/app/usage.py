@@ -0,0 +1,100 @@
+# Token and cost accounting for the OpenAI calls made by the agent
+
+import os
+import json
+import time
+import contextvars
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, List, Optional
+
+from .models import UsageSummary
+
+# USD per 1M tokens (input, output), the same table the batch updater uses (src/usage.py)
+MODEL_PRICING_PATH = os.getenv("MODEL_PRICING_PATH", os.path.join(os.path.dirname(__file__), '..', '..', 'model_pricing.json'))
+USAGE_LEDGER_MAX_ENTRIES = int(os.getenv("USAGE_LEDGER_MAX_ENTRIES", "10000")) # Oldest calls are dropped beyond this
+
+
+def _load_pricing(path: str) -> Dict[str, tuple]:
+    with open(path) as f:
+        return {model: tuple(prices) for model, prices in json.load(f).items()}
+
+
+MODEL_PRICING = _load_pricing(MODEL_PRICING_PATH)
+
+current_record_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_record_id", default=None)
+current_run_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_run_id", default=None) # One update of one record
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    input_price, output_price = MODEL_PRICING.get(model, (0.0, 0.0))
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+
+class UsageLedger:
+    """Keeps one entry per LLM call, tagged with the Airtable record and the update run (the most recent max_entries)."""
+
+    def __init__(self, max_entries: int = USAGE_LEDGER_MAX_ENTRIES):
+        self.entries: Deque[Dict[str, Any]] = deque(maxlen=max_entries)
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self.entries)
+
+    def record(self, stage: str, model: str, usage: Any, latency: float) -> Dict[str, Any]:
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        entry = {
+            "timestamp": time.time(),
+            "record_id": current_record_id.get(),
+            "run_id": current_run_id.get(),
+            "stage": stage,
+            "model": model,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "latency": round(latency, 4),
+            "cost": round(estimate_cost(model, prompt_tokens, completion_tokens), 6),
+        }
+        with self._lock:
+            self.entries.append(entry)
+        return entry
+
+    def summarize(self, entries: Optional[List[Dict[str, Any]]] = None) -> UsageSummary:
+        entries = self.snapshot() if entries is None else entries
+        return UsageSummary(
+            calls=len(entries),
+            prompt_tokens=sum(e["prompt_tokens"] for e in entries),
+            completion_tokens=sum(e["completion_tokens"] for e in entries),
+            latency_seconds=round(sum(e["latency"] for e in entries), 3),
+            estimated_cost_usd=round(sum(e["cost"] for e in entries), 6),
+        )
+
+    def for_record(self, record_id: str) -> UsageSummary:
+        return self.summarize([e for e in self.snapshot() if e["record_id"] == record_id])
+
+    def for_run(self, run_id: str) -> UsageSummary:
+        """Usage of one update run, so a record updated twice reports each run on its own."""
+        return self.summarize([e for e in self.snapshot() if e["run_id"] == run_id])
+
+    def group_by(self, key: str) -> Dict[str, UsageSummary]:
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        for entry in self.snapshot():
+            groups.setdefault(str(entry.get(key)), []).append(entry)
+        return {name: self.summarize(items) for name, items in groups.items()}
+
+
+usage_ledger = UsageLedger()
+
+
+@contextmanager
+def track_openai_call(stage: str, model: str):
+    """Times the wrapped call; assign the response to `call["response"]` to record its usage."""
+    call: Dict[str, Any] = {"response": None}
+    start = time.perf_counter()
+    try:
+        yield call
+    finally:
+        response = call["response"]
+        usage_ledger.record(stage, model, getattr(response, "usage", None), time.perf_counter() - start)
@@ -1,15 +1,32 @@
-import os
-import json
 import time
-
-import config
-from src.web_utils import scraper_beautiful_soup, access_page_with_cookies, is_fake_404, get_url_status_code
-from src.airtable_utils import get_records, update_record, update_perks_info
-from src.gpt_extractor import gpt_extract_info
-from src.perplexity_extractor import extract_perk_info
-
-# get perplexity API key and add it to the environment variables
-perplexity_api_key = os.environ.get(config.PERPLEXITY_API_KEY)
+import asyncio
+
+import requests
+
+from src.web_utils import scraper_beautiful_soup, get_url_status_code
+from src.airtable_utils import get_records, update_record, update_perk_info
+from src.gpt_extractor import agpt_extract_info
+from src.perplexity_extractor import aextract_perk_info
+from src.metrics import metrics, timer, incr
+from src.usage import ledger, perk_context
+from src.run_journal import RunJournal
+from src.state_store import PerkStateStore
+from src.scheduler import Budget, select_due
+from src.completeness import is_complete, completeness_score
+from src.fetch_registry import fetch_registry
+from src.dedup import page_index
+from src.async_clients import run, PERK_CONCURRENCY
+from src.model_router import needs_escalation, track_models, STRONG_MODEL
+from src.settings import setting
+from src.perk_record import PerkCollection
+from src.run_config import parse_args, configure, defaults, select_records, print_config, SCRAPE_STAGES
+from src.batch_combine import combine_batch, combine_pair, summarize
+
+# get perplexity API key from config.py (or the environment)
+perplexity_api_key = setting("PERPLEXITY_API_KEY")
+
+# number of extracted perks that are combined (and then written) together
+COMBINE_CHUNK_SIZE = setting("COMBINE_CHUNK_SIZE", 10)
 
 
 def print_hello():
@@ -36,7 +53,8 @@ def print_hello():
     print("\n\n")
 
 # main status processing logic - loop over airtable rows
-def process_records(records):
+# with write=False (dry run) the status changes are only printed, not written to airtable
+def process_records(records, journal=None, store=None, write=True):
 
     perks_wo_link  = []
     perks_active   = []
@@ -44,36 +62,39 @@ def process_records(records):
     perks_updated  = []
 
     for record in records:
-        fields = record.get('fields', {})
-        perk_name = fields.get("Name")
-        perk_url = fields.get("Link")
-        current_status = fields.get("Status", "").lower()  # Default to empty string if missing
+        perk_name = record.name
+        perk_url = record.url  # link with "http://" added when missing (see src/perk_record.py)
+        current_status = record.status  # lower-cased, empty string if missing
 
-        # Case 1: No URL available
-        if not perk_url:
-            perks_wo_link.append(perk_name)
-            continue
-        
         # Case 1: No URL or it's an email (contains "@")
-        if not perk_url or "@" in perk_url:
+        if not record.has_link:
             perks_wo_link.append(perk_name)
+            if store:
+                store.record_status(record.id, perk_name, record.link, "no_link")
             continue
 
-        # Case 2: URL available but missing http
-        if not perk_url.startswith(('http://', 'https://')):
-            perk_url = 'http://' + perk_url
+        # Status already checked earlier in this (resumed) run
+        if journal and journal.is_done(record.id, "status_checked"):
+            if journal.get(record.id, "status") == "active":
+                perks_active.append(perk_name)
+            else:
+                perks_inactive.append(perk_name)
+            continue
 
         print(f'\nProcessing perk: {perk_name}, at {perk_url}')
 
         # Check URL status
-        status_code = get_url_status_code(perk_url)
+        with timer("status_check", domain=record.domain):
+            status_code = get_url_status_code(perk_url)
+        incr("status_codes", code=status_code)
 
         if status_code == 200:
             print(f"OK: Link is active (Status Code: {status_code})")
 
             if current_status != "active":
                 
-                update_record(record['id'], {"Status": "active"})
+                if write:
+                    update_record(record.id, {"Status": "active"})
                 perks_active.append(perk_name)
                 perks_updated.append(perk_name)  # Only append if status changed
 
@@ -83,7 +104,8 @@ def process_records(records):
             print(f"ERROR: Failed to reach URL (Status Code: {status_code})")
 
             if current_status != "broken/expired":
-                update_record(record['id'], {"Status": "broken/expired"})
+                if write:
+                    update_record(record.id, {"Status": "broken/expired"})
                 perks_updated.append(perk_name)
 
             perks_inactive.append(perk_name)
@@ -92,10 +114,17 @@ def process_records(records):
             print(f"ERROR: Link is inactive (Status Code: {status_code})")
 
             if current_status != "broken/expired":
-                update_record(record['id'], {"Status": "broken/expired"})
+                if write:
+                    update_record(record.id, {"Status": "broken/expired"})
                 perks_updated.append(perk_name)
 
             perks_inactive.append(perk_name)
+
+        new_status = "active" if status_code == 200 else "broken/expired"
+        if store:
+            store.record_status(record.id, perk_name, perk_url, new_status, http_code=status_code)
+        if journal:
+            journal.mark(record.id, "status_checked", status=new_status, status_code=status_code)
         
         time.sleep(1)  # polite rate limiting
 
@@ -120,58 +149,27 @@ def combine_perk_dicts(dict1, dict2):
     Returns:
         A combined dictionary with the best information from both sources
     """
-    # Define standard keys for our output
-    standard_keys = [
-        "Brief description of the provider",
-        "What you get",
-        "How to get it",
-        "Value"
-    ]
-    
-    # Create mapping for possible variations in key names
-    key_mapping = {
-        "Brief description of the provider": ["Brief description of the provider", "Provider Description"],
-        "What you get": ["What you get", "What You Get"],
-        "How to get it": ["How to get it", "How To Get It"],
-        "Value": ["Value", "Money Value"]
-    }
-    
-    # Initialize result dictionary
-    result = {}
-    
-    # Process each standard key
-    for std_key in standard_keys:
-        # Get all possible key variations
-        possible_keys = key_mapping[std_key]
-        
-        # Get values from both dictionaries if they exist
-        values = []
-        for key in possible_keys:
-            if key in dict1 and dict1[key] not in ["Not found", "Error parsing", ""]:
-                values.append(dict1[key])
-            if key in dict2 and dict2[key] not in ["Not found", "Error parsing", ""]:
-                values.append(dict2[key])
-        
-        # Choose the best value
-        if values:
-            # For description fields, choose the longest one
-            if std_key in ["Brief description of the provider", "What you get", "How to get it"]:
-                result[std_key] = max(values, key=len)
-            # For value field, prefer the one with $ if available
-            elif std_key == "Value":
-                dollar_values = [v for v in values if '$' in str(v)]
-                if dollar_values:
-                    result[std_key] = dollar_values[0]
-                else:
-                    result[std_key] = values[0]
-        else:
-            # If no good value found, use "Not found"
-            result[std_key] = "Not found"
-    
-    return result
+    # a batch of one - scrap_website combines whole chunks of perks with combine_batch()
+    combined, _ = combine_pair(dict1, dict2)
+    return combined
 
 # recieves all active perks, scrapes the websites and returns a dict with the desired info
-def scrap_website(records):
+# with a journal, perks are written to airtable in chunks as soon as they are combined and finished stages are skipped on re-runs
+# with a budget, no new perk is started once the per-run perk / spend / wall time / token limit is reached
+# stages picks the methods that run ("bs_gpt", "perplexity") and whether results are written ("write")
+# max_subpages and stages default to the run defaults in src/run_config.py
+def scrap_website(records, journal=None, store=None, budget=None, chunk_size=COMBINE_CHUNK_SIZE, concurrency=PERK_CONCURRENCY,
+                  max_subpages=None, stages=None):
+    return run(ascrap_website(records, journal, store, budget, chunk_size, concurrency, max_subpages, stages))
+
+
+# up to `concurrency` perks are scraped at once; their LLM and search calls share the async clients in src/async_clients.py
+async def ascrap_website(records, journal=None, store=None, budget=None, chunk_size=COMBINE_CHUNK_SIZE, concurrency=PERK_CONCURRENCY,
+                         max_subpages=None, stages=None):
+    if max_subpages is None or stages is None:
+        run_defaults = defaults()
+        max_subpages = run_defaults["max_subpages"] if max_subpages is None else max_subpages
+        stages = run_defaults["stages"] if stages is None else stages
     
     def print_perks(perks):
         for key, value in perks.items():
@@ -179,77 +177,241 @@ def scrap_website(records):
     
     print("\nNumber of active perks to be scraped: ", len(records))
 
+    # pages shared by several perks are fetched and extracted once in this run
+    fetch_registry.reset()
+    page_index.reset()
+
     # filter 'records' to consider only the active perks
     results_bs_gpt = {}
-    results_perplexity = {}
     all_results = {}
-
-    for record in records:
+    confidences = {}
+
+    # extracted perks wait here until a chunk is full, then both methods are combined for the whole chunk at once
+    pending = []
+
+    async def combine_and_write():
+        if not pending:
+            return
+        # take the chunk before the first await, so perks finishing meanwhile start the next chunk
+        chunk = pending[:]
+        pending.clear()
+        with timer("combine"):
+            combined_chunk, confidence_chunk = combine_batch([(item["perplexity"], item["bs_gpt"]) for item in chunk])
+
+        for item, combined_results, confidence in zip(chunk, combined_chunk, confidence_chunk):
+            print(f'\nCombined result of both scraping methods for {item["name"]}:')
+            print_perks(combined_results)
+            all_results[item["name"]] = combined_results
+            confidences[item["name"]] = confidence
+
+            # write each perk right away so a crash later in the run does not lose it
+            # (in a worker thread: the blocking airtable call must not stall the other perks on the event loop)
+            if journal and "write" in stages:
+                write_result = await asyncio.to_thread(update_perk_info, item["name"], combined_results, record_id=item["id"])
+                print(f"Airtable: {write_result}")
+                if not write_result.startswith("error"):
+                    journal.mark(item["id"], "written", combined=combined_results, confidence=confidence,
+                                 write_result=write_result)
+
+    slots = asyncio.Semaphore(concurrency)
+    stopped = []
+
+    async def scrape_perk(record):
         # extract information from argument records
-        fields = record.get('fields', {})
-        perk_name = fields.get("Name")
-        perk_url = fields.get("Link")
-        print(f"\n{'-' * 75}\nAnalyzing perk: {perk_name}\n{'-' * 75}")
-
-        # SCRAPER 1: BeautifulSoup - scrape the url's text with beautiful soup
-        print("Analysing with method 1 - beautiful soup + chatGPT")
-        bs_page_text = scraper_beautiful_soup(perk_url)
-        gpt_extraction = gpt_extract_info(bs_page_text)
-        results_bs_gpt[perk_name] = gpt_extraction
-        print_perks(gpt_extraction)
-
-        # SCRAPER 2
-        print("\nAnalysing with method 2 - perplexity")        
-        results_perplexity = extract_perk_info(
-            url=perk_url,
-            perplexity_api_key=perplexity_api_key,
-            crawl_subpages=True,
-            max_subpages=10
-        )
-        print_perks(results_perplexity)
-        
-        # Combine results of both scraping methods
-        combined_results = combine_perk_dicts(results_perplexity, results_bs_gpt)
-        print(f'\nCombined result of both scraping methods:')
-        print_perks(combined_results)
-        all_results[perk_name] = combined_results
-        
-    return all_results
-
-
-if __name__ == "__main__":
-
-    print_hello()
-
-    process_records_flag = 0
-
-    # extract perk database table from airtable
-    records = get_records()
-
-    if process_records_flag == 1:
+        record_id = record.id
+        perk_name = record.name
+        perk_url = record.url
+
+        if journal and journal.is_done(record_id, "written"):
+            all_results[perk_name] = journal.get(record_id, "combined")
+            return
+
+        async with slots:
+            if budget:
+                reason = budget.exhausted()
+                if reason:
+                    if not stopped:
+                        print(f"\nStopping scrape: {reason}. Remaining perks stay due for the next run.")
+                    stopped.append(record_id)
+                    return
+                budget.perks_done += 1  # counted when started, so perks in flight count against the limit
+
+            print(f"\n{'-' * 75}\nAnalyzing perk: {perk_name}\n{'-' * 75}")
+
+            domain = record.domain
+
+            bs_page_text = None
+            bs_models = []  # models the router used for method 1 in this run
+            with perk_context(perk_name):
+                # SCRAPER 1: BeautifulSoup - scrape the url's text with beautiful soup
+                if journal and journal.is_done(record_id, "scraped"):
+                    print("Method 1 already done in this run - reusing result")
+                    gpt_extraction = journal.get(record_id, "bs_gpt")
+                elif "bs_gpt" not in stages:
+                    print("Method 1 not in this run's stages - skipped")
+                    gpt_extraction = {}
+                else:
+                    print("Analysing with method 1 - beautiful soup + chatGPT")
+                    with timer("method", name="bs_gpt", domain=domain):
+                        bs_page_text = await asyncio.to_thread(scraper_beautiful_soup, perk_url)
+                        with track_models() as bs_models:
+                            gpt_extraction = await agpt_extract_info(bs_page_text)
+                    if store:
+                        store.record_scrape(record_id, bs_page_text)
+                    if journal:
+                        journal.mark(record_id, "scraped", bs_gpt=gpt_extraction)
+                results_bs_gpt[perk_name] = gpt_extraction
+                print_perks(gpt_extraction)
+
+                # SCRAPER 2
+                if journal and journal.is_done(record_id, "extracted"):
+                    print("\nMethod 2 already done in this run - reusing result")
+                    results_perplexity = journal.get(record_id, "perplexity")
+                elif "perplexity" not in stages:
+                    print("\nMethod 2 not in this run's stages - skipped")
+                    results_perplexity = {}
+                elif is_complete(gpt_extraction):
+                    # the landing page already answers every required field - no crawl needed
+                    print(f"\nSkipping method 2 - landing page is complete (score {completeness_score(gpt_extraction):.2f})")
+                    incr("early_exits", stage="method_1")
+                    results_perplexity = {}
+                    if journal:
+                        journal.mark(record_id, "extracted", perplexity=results_perplexity)
+                else:
+                    print("\nAnalysing with method 2 - perplexity")        
+                    with timer("method", name="perplexity", domain=domain):
+                        results_perplexity = await aextract_perk_info(
+                            url=perk_url,
+                            perplexity_api_key=perplexity_api_key,
+                            crawl_subpages=True,
+                            max_subpages=max_subpages
+                        )
+                    print_perks(results_perplexity)
+                
+                    # method 1 ran on the cheap model: re-extract with the strong model if the methods disagree
+                    # (not when the router already escalated it - that would repeat the same gpt-4o call)
+                    if bs_page_text and STRONG_MODEL not in bs_models and needs_escalation(gpt_extraction, results_perplexity):
+                        print(f"\nMethods disagree - re-extracting method 1 with {STRONG_MODEL}")
+                        incr("model_escalations", caller="method_agreement")
+                        gpt_extraction = await agpt_extract_info(bs_page_text, model=STRONG_MODEL)
+                        results_bs_gpt[perk_name] = gpt_extraction
+                
+                    if journal:
+                        journal.mark(record_id, "extracted", perplexity=results_perplexity, bs_gpt=gpt_extraction)
 
-        # identify which records are active/inactive and update status on airtable
-        perks_wo_link, perks_active, perks_inactive, _ = process_records(records)
+                pending.append({"id": record_id, "name": perk_name, "perplexity": results_perplexity, "bs_gpt": gpt_extraction})
+            incr("perks_scraped")
 
-        # Write it to a file (each item on a new line)
-        with open('perks_active.txt', 'w') as f:
-            for item in perks_active:
-                f.write(item + '\n')
+            # Combine results of both scraping methods once a chunk is full
+            if len(pending) >= chunk_size:
+                await combine_and_write()
 
-    else:
-        # Read the list of active perk to avoid reruning the whole analysis 
-        with open('perks_active.txt', 'r') as f:
-            perks_active = [line.strip() for line in f]
+    await asyncio.gather(*(scrape_perk(record) for record in records))
 
-    # filter all the records from airtable - we only scratch the ones which are active
-    records_active = [item for item in records if item['fields'].get('Name') in perks_active]
+    await combine_and_write()
+    summarize(list(confidences), list(confidences.values()))
+    page_index.print_summary()
+        
+    return all_results
 
-    # scrape the active websites to update information: 
-    scraped_info = scrap_website(records_active)
 
-    # see how many websites were scraped successfully
-    # code here
+if __name__ == "__main__":
 
-    # update airtable with the new info
-    update_perks_info(scraped_info)
+    # run profile and command line options (stages, selection, budgets, concurrency, cache, dry run)
+    args = parse_args()
 
+    print_hello()
+    configure(args)
+    print_config(args)
+
+    # per-perk stage journal: an interrupted run resumes from the last completed stage of each perk
+    # (a dry run keeps nothing, so a later real run does not resume its results)
+    journal = None if args.dry_run else RunJournal('run_journal.jsonl')
+
+    # extract perk database table from airtable, kept as compact records indexed by id, name and domain
+    records = PerkCollection.from_airtable(get_records())
+    candidates = select_records(records, args)
+    if len(candidates) != len(records):
+        print(f"Selected {len(candidates)}/{len(records)} perks")
+
+    # local state of every perk (last status, http code, check time, content hash), keyed by record id
+    # a dry run reads it to pick perks but does not update it
+    store = PerkStateStore('perks_state.db')
+    if store.is_empty() and not args.dry_run:
+        imported = store.import_active_names(records, 'perks_active.txt')
+        print(f"Seeded local state store with {imported} active perks from perks_active.txt")
+    run_store = None if args.dry_run else store
+
+    records_due = []
+    try:
+        if "status" in args.stages:
+
+            # identify which records are active/inactive and update status on airtable,
+            # skipping perks whose status was checked recently
+            stale_ids = store.stale_ids(args.status_max_age_hours * 3600)
+            checked_ids = store.checked_ids()
+            records_to_check = [item for item in candidates if item.id in stale_ids or item.id not in checked_ids]
+            print(f"Checking status of {len(records_to_check)}/{len(candidates)} perks (last check older than {args.status_max_age_hours}h)")
+            process_records(records_to_check, journal, run_store, write=not args.dry_run)
+
+        scraping = any(stage in args.stages for stage in SCRAPE_STAGES)
+        if scraping or "write" in args.stages:
+
+            # filter all the selected records - we only scratch the ones which are active
+            active_ids = store.active_ids()
+            records_active = [item for item in candidates if item.id in active_ids]
+
+            # perks left half-done by an interrupted run go first, then the due perks (most overdue first)
+            pending_ids = set(journal.pending_ids()) if journal else set()
+            records_pending = [item for item in records_active if item.id in pending_ids]
+            if scraping:
+                records_rest = select_due(records_active, store.all_states()) if args.due_only else records_active
+                records_due = records_pending + [item for item in records_rest if item.id not in pending_ids]
+                print(f"\nPerks {'due ' if args.due_only else ''}for scraping: {len(records_due)}/{len(records_active)} active")
+            else:
+                # "write" alone: write the results an earlier run left in the journal, nothing is scraped
+                records_due = records_pending
+                print(f"\nPerks with unwritten results in the run journal: {len(records_due)}")
+
+            # nothing is scraped in a write-only run, so there is nothing to budget
+            budget = Budget(max_perks=args.max_perks, max_cost=args.max_cost, max_seconds=args.max_seconds,
+                            max_tokens=args.max_tokens) if scraping else None
+
+            # scrape the selected websites and write each perk to airtable as soon as it is done
+            scraped_info = scrap_website(records_due, journal, run_store, budget, concurrency=args.perk_concurrency,
+                                         max_subpages=args.max_subpages, stages=args.stages)
+
+    except KeyboardInterrupt:
+        if journal:
+            print(f"\nInterrupted - progress is saved in {journal.path}, re-run to resume.")
+        raise SystemExit(1)
+
+    written = 0
+    if journal:
+        # see how many websites were scraped successfully
+        written = sum(1 for item in records_due if journal.is_done(item.id, "written"))
+        print(f"\nPerks written to Airtable: {written}/{len(records_due)} selected")
+
+        # every perk started in this run made it to airtable: archive the journal so the next run starts fresh,
+        # otherwise shrink it to one line per perk for the run that resumes it
+        if not journal.pending_ids():
+            journal.finish()
+        else:
+            journal.compact()
+
+    # tell the dashboard API that airtable changed so its local mirror re-syncs
+    mirror_refresh_url = setting("MIRROR_REFRESH_URL")
+    if mirror_refresh_url and written:
+        try:
+            requests.post(mirror_refresh_url, timeout=10)
+        except requests.RequestException as e:
+            print(f"WARNING: could not invalidate the dashboard mirror: {e}")
+
+    # end-of-run timing summary plus machine-readable exports (a dry run only prints it)
+    metrics.print_summary()
+    if not args.dry_run:
+        metrics.export(json_path='run_metrics.json', prometheus_path='run_metrics.prom')
+
+    # token / cost ledger for this run, appended so it can be queried later with `python -m src.usage`
+    ledger.print_summary()
+    ledger.save('usage_ledger.jsonl')
@@ -1,15 +1,17 @@
 import argparse
 import os
-from firecrawl import FirecrawlApp
-from openai import OpenAI
 from dotenv import load_dotenv
 
+from src.usage import ledger, track_usage
+from src.model_router import CHEAP_MODEL, STRONG_MODEL
+
 # Load environment variables from .env file
 load_dotenv()
 
 def scrape_with_firecrawl(url: str, api_key: str) -> str | None:
     """Scrapes the content of a given URL using Firecrawl."""
     try:
+        from firecrawl import FirecrawlApp  # SDKs are imported when used, so --help stays fast
         app = FirecrawlApp(api_key=api_key)
         scraped_data = app.scrape_url(url)
         if 'markdown' in scraped_data:
@@ -26,21 +28,28 @@ def scrape_with_firecrawl(url: str, api_key: str) -> str | None:
         return None
 
 def analyze_with_openai(content: str, api_key: str) -> str | None:
-    """Analyzes the given content using OpenAI's chat completion."""
-    try:
-        client = OpenAI(api_key=api_key)
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant. Analyze the following text content and provide a brief summary."},
-                {"role": "user", "content": content}
-            ],
-            max_tokens=150
-        )
-        return response.choices[0].message.content
-    except Exception as e:
-        print(f"Error analyzing content with OpenAI: {e}")
-        return None
+    """Analyzes the given content using OpenAI's chat completion (small model first, gpt-4o if it returns nothing usable)."""
+    from openai import OpenAI
+    client = OpenAI(api_key=api_key)
+    for model in dict.fromkeys([CHEAP_MODEL, STRONG_MODEL]):
+        try:
+            with track_usage("openai", model, stage="analyze_with_openai") as call:
+                response = client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": "You are a helpful assistant. Analyze the following text content and provide a brief summary."},
+                        {"role": "user", "content": content}
+                    ],
+                    max_tokens=150
+                )
+                call.response = response
+            summary = response.choices[0].message.content
+            if summary and summary.strip():
+                return summary
+            print(f"Empty analysis from {model}.")
+        except Exception as e:
+            print(f"Error analyzing content with OpenAI ({model}): {e}")
+    return None
 
 def main():
     parser = argparse.ArgumentParser(description='Scrape a URL with Firecrawl and analyze its content with OpenAI.')
@@ -73,6 +82,7 @@ def main():
             print("\n--- OpenAI Analysis ---")
             print(analysis)
             print("-----------------------\n")
+            ledger.print_summary()
         else:
             print("Analysis failed.")
     else:
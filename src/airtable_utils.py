@@ -1,12 +1,20 @@
-from pyairtable import Table
-import config
+from src.settings import setting
+from src.metrics import timer, incr
+from src.money import parse_money
 
-# Initialize Airtable table connection once
-table = Table(
-    config.AIRTABLE_API_KEY,
-    config.AIRTABLE_BASE_ID,
-    config.AIRTABLE_TABLE_ID
-)
+_table = None
+
+# Airtable table connection, created once on first use (pyairtable is imported only then)
+def get_table():
+    global _table
+    if _table is None:
+        from pyairtable import Table
+        _table = Table(
+            setting("AIRTABLE_API_KEY"),
+            setting("AIRTABLE_BASE_ID"),
+            setting("AIRTABLE_TABLE_ID")
+        )
+    return _table
 
 # extracts all rows from airtable
 def get_records():
@@ -20,7 +28,8 @@ def get_records():
     """
     try:
         print("Connecting to Airtable...")
-        records = table.all()
+        with timer("airtable", operation="list"):
+            records = get_table().all()
         print(f"Successfully fetched {len(records)} records.")
         return records
     except Exception as e:
@@ -49,7 +58,8 @@ def update_record(record_id, fields):
             fields = fields.model_dump()
 
         # Now update Airtable
-        table.update(record_id, fields)
+        with timer("airtable", operation="update"):
+            get_table().update(record_id, fields)
 
         print(f"OK: Record {record_id} updated successfully.")
     except Exception as e:
@@ -61,54 +71,52 @@ def update_record(record_id, fields):
             print("Response Body:", e.response.text)
         raise
 
-# updates fields on airtable with the info extracted from crawling (perk description, value, etc)
-def update_perks_info(scraped_info):
+# updates fields on airtable with the info extracted from crawling for a single perk
+def update_perk_info(company_name, perk_info, record_id=None):
     """
-    Updates Airtable with scraped perk information.
-    
+    Writes the scraped information of one perk to Airtable.
+
     Args:
-        scraped_info (dict): Dictionary with company names as keys and perk info dictionaries as values
-    
+        company_name (str): Name of the perk / company (Airtable "Name" field)
+        perk_info (dict): Combined perk information
+        record_id (str, optional): Airtable record ID; skips the lookup by name when known
+
     Returns:
-        dict: Results with status of each update operation
+        str: "updated", "created" or "error: <message>"
     """
-    print(f"\n{'-' * 75}\nUpdating perks info on Airtable...\n{'-' * 75}")
-    results = {}
-    
-    for company_name, perk_info in scraped_info.items():
-        try:
-            # Search for existing record
-            records = table.all(formula=f"{{Name}}='{company_name}'")
-            
-            # Map the fields to Airtable column names
-            fields = {
-                "Name": company_name,
-                "Brief description of the provider": perk_info["Brief description of the provider"],
-                "What you get": perk_info["What you get"],
-                "How to get it": perk_info["How to get it"]
-            }
-            
-            # Only add Value if it contains numbers and is not "Not found"
-            value = perk_info.get("Value", "")
-            if value != "Not found" and any(char.isdigit() for char in value):
-                # Extract only the digits and convert to number
-                import re
-                numeric_value = re.findall(r'\d+', value)
-                if numeric_value:
-                    # Join and convert to number (handles cases like "1,000")
-                    fields["Value"] = float(''.join(numeric_value))
+    try:
+        # Search for existing record
+        if record_id:
+            records = [{"id": record_id}]
+        else:
+            with timer("airtable", operation="search"):
+                records = get_table().all(formula=f"{{Name}}='{company_name}'")
+        
+        # Map the fields to Airtable column names
+        fields = {
+            "Name": company_name,
+            "Brief description of the provider": perk_info["Brief description of the provider"],
+            "What you get": perk_info["What you get"],
+            "How to get it": perk_info["How to get it"]
+        }
+        
+        # Only add Value if a monetary amount can be parsed from it ("$1,000 for 12 months" -> 1000)
+        money = parse_money(perk_info.get("Value", ""))
+        if money:
+            fields["Value"] = money.amount
+        
+        if records:
+            # Update existing record
+            update_record(records[0]['id'], fields)
+            result = "updated"
+        else:
+            # Create new record
+            with timer("airtable", operation="create"):
+                get_table().create(fields)
+            result = "created"
+        incr("airtable_writes", result=result)
+        return result
             
-            if records:
-                # Update existing record
-                record_id = records[0]['id']
-                update_record(record_id, fields)
-                results[company_name] = "updated"
-            else:
-                # Create new record
-                table.create(fields)
-                results[company_name] = "created"
-                
-        except Exception as e:
-            results[company_name] = f"error: {str(e)}"
-    
-    return results
\ No newline at end of file
+    except Exception as e:
+        incr("airtable_writes", result="error")
+        return f"error: {str(e)}"
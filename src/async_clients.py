@@ -0,0 +1,171 @@
+"""INFORMATION:
+Shared API clients and concurrency limits for the batch updater.
+
+Sync client (created on first use, not at import):
+1. openai_client() - one OpenAI client per process for the sync extractors
+
+Async clients (one per event loop, created on first use):
+1. async_openai() - AsyncOpenAI on a pooled httpx client, shared by every async extractor
+2. async_http() - httpx.AsyncClient for the Perplexity API
+3. Both pools are capped at MAX_CONNECTIONS, so dozens of requests in flight reuse a bounded set of connections
+
+Concurrency limits (asyncio semaphores, per provider):
+1. "openai" - OPENAI_CONCURRENCY requests in flight (default 16)
+2. "perplexity" - PERPLEXITY_CONCURRENCY searches (default 4)
+3. "browser" - BROWSER_CONCURRENCY Selenium renders in worker threads (default 4)
+4. Perks themselves are fanned out PERK_CONCURRENCY at a time by scrap_website() (default 8)
+
+Lifetime:
+1. run(coroutine) runs a coroutine on a new event loop and closes that loop's clients afterwards
+2. Sync wrappers (extract_perk_info, scrap_website) use run(); async callers await the a* functions directly
+
+Configuration (config.py or environment, all optional, see src/settings.py): OPENAI_CONCURRENCY,
+PERPLEXITY_CONCURRENCY, BROWSER_CONCURRENCY, PERK_CONCURRENCY, MAX_CONNECTIONS, HTTP_TIMEOUT;
+set_limits() overrides the provider limits for one run (perks_updater.py --openai-concurrency ...)
+"""
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Dict, Optional, TypeVar
+
+import httpx
+
+from src.settings import setting
+
+T = TypeVar("T")
+
+OPENAI_CONCURRENCY = setting("OPENAI_CONCURRENCY", 16)
+PERPLEXITY_CONCURRENCY = setting("PERPLEXITY_CONCURRENCY", 4)
+BROWSER_CONCURRENCY = setting("BROWSER_CONCURRENCY", 4)
+PERK_CONCURRENCY = setting("PERK_CONCURRENCY", 8)
+MAX_CONNECTIONS = setting("MAX_CONNECTIONS", 50)
+HTTP_TIMEOUT = setting("HTTP_TIMEOUT", 60.0)
+
+LIMITS = {"openai": OPENAI_CONCURRENCY, "perplexity": PERPLEXITY_CONCURRENCY, "browser": BROWSER_CONCURRENCY}
+
+
+def set_limits(**limits: Optional[int]):
+    """
+    Override provider concurrency limits (e.g. from the perks_updater command line).
+    Applies to event loops started afterwards; None keeps the current limit.
+
+    Args:
+        **limits: openai=..., perplexity=..., browser=...
+    """
+    for provider, value in limits.items():
+        if provider not in LIMITS:
+            raise ValueError(f"Unknown provider: {provider}")
+        if value is not None:
+            LIMITS[provider] = value
+
+
+class _LoopClients:
+    """
+    Clients and semaphores bound to one event loop.
+    """
+
+    def __init__(self):
+        self.openai = None
+        self.http: Optional[httpx.AsyncClient] = None
+        self.semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def pool(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS // 2),
+            timeout=HTTP_TIMEOUT,
+        )
+
+
+_clients: Dict[asyncio.AbstractEventLoop, _LoopClients] = {}
+_sync_client = None
+_sync_lock = threading.Lock()
+
+
+def openai_client():
+    """
+    Returns:
+        The process-wide sync OpenAI client (the SDK is imported on the first call)
+    """
+    global _sync_client
+    with _sync_lock:
+        if _sync_client is None:
+            from openai import OpenAI
+            _sync_client = OpenAI(api_key=setting("OPENAI_API_KEY"))
+    return _sync_client
+
+
+def _current() -> _LoopClients:
+    loop = asyncio.get_running_loop()
+    if loop not in _clients:
+        _clients[loop] = _LoopClients()
+    return _clients[loop]
+
+
+def async_openai():
+    """
+    Returns:
+        The AsyncOpenAI client of the running event loop
+    """
+    clients = _current()
+    if clients.openai is None:
+        from openai import AsyncOpenAI
+        clients.openai = AsyncOpenAI(api_key=setting("OPENAI_API_KEY"), http_client=clients.pool(), max_retries=3)
+    return clients.openai
+
+
+def async_http() -> httpx.AsyncClient:
+    """
+    Returns:
+        The pooled httpx client of the running event loop (Perplexity and other plain HTTP APIs)
+    """
+    clients = _current()
+    if clients.http is None:
+        clients.http = clients.pool()
+    return clients.http
+
+
+@asynccontextmanager
+async def limit(provider: str) -> AsyncIterator[None]:
+    """
+    Hold one of the provider's concurrency slots for the duration of the block.
+
+    Args:
+        provider: "openai", "perplexity" or "browser"
+    """
+    clients = _current()
+    if provider not in clients.semaphores:
+        clients.semaphores[provider] = asyncio.Semaphore(LIMITS[provider])
+    async with clients.semaphores[provider]:
+        yield
+
+
+async def aclose():
+    """
+    Close the clients of the running event loop.
+    """
+    clients = _clients.pop(asyncio.get_running_loop(), None)
+    if not clients:
+        return
+    if clients.openai is not None:
+        await clients.openai.close()
+    if clients.http is not None:
+        await clients.http.aclose()
+
+
+def run(coroutine: Awaitable[T]) -> T:
+    """
+    Run a coroutine from sync code and close the clients it opened.
+
+    Args:
+        coroutine: e.g. aextract_perk_info(...)
+
+    Returns:
+        The coroutine's result
+    """
+    async def main() -> Any:
+        try:
+            return await coroutine
+        finally:
+            await aclose()
+
+    return asyncio.run(main())
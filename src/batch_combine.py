@@ -0,0 +1,213 @@
+"""INFORMATION:
+Vectorized merge of the two scraping methods' results for many perks at once.
+
+Columns:
+1. For each of the four perk fields, the values of both methods for all perks form one (perks x 2) string array
+2. Key name variations ("Provider Description", "Money Value", ...) are resolved while the columns are built
+3. Column 0 is method 2 (Perplexity crawl), column 1 is method 1 (BeautifulSoup + GPT); ties go to column 0
+
+Features (computed per column with numpy, no per-perk Python loops over fields):
+1. Length and digit presence of every value
+2. Placeholder flags ("Not found", "Error parsing", "Blocked", ... from src/completeness.py)
+3. Cross-method similarity - token overlap of hashed bag-of-words vectors; for Value, equal parsed amounts
+4. Value parse confidence from the rule-based money parser (src/money.py)
+
+Winners:
+1. Text fields: the longest non-placeholder value, a small bonus for values that contain numbers
+2. Value: the most confidently parsed amount (then the larger one); an unparsed value only if nothing parses
+3. Fields that neither method filled are "Not found"
+
+Confidence (0.0 - 1.0 per field and perk, kept for review):
+1. 0 when neither method filled the field, 0.5 when only one did, 0.5 - 1.0 by cross-method similarity when both did
+2. Scaled down for short text answers and for Values without a confidently parsed amount
+3. Perks with a field below LOW_CONFIDENCE are listed by summarize() at the end of the run
+"""
+import re
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.completeness import MIN_TEXT_LENGTH, PLACEHOLDERS
+from src.money import best_money
+
+STANDARD_KEYS = ["Brief description of the provider", "What you get", "How to get it", "Value"]
+TEXT_KEYS = STANDARD_KEYS[:3]
+KEY_MAPPING = {
+    "Brief description of the provider": ["Brief description of the provider", "Provider Description"],
+    "What you get": ["What you get", "What You Get"],
+    "How to get it": ["How to get it", "How To Get It"],
+    "Value": ["Value", "Money Value"],
+}
+NOT_FOUND = "Not found"
+
+HASH_DIM = 256  # buckets of the hashed bag-of-words vectors
+DIGIT_BONUS = 0.2  # added to log(length) of text values that contain a number
+LOW_CONFIDENCE = 0.5
+
+_PLACEHOLDERS = np.array(sorted(PLACEHOLDERS))
+_DIGITS = "0123456789"
+_WORD = re.compile(r"\w+")
+
+
+def _value(info: Optional[Dict], std_key: str) -> str:
+    info = info or {}
+    for key in KEY_MAPPING[std_key]:
+        value = info.get(key)
+        if value not in (None, ""):
+            return str(value)
+    return ""
+
+
+def columns(pairs: Sequence[Tuple[Optional[Dict], Optional[Dict]]]) -> Dict[str, np.ndarray]:
+    """
+    Build one (perks x 2) string array per standard field.
+
+    Args:
+        pairs: (method 2 result, method 1 result) per perk
+
+    Returns:
+        Dict of field name -> array of values ("" where a method has no value)
+    """
+    return {
+        std_key: np.array([[_value(first, std_key), _value(second, std_key)] for first, second in pairs],
+                          dtype=np.str_).reshape(len(pairs), 2)
+        for std_key in STANDARD_KEYS
+    }
+
+
+def _hashed_tokens(values: np.ndarray) -> np.ndarray:
+    """
+    Binary hashed bag-of-words vectors, shape values.shape + (HASH_DIM,).
+    """
+    flat = values.ravel()
+    rows, buckets = [], []
+    for idx, text in enumerate(flat):
+        for word in set(_WORD.findall(text.lower())):
+            rows.append(idx)
+            buckets.append(zlib.crc32(word.encode()) % HASH_DIM)
+    vectors = np.zeros((flat.size, HASH_DIM), dtype=bool)
+    vectors[np.array(rows, dtype=np.intp), np.array(buckets, dtype=np.intp)] = True
+    return vectors.reshape(values.shape + (HASH_DIM,))
+
+
+def features(values: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Vectorized quality features of one field column.
+
+    Args:
+        values: (perks x 2) string array
+
+    Returns:
+        length, digits, placeholder (all perks x 2) and similarity (perks,) arrays
+    """
+    normalized = np.char.lower(np.char.strip(values))
+    length = np.char.str_len(np.char.strip(values))
+    digits = np.zeros(values.shape, dtype=bool)
+    for digit in _DIGITS:
+        digits |= np.char.find(values, digit) >= 0
+    placeholder = np.isin(normalized, _PLACEHOLDERS)
+
+    tokens = _hashed_tokens(normalized)
+    intersection = (tokens[:, 0] & tokens[:, 1]).sum(axis=1)
+    union = (tokens[:, 0] | tokens[:, 1]).sum(axis=1)
+    similarity = np.divide(intersection, union, out=np.zeros(len(values)), where=union > 0)
+    return {"length": length, "digits": digits, "placeholder": placeholder, "similarity": similarity}
+
+
+def _money_columns(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    parsed = [best_money(text) for text in values.ravel()]
+    confidence = np.array([money.confidence if money else 0.0 for money in parsed]).reshape(values.shape)
+    amount = np.array([money.amount if money else 0.0 for money in parsed]).reshape(values.shape)
+    return confidence, amount
+
+
+def _pick(values: np.ndarray, score: np.ndarray, valid: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    winner = np.argmax(np.where(valid, score, -np.inf), axis=1)
+    rows = np.arange(len(values))
+    picked = np.where(valid.any(axis=1), values[rows, winner], NOT_FOUND)
+    return picked, winner
+
+
+def combine_batch(pairs: Sequence[Tuple[Optional[Dict], Optional[Dict]]]) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Combine the results of both scraping methods for many perks in one pass.
+
+    Args:
+        pairs: (method 2 result, method 1 result) per perk
+
+    Returns:
+        (combined dicts, per-field confidence dicts), both in the order of pairs
+    """
+    if not pairs:
+        return [], []
+    rows = np.arange(len(pairs))
+    picked: Dict[str, np.ndarray] = {}
+    confidence: Dict[str, np.ndarray] = {}
+
+    for std_key, values in columns(pairs).items():
+        feats = features(values)
+        valid = ~feats["placeholder"]
+        both = valid.all(axis=1)
+        agreement = feats["similarity"]
+
+        if std_key == "Value":
+            money_confidence, amount = _money_columns(values)
+            parsed = valid & (money_confidence > 0)
+            # confidence first, then the larger amount; unparsed values rank below every parsed one
+            largest = np.maximum(amount.max(axis=1, keepdims=True), 1.0)
+            score = np.where(parsed, money_confidence + amount / largest * 1e-3, 0.0)
+            picked[std_key], winner = _pick(values, score, valid)
+            same_amount = parsed.all(axis=1) & np.isclose(amount[:, 0], amount[:, 1])
+            agreement = np.where(parsed.all(axis=1), same_amount.astype(float), agreement)
+            quality = np.where(parsed[rows, winner], money_confidence[rows, winner], 0.5)
+        else:
+            score = np.log1p(feats["length"]) + DIGIT_BONUS * feats["digits"]
+            picked[std_key], winner = _pick(values, score, valid)
+            quality = np.where(feats["length"][rows, winner] >= MIN_TEXT_LENGTH, 1.0, 0.5)
+
+        base = np.where(both, 0.5 + 0.5 * agreement, 0.5)
+        confidence[std_key] = np.round(np.where(valid.any(axis=1), base * quality, 0.0), 2)
+
+    combined = [{key: str(picked[key][idx]) for key in STANDARD_KEYS} for idx in rows]
+    scores = [{key: float(confidence[key][idx]) for key in STANDARD_KEYS} for idx in rows]
+    return combined, scores
+
+
+def combine_pair(dict1: Optional[Dict], dict2: Optional[Dict]) -> Tuple[Dict, Dict]:
+    """
+    Combine the results of one perk (a batch of one).
+
+    Returns:
+        (combined dict, per-field confidence dict)
+    """
+    combined, scores = combine_batch([(dict1, dict2)])
+    return combined[0], scores[0]
+
+
+def summarize(names: Sequence[str], scores: Sequence[Dict]) -> List[Tuple[str, List[str]]]:
+    """
+    Print the mean confidence per field and the perks that need review.
+
+    Args:
+        names: Perk names in the order of scores
+        scores: Per-field confidence dicts from combine_batch()
+
+    Returns:
+        (perk name, low-confidence fields) for every perk below LOW_CONFIDENCE in any field
+    """
+    if not scores:
+        return []
+    matrix = np.array([[score[key] for key in STANDARD_KEYS] for score in scores])
+    print("\nCombine confidence (mean per field):")
+    for key, mean in zip(STANDARD_KEYS, matrix.mean(axis=0)):
+        print(f"  {key:<36} {mean:.2f}")
+
+    low = matrix < LOW_CONFIDENCE
+    review = [
+        (name, [key for key, flag in zip(STANDARD_KEYS, flags) if flag])
+        for name, flags in zip(names, low) if flags.any()
+    ]
+    if review:
+        print(f"Perks to review ({len(review)}): " + ", ".join(f"{name} ({', '.join(fields)})" for name, fields in review))
+    return review
@@ -0,0 +1,99 @@
+"""INFORMATION:
+Deterministic completeness scoring for extracted perk information.
+
+Target fields (the four keys used by combine_perk_dicts):
+1. Brief description of the provider
+2. What you get
+3. How to get it
+4. Value
+
+Field check:
+1. A field counts as filled only if it is not a placeholder ("Not found", "Error parsing", "Blocked", ...)
+2. Text fields need a minimum length, so one-word answers do not count as confident
+3. Value needs a digit or a free/percentage marker, so "varies" or "see website" does not count
+
+Score:
+1. Weighted share of filled fields (0.0 - 1.0)
+2. Extraction is complete once every required field is filled
+3. Used by extract_perk_info() to stop crawling subpages as soon as the landing page (or the pages seen so far) answer the perk
+"""
+import re
+from typing import Dict, List, Optional
+
+FIELD_WEIGHTS = {
+    "Brief description of the provider": 0.15,
+    "What you get": 0.35,
+    "How to get it": 0.25,
+    "Value": 0.25,
+}
+REQUIRED_FIELDS = ("Brief description of the provider", "What you get", "How to get it", "Value")
+MIN_TEXT_LENGTH = 15
+
+PLACEHOLDERS = {"", "not found", "error parsing", "blocked", "no content", "n/a", "na", "none", "unknown", "not specified", "not available"}
+VALUE_PATTERN = re.compile(r"\d|\bfree\b|%", re.IGNORECASE)
+
+
+def field_filled(field: str, value) -> bool:
+    """
+    Check whether a single field holds a confident answer.
+
+    Args:
+        field: One of the FIELD_WEIGHTS keys
+        value: Extracted value
+
+    Returns:
+        True if the value is usable as-is
+    """
+    if value is None:
+        return False
+    text = str(value).strip()
+    if text.lower().rstrip(".") in PLACEHOLDERS:
+        return False
+    if field == "Value":
+        return bool(VALUE_PATTERN.search(text))
+    return len(text) >= MIN_TEXT_LENGTH
+
+
+def missing_fields(info: Dict) -> List[str]:
+    """
+    Returns:
+        The target fields that are not confidently filled
+    """
+    return [field for field in FIELD_WEIGHTS if not field_filled(field, info.get(field))]
+
+
+def completeness_score(info: Dict) -> float:
+    """
+    Returns:
+        Weighted share of confidently filled target fields (0.0 - 1.0)
+    """
+    return round(sum(weight for field, weight in FIELD_WEIGHTS.items() if field_filled(field, info.get(field))), 2)
+
+
+def is_complete(info: Dict, required=REQUIRED_FIELDS) -> bool:
+    """
+    Returns:
+        True if every required field is confidently filled
+    """
+    return all(field_filled(field, info.get(field)) for field in required)
+
+
+def merge_extraction(current: Optional[Dict], new: Dict) -> Dict:
+    """
+    Merge a new page extraction into the fields collected so far.
+    Filled fields are kept; only missing ones are taken from the new extraction.
+
+    Args:
+        current: Fields collected so far (None for the first page)
+        new: Extraction of the latest page
+
+    Returns:
+        The merged dictionary
+    """
+    if not current:
+        return dict(new)
+    merged = dict(current)
+    for field in FIELD_WEIGHTS:
+        if not field_filled(field, merged.get(field)) and field_filled(field, new.get(field)):
+            merged[field] = new[field]
+    return merged
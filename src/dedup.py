@@ -0,0 +1,289 @@
+"""INFORMATION:
+Near-duplicate detection of page content with MinHash signatures.
+
+Signatures:
+1. Text is lower-cased and split into words; overlapping word n-grams (shingles) are hashed with crc32
+2. A MinHash signature keeps the minimum of NUM_PERM random hash permutations over the shingle hashes (numpy, one pass)
+3. The share of equal signature positions estimates the Jaccard similarity of two texts
+4. An LSH index (BANDS bands of ROWS rows) finds candidate matches without comparing against every stored text
+
+Block deduplication (within one perk):
+1. Scraped text is split into blocks - lines when the text has line breaks, otherwise sentences and "|"-separated
+   menu items (the scrapers return whitespace-joined text)
+2. BlockDeduplicator drops every block that is near-identical to a block already seen for the perk,
+   so the header, footer, cookie banner and pricing table repeated on each subpage reach the prompt once
+3. Blocks shorter than BLOCK_MIN_WORDS words are too short for MinHash and are dropped only when they repeat exactly
+4. Only blocks within the part of a page that reaches a prompt (dedupe(text, limit=...)) are remembered - a block
+   cut from the landing page by its budget still reaches the prompt from the subpage that repeats it
+
+Page reuse (across perks, one run):
+1. page_index keeps the signature of every page sent to an LLM extractor together with the extraction result
+2. A page that is near-identical (>= PAGE_THRESHOLD) to an already-extracted page reuses that result instead of a new call
+3. Reuses are counted in src.metrics ("near_duplicate_pages") and listed in page_index.flags for the end-of-run summary
+4. `page_index.reset()` at the start of a run, together with the fetch registry
+5. `page_index.enabled = False` turns reuse off (cache mode "off" in src/run_config.py); block deduplication stays on
+"""
+from __future__ import annotations
+
+import functools
+import re
+import threading
+import zlib
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from src.metrics import incr
+from src.usage import current_perk
+
+if TYPE_CHECKING:
+    import numpy as np  # imported on first signature, so importing the extractors does not load numpy
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+BLOCK_SHINGLE = 3  # words per shingle for blocks
+PAGE_SHINGLE = 5  # words per shingle for whole pages
+BLOCK_MIN_WORDS = 8
+MIN_PAGE_WORDS = 50  # shorter pages are too generic to be reused across perks
+BLOCK_THRESHOLD = 0.7
+PAGE_THRESHOLD = 0.9
+
+
+_WORD = re.compile(r"\w+")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\s+[|•·]\s+")
+
+
+@functools.lru_cache(maxsize=None)
+def _permutations() -> Tuple[np.uint64, np.ndarray, np.ndarray]:
+    """
+    Returns:
+        (prime, a, b) of the NUM_PERM hash permutations (a * x + b) % prime
+    """
+    import numpy as np
+    rng = np.random.default_rng(1)  # fixed seed: signatures must be comparable across calls
+    a = rng.integers(1, 1 << 32, NUM_PERM, dtype=np.uint64)
+    b = rng.integers(0, 1 << 32, NUM_PERM, dtype=np.uint64)
+    return np.uint64((1 << 61) - 1), a, b
+
+
+def shingle_hashes(text: str, k: int) -> np.ndarray:
+    """
+    Returns:
+        Unique crc32 hashes of the word k-grams of the text (a single shingle for texts shorter than k words)
+    """
+    import numpy as np
+    words = _WORD.findall(text.lower())
+    if not words:
+        return np.empty(0, dtype=np.uint64)
+    grams = (" ".join(words[idx:idx + k]) for idx in range(max(1, len(words) - k + 1)))
+    return np.unique(np.fromiter((zlib.crc32(gram.encode()) for gram in grams), dtype=np.uint64))
+
+
+def signature(hashes: np.ndarray) -> Optional[np.ndarray]:
+    """
+    MinHash signature of a set of shingle hashes.
+
+    Returns:
+        Array of NUM_PERM minimum permuted hashes, or None for an empty set
+    """
+    import numpy as np
+    if not hashes.size:
+        return None
+    prime, a, b = _permutations()
+    permuted = (np.outer(a, hashes) % prime + b[:, None]) % prime
+    return permuted.min(axis=1)
+
+
+def minhash(text: Optional[str], k: int = PAGE_SHINGLE) -> Optional[np.ndarray]:
+    return signature(shingle_hashes(text, k)) if text else None
+
+
+def similarity(first: np.ndarray, second: np.ndarray) -> float:
+    """
+    Estimated Jaccard similarity of two signatures.
+    """
+    import numpy as np
+    return float(np.mean(first == second))
+
+
+class MinHashIndex:
+    """
+    LSH index of MinHash signatures.
+    """
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self.signatures: Dict[Any, np.ndarray] = {}
+        self._buckets: Dict[Tuple[int, bytes], List[Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def add(self, key: Any, sig: np.ndarray):
+        self.signatures[key] = sig
+        for band in range(BANDS):
+            self._buckets.setdefault((band, sig[band * ROWS:(band + 1) * ROWS].tobytes()), []).append(key)
+
+    def query(self, sig: np.ndarray) -> List[Tuple[Any, float]]:
+        """
+        Find stored signatures at least `threshold` similar.
+
+        Returns:
+            (key, similarity) pairs, most similar first
+        """
+        candidates = set()
+        for band in range(BANDS):
+            candidates.update(self._buckets.get((band, sig[band * ROWS:(band + 1) * ROWS].tobytes()), ()))
+        matches = [(key, similarity(sig, self.signatures[key])) for key in candidates]
+        return sorted((match for match in matches if match[1] >= self.threshold), key=lambda match: -match[1])
+
+
+def split_blocks(text: str) -> List[str]:
+    """
+    Split page text into blocks.
+
+    Args:
+        text: Scraped page text
+
+    Returns:
+        Lines (when the text has line breaks) or sentences - small, position-independent units,
+        so a footer matches wherever the previous sentence ended
+    """
+    parts = text.splitlines() if "\n" in text else _SENTENCE_END.split(text)
+    return [part.strip() for part in parts if part.strip()]
+
+
+class BlockDeduplicator:
+    """
+    Drops blocks already seen in earlier pages of the same perk.
+    """
+
+    def __init__(self, threshold: float = BLOCK_THRESHOLD):
+        self.index = MinHashIndex(threshold)
+        self._short_blocks = set()
+
+    def dedupe(self, text: Optional[str], limit: Optional[int] = None) -> Optional[str]:
+        """
+        Remove near-duplicate blocks from a page and remember the part of it that reaches a prompt.
+
+        Args:
+            text: Scraped page text
+            limit: Characters of the deduplicated text that reach a prompt (e.g. the page's Document budget);
+                only blocks within them are remembered, so a block cut from this page is kept on a later one.
+                None remembers every block
+
+        Returns:
+            The text without blocks seen before (the original text if nothing was dropped)
+        """
+        if not text:
+            return text
+        separator = "\n" if "\n" in text else " "
+        kept, dropped, position = [], 0, 0
+        for block in split_blocks(text):
+            end = position + len(block)
+            remember = limit is None or end <= limit
+            if len(block.split()) < BLOCK_MIN_WORDS:
+                key = " ".join(_WORD.findall(block.lower()))
+                duplicate = key in self._short_blocks
+                if remember:
+                    self._short_blocks.add(key)
+            else:
+                sig = minhash(block, BLOCK_SHINGLE)
+                duplicate = sig is not None and bool(self.index.query(sig))
+                if sig is not None and not duplicate and remember:
+                    self.index.add(len(self.index), sig)
+            if duplicate:
+                dropped += len(block)
+            else:
+                kept.append(block)
+                position = end + len(separator)
+
+        if not dropped:
+            return text
+        incr("dedup_chars_dropped", amount=dropped)
+        return separator.join(kept)
+
+
+class PageIndex:
+    """
+    Run-scoped, thread-safe index of extracted pages and their results.
+    """
+
+    def __init__(self, threshold: float = PAGE_THRESHOLD):
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self.enabled = True
+        self.reset()
+
+    def reset(self):
+        self._indexes: Dict[str, MinHashIndex] = {}
+        self._results: Dict[Tuple[str, int], Tuple[Optional[str], Any]] = {}
+        self.flags: List[Tuple[Optional[str], Optional[str], str, float]] = []
+
+    def _lookup(self, kind: str, text: Optional[str]) -> Tuple[Optional[np.ndarray], Optional[Any]]:
+        """
+        Returns:
+            (signature, reused result) - signature None for texts too short to compare, result None on a miss
+        """
+        if not self.enabled or not text or len(_WORD.findall(text)) < MIN_PAGE_WORDS:
+            return None, None
+        sig = minhash(text, PAGE_SHINGLE)
+
+        with self._lock:
+            matches = self._indexes.setdefault(kind, MinHashIndex(self.threshold)).query(sig)
+        if not matches:
+            return sig, None
+        key, score = matches[0]
+        perk, result = self._results[(kind, key)]
+        print(f"Page is {score:.0%} similar to a page already extracted for {perk or 'another perk'} - reusing its result")
+        incr("near_duplicate_pages", kind=kind.split(":")[0])
+        self.flags.append((current_perk(), perk, kind, score))
+        return sig, result
+
+    def _store(self, kind: str, sig: Optional[np.ndarray], result: Any):
+        if sig is None:
+            return
+        with self._lock:
+            index = self._indexes.setdefault(kind, MinHashIndex(self.threshold))
+            key = len(index)
+            index.add(key, sig)
+            self._results[(kind, key)] = (current_perk(), result)
+
+    def reuse(self, kind: str, text: Optional[str], loader: Callable[[], Any]) -> Any:
+        """
+        Return the result of a near-identical page extracted earlier in this run, or run loader.
+
+        Args:
+            kind: Extraction type (and model), e.g. "gpt_extract_info:gpt-4o-mini"
+            text: Text the extraction is made from
+            loader: Zero-argument function producing the result on a miss
+
+        Returns:
+            The reused or newly loaded result
+        """
+        sig, result = self._lookup(kind, text)
+        if result is not None:
+            return result
+        result = loader()
+        self._store(kind, sig, result)
+        return result
+
+    async def areuse(self, kind: str, text: Optional[str], loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Async version of reuse() for coroutine loaders.
+        """
+        sig, result = self._lookup(kind, text)
+        if result is not None:
+            return result
+        result = await loader()
+        self._store(kind, sig, result)
+        return result
+
+    def print_summary(self):
+        if not self.flags:
+            return
+        print(f"\nNear-duplicate pages reused ({len(self.flags)}):")
+        for perk, source, kind, score in self.flags:
+            print(f"  {perk or '?'} <- {source or '?'} ({kind.split(':')[0]}, {score:.0%})")
+
+
+page_index = PageIndex()
@@ -0,0 +1,126 @@
+"""INFORMATION:
+Budgeted document assembly for multi-page extraction prompts.
+
+Segments:
+1. A Document holds page texts as segments (label + reference to the page string), nothing is concatenated on add
+2. Every segment has its own character budget (e.g. landing page 6000, subpages 3000, search results 4000)
+
+Rendering:
+1. render(max_chars) gives every segment up to its own budget, in insertion order
+2. Characters left over from short segments are handed to segments that were cut, in insertion order
+3. Only the budgeted slices are copied into the prompt string - full page texts are never duplicated
+4. render(max_chars, labels=...) renders a subset, e.g. the subpages of the current extraction batch
+
+Memory:
+1. Page strings are shared with the fetch registry, so a perk with many large subpages keeps one copy of each page
+2. The prompt is at most max_chars, whatever the size of the crawled site
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+SEGMENT_SEPARATOR = "\n\n"
+
+
+class Segment:
+    """
+    One page (or search result) of a document, held by reference.
+    """
+
+    __slots__ = ("label", "text", "budget", "header")
+
+    def __init__(self, label: str, text: str, budget: int, header: str = ""):
+        self.label = label
+        self.text = text
+        self.budget = budget
+        self.header = header
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+
+class Document:
+    """
+    Ordered collection of segments that is materialized only up to a character budget.
+    """
+
+    def __init__(self):
+        self.segments: Dict[str, Segment] = {}
+
+    def add(self, label: str, text: Optional[str], budget: int, header: str = "") -> Optional[Segment]:
+        """
+        Add a page to the document (empty texts are ignored).
+
+        Args:
+            label: Unique key of the segment, e.g. the page URL
+            text: Page text (kept by reference)
+            budget: Characters of this segment guaranteed a place in the rendered prompt
+            header: Line printed above the segment, e.g. "--- CONTENT FROM SUBPAGE: <url> ---"
+
+        Returns:
+            The added segment, or None for empty text
+        """
+        if not text:
+            return None
+        segment = Segment(label, text, budget, header)
+        self.segments[label] = segment
+        return segment
+
+    def __contains__(self, label: str) -> bool:
+        return label in self.segments
+
+    def __len__(self) -> int:
+        return len(self.segments)
+
+    def get(self, label: str) -> Optional[Segment]:
+        return self.segments.get(label)
+
+    def labels(self) -> List[str]:
+        return list(self.segments)
+
+    def total_chars(self) -> int:
+        return sum(len(segment) for segment in self.segments.values())
+
+    def allocate(self, max_chars: int, labels: Optional[Iterable[str]] = None) -> List[Tuple[Segment, int]]:
+        """
+        Split max_chars across segments.
+
+        Returns:
+            (segment, chars) pairs in render order
+        """
+        segments = [self.segments[label] for label in labels if label in self.segments] if labels is not None \
+            else list(self.segments.values())
+        remaining = max_chars - sum(len(segment.header) + len(SEGMENT_SEPARATOR) for segment in segments)
+
+        # first pass: every segment gets up to its own budget
+        allocation = []
+        for segment in segments:
+            chars = max(0, min(len(segment), segment.budget, remaining))
+            allocation.append(chars)
+            remaining -= chars
+
+        # second pass: leftovers go to segments that were cut, in order
+        for idx, segment in enumerate(segments):
+            if remaining <= 0:
+                break
+            extra = min(len(segment) - allocation[idx], remaining)
+            allocation[idx] += extra
+            remaining -= extra
+
+        return list(zip(segments, allocation))
+
+    def render(self, max_chars: int, labels: Optional[Iterable[str]] = None) -> str:
+        """
+        Materialize the budgeted prompt text.
+
+        Args:
+            max_chars: Maximum length of the returned text
+            labels: Optional subset of segment labels, rendered in the given order
+
+        Returns:
+            The segment headers and budgeted text slices joined together
+        """
+        parts = []
+        for segment, chars in self.allocate(max_chars, labels):
+            if chars <= 0:
+                continue
+            parts.append(f"{segment.header}{segment.text[:chars]}" if segment.header else segment.text[:chars])
+        return SEGMENT_SEPARATOR.join(parts)
@@ -0,0 +1,149 @@
+"""INFORMATION:
+Run-scoped registry that shares fetch and extraction results between perks.
+
+URL normalization:
+1. http and https are treated as the same page, host is lower-cased, default ports are dropped
+2. Fragments, trailing slashes and tracking parameters (utm_*, gclid, fbclid, ref, ...) are removed
+3. Remaining query parameters are sorted, so ?a=1&b=2 and ?b=2&a=1 share one entry
+
+Coalescing:
+1. Results are keyed by (kind, normalized URL), e.g. ("selenium_text", "https://aws.amazon.com/activate")
+2. The first caller runs the loader; callers that ask for the same key while it runs wait for that result
+3. Completed results (including failures) are reused for the rest of the run, so every unique page is
+   downloaded and cleaned once per run
+4. memo() shares any other result the same way, e.g. an LLM extraction keyed by a hash of the page text
+
+Lifetime:
+1. `fetch_registry.reset()` at the start of a run drops everything from the previous run
+2. Hits and misses are counted in src.metrics ("fetch_registry_hits" / "fetch_registry_misses", by kind)
+3. `fetch_registry.enabled = False` runs every loader (cache mode "off" in src/run_config.py)
+"""
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+from src.metrics import incr
+
+TRACKING_PARAMS = {"gclid", "fbclid", "msclkid", "dclid", "ref", "ref_src", "mc_cid", "mc_eid", "_ga", "_gl", "hsctatracking", "igshid"}
+TRACKING_PREFIXES = ("utm_", "pk_", "hsa_")
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form of a URL for deduplication.
+
+    Args:
+        url: Any absolute URL
+
+    Returns:
+        The normalized URL (unparseable input is returned stripped)
+    """
+    url = (url or "").strip()
+    try:
+        parsed = urlparse(url)
+    except ValueError:
+        return url
+    if parsed.scheme not in DEFAULT_PORTS or not parsed.hostname:
+        return url
+
+    host = parsed.hostname.lower()
+    if parsed.port and parsed.port != DEFAULT_PORTS[parsed.scheme]:
+        host = f"{host}:{parsed.port}"
+
+    path = parsed.path.rstrip("/") or "/"
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    return urlunparse(("https", host, path, "", urlencode(query), ""))
+
+
+class FetchRegistry:
+    """
+    Thread-safe memo of in-flight and completed results for one updater run.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._results: Dict[Tuple[str, str], Future] = {}
+        self.enabled = True
+
+    def reset(self):
+        with self._lock:
+            self._results = {}
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def _claim(self, kind: str, key: str) -> Tuple[Future, bool]:
+        with self._lock:
+            future = self._results.get((kind, key))
+            owner = future is None
+            if owner:
+                future = Future()
+                self._results[(kind, key)] = future
+        incr("fetch_registry_misses" if owner else "fetch_registry_hits", kind=kind)
+        return future, owner
+
+    def memo(self, kind: str, key: str, loader: Callable[[], Any]) -> Any:
+        """
+        Return the result for (kind, key), running loader only if no caller has done so in this run.
+
+        Args:
+            kind: Result type, e.g. "selenium_text", "subpages", "extract_with_gpt"
+            key: Already-normalized key
+            loader: Zero-argument function producing the result
+
+        Returns:
+            The loader's result (exceptions are re-raised to every waiting caller)
+        """
+        if not self.enabled:
+            incr("fetch_registry_misses", kind=kind)
+            return loader()
+        future, owner = self._claim(kind, key)
+        if not owner:
+            return future.result()
+
+        try:
+            future.set_result(loader())
+        except BaseException as e:
+            future.set_exception(e)
+        return future.result()
+
+    async def amemo(self, kind: str, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Async version of memo(): loader is a coroutine function, waiting callers do not block the event loop.
+        Shares its entries with memo(), so sync and async callers coalesce on the same results.
+        """
+        if not self.enabled:
+            incr("fetch_registry_misses", kind=kind)
+            return await loader()
+        future, owner = self._claim(kind, key)
+        if not owner:
+            return await asyncio.wrap_future(future)
+
+        try:
+            future.set_result(await loader())
+        except BaseException as e:
+            future.set_exception(e)
+        return future.result()
+
+    def fetch(self, kind: str, url: str, loader: Callable[[str], Any]) -> Any:
+        """
+        Fetch a page once per run.
+
+        Args:
+            kind: Fetch method, e.g. "selenium_text" or "requests_text"
+            url: URL to fetch (normalized for the key)
+            loader: Function called with the original URL on a miss
+
+        Returns:
+            The (possibly shared) loader result
+        """
+        return self.memo(kind, normalize_url(url), lambda: loader(url))
+
+
+fetch_registry = FetchRegistry()
@@ -7,7 +7,7 @@ Scraping Detection:
 3. Automatically returns "Blocked" for all fields if blocking is detected
 
 Information Extraction:
-1. Uses GPT-4o to analyze text content when not blocked
+1. Uses gpt-4o-mini to analyze text content when not blocked, escalating to gpt-4o on low confidence (see src/model_router.py)
 2. Extracts four specific fields:
 
 Provider description (brief company overview)
@@ -18,27 +18,32 @@ Provider description (brief company overview)
 Prompt Engineering:
 1. Uses a carefully structured prompt with explicit field definitions
 2. Includes clear instructions to avoid inventing missing information
-3. Specifies the exact JSON output format required
+3. The output format is enforced by a JSON schema (structured outputs, see src/structured.py)
+
+Async:
+1. agpt_extract_info() runs the same extraction on the shared AsyncOpenAI client (src/async_clients.py),
+   so the updater can keep many extractions in flight
 
 Error Handling:
-1. Uses regex to extract JSON from GPT's response
-2. Returns uniform error messages if JSON parsing fails
+1. Schema-constrained, streamed output - no regex JSON scraping
+2. Truncated responses are repaired; missing fields become "Not found"
 3. Maintains consistent output structure even when errors occur
 
 Data Validation:
-1. Ensures missing information is marked with "Not found"
+1. Ensures missing information is marked with "Not found"; a missing Value is filled from the page text by src/money.py
 2. Maintains consistent output formatting for downstream processing
 3. Uses low temperature (0.2) for more deterministic responses
 """
-import re
-import json
-from openai import OpenAI
-import config
-
-client = OpenAI(api_key=config.OPENAI_API_KEY)
+from src.structured import extract_fields, aextract_fields
+from src.model_router import route, aroute
+from src.async_clients import openai_client, async_openai
+from src.money import fill_value
+from src.fetch_registry import fetch_registry
+from src.dedup import page_index
+from src.state_store import content_hash
 
 
-def gpt_extract_info(text):
+def _placeholder(text):
     # Handle case when text is None
     if text is None:
         return {
@@ -61,57 +66,68 @@ def gpt_extract_info(text):
             "How to get it": "Blocked",
             "Value": "Blocked"
         }
+    return None
+
+
+def gpt_extract_info(text, model=None):
+    placeholder = _placeholder(text)
+    if placeholder:
+        return placeholder
+
+    # identical page text (e.g. two perks on the same landing page) is only sent once per run and model,
+    # near-identical text (same provider page with a different banner) reuses the earlier extraction
+    # a Value the LLM missed is filled from rule-based matches on the page before confidence is scored
+    def extract(model_id):
+        key = f"{model_id}:{content_hash(text)}"
+        return fill_value(dict(fetch_registry.memo("gpt_extract_info", key, lambda: page_index.reuse(
+            f"gpt_extract_info:{model_id}", text, lambda: _gpt_extract_info(text, model_id)
+        ))), text)
+
+    # cheap model first, escalated to the strong model only if the result is uncertain
+    return extract(model) if model else route(extract, stage="gpt_extract_info", text=text)
+
+
+async def agpt_extract_info(text, model=None):
+    """
+    Async version of gpt_extract_info() on the shared AsyncOpenAI client, for fanning out many perks at once.
+    Shares the run's memo and near-duplicate index with the sync version.
+    """
+    placeholder = _placeholder(text)
+    if placeholder:
+        return placeholder
+
+    async def extract(model_id):
+        key = f"{model_id}:{content_hash(text)}"
+        return fill_value(dict(await fetch_registry.amemo("gpt_extract_info", key, lambda: page_index.areuse(
+            f"gpt_extract_info:{model_id}", text,
+            lambda: aextract_fields(async_openai(), model_id, _prompt(text), stage="gpt_extract_info")
+        ))), text)
 
-    prompt = f"""
+    return await extract(model) if model else await aroute(extract, stage="gpt_extract_info", text=text)
+
+
+def _prompt(text):
+    return f"""
 You are an information extraction assistant.
 
 Given the text below, extract the following fields:
 
-- "Provider Description": A very brief (1-2 sentences) description of the company or organization offering the perk.
-- "What You Get": Summarize clearly what the perk provides (discount, credits, service, etc.).
-- "How To Get It": Instructions on how someone can claim or access the perk.
-- "Money Value": The financial value of the perk (in USD or EUR if available). If no value is clear, return "Not found".
+- "Brief description of the provider": A very brief (1-2 sentences) description of the company or organization offering the perk.
+- "What you get": Summarize clearly what the perk provides (discount, credits, service, etc.).
+- "How to get it": Instructions on how someone can claim or access the perk.
+- "Value": The financial value of the perk (in USD or EUR if available).
 
 **Important rules**:
 - Do not invent missing information.
 - If a field cannot be found, respond exactly with "Not found".
-- Output only valid JSON, no commentary.
 
 Text to analyze:
 \"\"\"
 {text}
 \"\"\"
-
-Respond in this exact JSON format:
-{{
-    "Brief description of the provider": "",
-    "What you get": "",
-    "How to get it": "",
-    "Value": ""
-}}
 """
 
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.2
-    )
-    
-    content = response.choices[0].message.content.strip()
-    
-    # Extract the JSON part only
-    try:
-        json_str = re.search(r"\{.*\}", content, re.DOTALL).group()
-        extracted = json.loads(json_str)
-    except Exception as e:
-        print(f"⚠️ Parsing error: {e}")
-        extracted = {
-            "Brief description of the provider": "Error parsing",
-            "What you get": "Error parsing",
-            "How to get it": "Error parsing",
-            "Value": "Error parsing"
-        }
-    
-    return extracted
\ No newline at end of file
+
+def _gpt_extract_info(text, model):
+    # schema-constrained output, no JSON scraping needed
+    return extract_fields(openai_client(), model, _prompt(text), stage="gpt_extract_info")
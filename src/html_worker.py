@@ -0,0 +1,185 @@
+"""INFORMATION:
+Process-pool stage for CPU-bound HTML parsing and text cleaning.
+
+Why:
+1. BeautifulSoup parsing, script/style removal, the whitespace cleanup and 404 tree walks are pure Python and hold the GIL
+2. With many perks fetched concurrently (src/async_clients.py), parsing on the fetch threads becomes the bottleneck
+
+Worker (parse_html, runs in a child process):
+1. Takes the raw HTML - str (Selenium page_source, already decoded) or bytes with the HTTP response encoding;
+   plain strings and bytes are cheap to send to a process, soup trees are never pickled
+2. Parses once and returns only plain results: cleaned text, content blocks (h1/h2/p/li), links with anchor text
+   and page region, and the fake-404 check
+3. Text cleanup is the same as before: scripts and styles removed, whitespace and double-space chunks collapsed
+
+Pool (html_pool):
+1. Started on first use with HTML_WORKERS processes (default: number of cores, 0 parses inline)
+2. Pages smaller than INLINE_MAX_BYTES are parsed inline - sending them would cost more than parsing them
+3. A crashed pool is dropped and the page is parsed inline, so a worker failure never loses a page
+4. parse() blocks the calling (fetch) thread, aparse() awaits the result without blocking the event loop
+"""
+import asyncio
+import atexit
+import functools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional, Union
+
+from src.metrics import incr
+from src.settings import setting
+
+HTML_WORKERS = setting("HTML_WORKERS", os.cpu_count() or 1)
+INLINE_MAX_BYTES = 16_000
+ERROR_WORDS = ["404", "page not found", "not found", "error"]
+ERROR_CLASSES = ["error-page", "not-found", "404"]
+
+
+def _clean_text(soup) -> str:
+    # Remove script and style elements
+    for script in soup(["script", "style"]):
+        script.decompose()
+
+    # Get text
+    text = soup.get_text(separator=' ', strip=True)
+
+    # Clean up text - remove extra whitespace
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return ' '.join(chunk for chunk in chunks if chunk)
+
+
+def _is_fake_404(soup) -> bool:
+    # Check <title>
+    if soup.title and any(word in soup.title.text.lower() for word in ERROR_WORDS):
+        return True
+
+    # Check main heading
+    h1 = soup.find("h1")
+    if h1 and any(word in h1.text.lower() for word in ERROR_WORDS):
+        return True
+
+    # Check for known error container divs/classes
+    for keyword in ERROR_CLASSES:
+        if soup.find(class_=lambda x: x and keyword in x):
+            return True
+    return False
+
+
+def parse_html(html: Union[str, bytes], encoding: Optional[str] = None, text: bool = False, blocks: bool = False,
+               links: bool = False, fake_404: bool = False) -> Dict[str, Any]:
+    """
+    Parse one page and return the requested results (runs in a worker process).
+
+    Args:
+        html: Page HTML, decoded (str) or raw (bytes)
+        encoding: Encoding of raw bytes (e.g. response.encoding); None lets BeautifulSoup detect it
+        text: Cleaned full text (scripts and styles removed, whitespace collapsed)
+        blocks: Text of the h1, h2, p and li elements, one per line
+        links: (href, anchor text, region) of every <a href>, region "nav", "header", "footer" or "main"
+        fake_404: Whether the page is an error page served with status 200
+
+    Returns:
+        Dict with the requested keys
+    """
+    from bs4 import BeautifulSoup
+    # decoded text is parsed as-is: re-encoding it would let a <meta charset> garble it
+    if isinstance(html, str):
+        soup = BeautifulSoup(html, 'html.parser')
+    else:
+        soup = BeautifulSoup(html, 'html.parser', from_encoding=encoding)
+    result: Dict[str, Any] = {}
+
+    # checks that read the whole tree go before the text cleanup, which removes elements
+    if fake_404:
+        result["fake_404"] = _is_fake_404(soup)
+    if blocks:
+        result["blocks"] = "\n".join(t.get_text(strip=True) for t in soup.find_all(['h1', 'h2', 'p', 'li']))
+    if links:
+        result["links"] = []
+        for link in soup.find_all('a', href=True):
+            parent = link.find_parent(['nav', 'header', 'footer'])
+            result["links"].append((link['href'], link.get_text(" ", strip=True), parent.name if parent else "main"))
+    if text:
+        result["text"] = _clean_text(soup)
+    return result
+
+
+class HtmlPool:
+    """
+    Lazily started process pool for parse_html().
+    """
+
+    def __init__(self, workers: int = HTML_WORKERS):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a process that runs fetch threads and an event loop is not safe
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    def _inline(self, data: Union[str, bytes]) -> bool:
+        return self.workers <= 0 or len(data) < INLINE_MAX_BYTES
+
+    def _reset(self, error: Exception):
+        print(f"HTML worker pool failed ({error}) - parsing inline")
+        incr("html_pool_failures")
+        with self._lock:
+            self._executor = None
+
+    def parse(self, html: Optional[Union[str, bytes]], encoding: Optional[str] = None, **options) -> Dict[str, Any]:
+        """
+        Parse a page in the pool (or inline for small pages).
+
+        Args:
+            html: Page HTML as str or bytes
+            encoding: Encoding of bytes input (e.g. response.encoding)
+            **options: Results to compute, see parse_html()
+
+        Returns:
+            The parse_html() result
+        """
+        data = html or ""
+        if self._inline(data):
+            incr("html_parsed", mode="inline")
+            return parse_html(data, encoding, **options)
+        try:
+            result = self._pool().submit(parse_html, data, encoding, **options).result()
+            incr("html_parsed", mode="pool")
+            return result
+        except BrokenProcessPool as e:
+            self._reset(e)
+            return parse_html(data, encoding, **options)
+
+    async def aparse(self, html: Optional[Union[str, bytes]], encoding: Optional[str] = None, **options) -> Dict[str, Any]:
+        """
+        Async version of parse() for event-loop callers.
+        """
+        data = html or ""
+        if self._inline(data):
+            incr("html_parsed", mode="inline")
+            return parse_html(data, encoding, **options)
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._pool(), functools.partial(parse_html, data, encoding, **options))
+            incr("html_parsed", mode="pool")
+            return result
+        except BrokenProcessPool as e:
+            self._reset(e)
+            return parse_html(data, encoding, **options)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+
+
+html_pool = HtmlPool()
+atexit.register(html_pool.shutdown)
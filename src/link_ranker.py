@@ -0,0 +1,159 @@
+"""INFORMATION:
+Link-relevance ranking for subpage discovery.
+
+Features per link:
+1. Anchor text tokens ("a:credits")
+2. URL path tokens ("p:startups")
+3. Page region the link sits in ("r:nav", "r:footer", "r:main") and its relative DOM position ("pos:top", "pos:bottom")
+4. Path depth ("depth:2")
+
+Score:
+1. A fixed prior: perk-like words ("startup", "credits", "perks", ...) score up, boilerplate ("careers", "privacy", ...) scores down
+2. Plus a learned weight per feature: log-odds of "this page contributed fields" over every subpage crawled in past runs
+3. Every same-domain link is scored before the top-K is cut, so relevant pages deep in the DOM are not lost
+
+Feedback:
+1. extract_perk_info() reports, for each crawled subpage, whether it filled any missing field
+2. Feature counts are persisted to a JSON file (temp file + os.replace), so ranking improves from run to run
+3. `link_ranker.persist = False` keeps the counts in memory only (dry runs, see src/run_config.py)
+"""
+import json
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+PRIOR_WEIGHTS = {
+    "perk": 3.0, "perks": 3.0, "benefit": 2.0, "benefits": 2.0, "startup": 3.0, "startups": 3.0,
+    "credit": 2.5, "credits": 2.5, "discount": 2.5, "discounts": 2.5, "offer": 2.0, "offers": 2.0,
+    "deal": 2.0, "deals": 2.0, "promo": 1.5, "special": 1.0, "reward": 1.5, "rewards": 1.5,
+    "program": 2.0, "programs": 2.0, "programme": 2.0, "founders": 1.5, "accelerator": 1.5,
+    "partner": 1.0, "partners": 1.0, "pricing": 1.0, "apply": 1.5, "eligibility": 2.0, "faq": 0.5,
+    "careers": -3.0, "jobs": -3.0, "job": -3.0, "blog": -1.5, "press": -2.0, "news": -1.5,
+    "privacy": -3.0, "terms": -3.0, "legal": -3.0, "cookie": -3.0, "cookies": -3.0, "imprint": -3.0,
+    "impressum": -3.0, "login": -2.5, "signin": -2.5, "signup": -1.0, "status": -2.0, "investors": -2.0,
+}
+REGION_PRIOR = {"r:main": 0.5, "r:nav": 0.0, "r:header": 0.0, "r:footer": -1.0}
+LEARNING_RATE = 0.5
+MIN_TOKEN_LENGTH = 2
+MAX_TRACKED_LINKS = 10_000  # ranked links whose features are kept for feedback (perks sharing a page reuse them)
+
+Link = Tuple[str, str, Optional[str], float]  # (url, anchor text, region, relative position 0-1)
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in re.split(r"[^a-z0-9]+", (text or "").lower()) if len(token) >= MIN_TOKEN_LENGTH]
+
+
+def link_features(url: str, anchor: str = "", region: Optional[str] = None, position: Optional[float] = None) -> List[str]:
+    """
+    Args:
+        url: Absolute link URL
+        anchor: Visible anchor text
+        region: "nav", "header", "footer" or "main" (None if unknown, e.g. sitemap entries)
+        position: Relative DOM position, 0 = first link on the page, 1 = last
+
+    Returns:
+        Feature names of the link
+    """
+    path = urlparse(url).path
+    features = [f"a:{token}" for token in set(tokenize(anchor))]
+    features += [f"p:{token}" for token in set(tokenize(path))]
+    features.append(f"depth:{min(len([part for part in path.split('/') if part]), 4)}")
+    if region:
+        features.append(f"r:{region}")
+    if position is not None:
+        features.append("pos:top" if position < 0.2 else "pos:bottom" if position > 0.8 else "pos:mid")
+    return features
+
+
+class LinkRanker:
+    """
+    Scores links with a keyword prior plus feature weights learned from past crawl outcomes.
+    """
+
+    def __init__(self, path: str = "link_ranker.json"):
+        self.path = path
+        self.stats: Dict[str, List[int]] = {}  # feature -> [contributed, not contributed]
+        # features of the links returned by rank(), for feedback; oldest dropped beyond MAX_TRACKED_LINKS
+        self._features: "OrderedDict[str, List[str]]" = OrderedDict()
+        self._lock = threading.Lock()  # feedback runs on the event loop while save() runs in a worker thread
+        self._save_lock = threading.Lock()
+        self.persist = True
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self.stats = json.load(f)
+            except ValueError as e:
+                print(f"WARNING: Ignoring unreadable link ranker state {path}: {e}")
+
+    def _prior(self, feature: str) -> float:
+        kind, _, value = feature.partition(":")
+        if kind in ("a", "p"):
+            return PRIOR_WEIGHTS.get(value, 0.0)
+        return REGION_PRIOR.get(feature, 0.0)
+
+    def _learned(self, feature: str) -> float:
+        hits, misses = self.stats.get(feature, (0, 0))
+        return LEARNING_RATE * math.log((hits + 1) / (misses + 1))
+
+    def _score(self, features: List[str]) -> float:
+        return sum(self._prior(feature) + self._learned(feature) for feature in features)
+
+    def score(self, url: str, anchor: str = "", region: Optional[str] = None, position: Optional[float] = None) -> float:
+        return self._score(link_features(url, anchor, region, position))
+
+    def rank(self, links: Iterable[Link], top_k: int) -> List[str]:
+        """
+        Score every candidate link and keep the best top_k.
+
+        Args:
+            links: (url, anchor, region, position) tuples; duplicate URLs keep their best score
+            top_k: Number of URLs to return
+
+        Returns:
+            URLs ordered by descending score
+        """
+        best: Dict[str, Tuple[float, List[str]]] = {}
+        for url, anchor, region, position in links:
+            features = link_features(url, anchor, region, position)
+            link_score = self._score(features)
+            if url not in best or link_score > best[url][0]:
+                best[url] = (link_score, features)
+        ranked = sorted(best, key=lambda url: best[url][0], reverse=True)[:top_k]
+
+        # only the returned links are crawled and reported back
+        with self._lock:
+            for url in ranked:
+                self._features[url] = best[url][1]
+                self._features.move_to_end(url)
+            while len(self._features) > MAX_TRACKED_LINKS:
+                self._features.popitem(last=False)
+        return ranked
+
+    def feedback(self, url: str, contributed: bool):
+        """
+        Record whether a crawled subpage filled any missing field.
+        """
+        with self._lock:
+            features = self._features.get(url) or link_features(url)
+            for feature in features:
+                counts = self.stats.setdefault(feature, [0, 0])
+                counts[0 if contributed else 1] += 1
+
+    def save(self):
+        if not self.persist:
+            return
+        with self._lock:
+            data = json.dumps(self.stats)
+        with self._save_lock:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+
+
+link_ranker = LinkRanker()
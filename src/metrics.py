@@ -0,0 +1,212 @@
+"""INFORMATION:
+Lightweight timers and counters for the perks updater pipeline.
+
+Stages:
+1. fetch      - HTTP / Selenium page downloads (label: domain)
+2. parse      - HTML parsing and text cleanup (label: domain)
+3. llm        - OpenAI chat completions (labels: provider, model)
+4. search     - Perplexity searches (label: provider)
+5. airtable   - Airtable reads and writes (label: operation)
+
+Usage:
+1. Wrap a block with `with timer("fetch", domain="aws.amazon.com"):`
+2. Bump a counter with `incr("pages_scraped", domain="aws.amazon.com")`
+3. Call `print_summary()` at the end of a run
+4. Export with `to_json()` or `to_prometheus()` for dashboards / node exporters
+"""
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Tuple
+from urllib.parse import urlparse
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items() if value is not None))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def domain_label(url: str) -> str:
+    """
+    Returns:
+        The host part of a URL without "www.", used as the `domain` label
+    """
+    if not url:
+        return "unknown"
+    netloc = urlparse(url if "//" in url else f"//{url}").netloc.lower()
+    return netloc[4:] if netloc.startswith("www.") else netloc or "unknown"
+
+
+class Metrics:
+    """
+    Thread-safe registry of named timers and counters with string labels.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timers: Dict[Tuple[str, LabelKey], Dict[str, float]] = {}
+        self._counters: Dict[Tuple[str, LabelKey], float] = {}
+        self.started_at = time.time()
+
+    def reset(self):
+        with self._lock:
+            self._timers.clear()
+            self._counters.clear()
+            self.started_at = time.time()
+
+    def observe(self, stage: str, seconds: float, **labels):
+        """
+        Record one timed observation for a stage.
+
+        Args:
+            stage: Name of the pipeline stage (fetch, parse, llm, search, airtable)
+            seconds: Duration of the observation
+            **labels: Extra labels such as domain or provider
+        """
+        key = (stage, _label_key(labels))
+        with self._lock:
+            entry = self._timers.setdefault(key, {"count": 0, "total": 0.0, "max": 0.0})
+            entry["count"] += 1
+            entry["total"] += seconds
+            entry["max"] = max(entry["max"], seconds)
+
+    def incr(self, name: str, amount: float = 1, **labels):
+        """
+        Increment a counter.
+
+        Args:
+            name: Counter name
+            amount: Increment (defaults to 1)
+            **labels: Extra labels such as domain or provider
+        """
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    @contextmanager
+    def timer(self, stage: str, **labels) -> Iterator[None]:
+        """
+        Time the wrapped block; failures are counted as `<stage>_errors`.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.incr(f"{stage}_errors", **labels)
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - start, **labels)
+
+    def snapshot(self) -> Dict[str, list]:
+        """
+        Returns:
+            A JSON-serialisable copy of all timers and counters
+        """
+        with self._lock:
+            timers = [
+                {"stage": stage, "labels": dict(labels), **entry}
+                for (stage, labels), entry in self._timers.items()
+            ]
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in self._counters.items()
+            ]
+        return {
+            "started_at": self.started_at,
+            "elapsed": time.time() - self.started_at,
+            "timers": timers,
+            "counters": counters,
+        }
+
+    def to_json(self, indent: int = 2) -> str:
+        return json.dumps(self.snapshot(), indent=indent)
+
+    def to_prometheus(self, prefix: str = "perks_updater") -> str:
+        """
+        Render all metrics in the Prometheus text exposition format.
+        """
+        def fmt_labels(labels: Dict[str, str]) -> str:
+            if not labels:
+                return ""
+            body = ",".join(
+                f'{key}="{_escape(value)}"' for key, value in sorted(labels.items())
+            )
+            return "{" + body + "}"
+
+        snapshot = self.snapshot()
+        lines = [
+            f"# TYPE {prefix}_stage_seconds summary",
+        ]
+        for timer in snapshot["timers"]:
+            labels = {"stage": timer["stage"], **timer["labels"]}
+            lines.append(f"{prefix}_stage_seconds_sum{fmt_labels(labels)} {timer['total']:.6f}")
+            lines.append(f"{prefix}_stage_seconds_count{fmt_labels(labels)} {timer['count']}")
+            lines.append(f"{prefix}_stage_seconds_max{fmt_labels(labels)} {timer['max']:.6f}")
+
+        lines.append(f"# TYPE {prefix}_events_total counter")
+        for counter in snapshot["counters"]:
+            labels = {"name": counter["name"], **counter["labels"]}
+            lines.append(f"{prefix}_events_total{fmt_labels(labels)} {counter['value']}")
+
+        return "\n".join(lines) + "\n"
+
+    def summary_lines(self, top: int = 10):
+        """
+        Human-readable end-of-run summary: totals per stage, then the slowest labelled timers.
+        """
+        snapshot = self.snapshot()
+        per_stage: Dict[str, Dict[str, float]] = {}
+        for timer in snapshot["timers"]:
+            entry = per_stage.setdefault(timer["stage"], {"count": 0, "total": 0.0})
+            entry["count"] += timer["count"]
+            entry["total"] += timer["total"]
+
+        lines = [f"Run time: {snapshot['elapsed']:.1f}s"]
+        for stage, entry in sorted(per_stage.items(), key=lambda item: -item[1]["total"]):
+            avg = entry["total"] / entry["count"] if entry["count"] else 0
+            lines.append(f"  {stage:<10} {entry['total']:>9.1f}s  calls={entry['count']:<5} avg={avg:.2f}s")
+
+        hot_spots = sorted(snapshot["timers"], key=lambda t: -t["total"])[:top]
+        if hot_spots:
+            lines.append("Hot spots:")
+            for timer in hot_spots:
+                labels = ", ".join(f"{k}={v}" for k, v in timer["labels"].items())
+                lines.append(f"  {timer['stage']:<10} {timer['total']:>9.1f}s  {labels}")
+
+        if snapshot["counters"]:
+            lines.append("Counters:")
+            for counter in sorted(snapshot["counters"], key=lambda c: (c["name"], sorted(c["labels"].items()))):
+                labels = ", ".join(f"{k}={v}" for k, v in counter["labels"].items())
+                suffix = f" ({labels})" if labels else ""
+                lines.append(f"  {counter['name']}{suffix}: {counter['value']:g}")
+        return lines
+
+    def print_summary(self):
+        print(f"\n{'-' * 75}\nRun metrics\n{'-' * 75}")
+        for line in self.summary_lines():
+            print(line)
+
+    def export(self, json_path: str = None, prometheus_path: str = None):
+        """
+        Write the metrics to disk in JSON and/or Prometheus text format.
+        """
+        if json_path:
+            with open(json_path, "w") as f:
+                f.write(self.to_json())
+        if prometheus_path:
+            with open(prometheus_path, "w") as f:
+                f.write(self.to_prometheus())
+
+
+# Default process-wide registry used by the updater modules
+metrics = Metrics()
+timer = metrics.timer
+incr = metrics.incr
+observe = metrics.observe
+print_summary = metrics.print_summary
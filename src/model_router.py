@@ -0,0 +1,158 @@
+"""INFORMATION:
+Model tiering for perk extraction: a small, fast model first, gpt-4o only for uncertain results.
+
+Routing:
+1. Every extraction runs on CHEAP_MODEL (default gpt-4o-mini)
+2. The same prompt is re-run on STRONG_MODEL only for a reason the stronger model can fix
+3. Both calls are recorded in the usage ledger, escalations are counted in src.metrics ("model_escalations", by reason)
+4. Inside a `with track_models() as models:` block, the model that produced each routed result is listed in
+   `models`, so a caller does not re-run text the router already sent to STRONG_MODEL
+
+Escalation reasons:
+1. "repaired" - the cheap model's output was truncated or broken and had to be repaired (src/structured.py)
+2. "disagreement" - "What you get" / "Value" disagree with the other scraping method, when its result is available
+3. "missing_value" - no Value although the text contains a perk amount (src/money.py)
+Fields that are simply missing are not a reason: a page that does not mention them will not gain them from a
+bigger model. Partial-page extractions (subpage batches) pass escalate=False and always stay on the cheap model.
+
+Configuration (config.py, all optional):
+1. CHEAP_MODEL / STRONG_MODEL; set CHEAP_MODEL = STRONG_MODEL to disable tiering
+2. Read through src/settings.py, so environment variables work without a config.py (scrape_analyze.py)
+"""
+import contextvars
+import re
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Dict, Iterator, List, Optional
+
+from src.settings import setting
+from src.completeness import field_filled
+from src.metrics import incr
+from src.money import best_money, MIN_CONFIDENCE
+from src.structured import track_repairs
+
+CHEAP_MODEL = setting("CHEAP_MODEL", "gpt-4o-mini")
+STRONG_MODEL = setting("STRONG_MODEL", "gpt-4o")
+MIN_AGREEMENT = 0.2  # word overlap of "What you get" below which the two methods disagree
+
+_models: contextvars.ContextVar[Optional[List[str]]] = contextvars.ContextVar("routed_models", default=None)
+
+
+@contextmanager
+def track_models() -> Iterator[List[str]]:
+    """
+    Collect the model that produced each route()/aroute() result inside the block (same thread or asyncio task).
+    """
+    models: List[str] = []
+    token = _models.set(models)
+    try:
+        yield models
+    finally:
+        _models.reset(token)
+
+
+def _routed(model: str):
+    models = _models.get()
+    if models is not None:
+        models.append(model)
+
+
+def _words(text) -> set:
+    return {word for word in re.findall(r"\w+", str(text or "").lower()) if len(word) > 3 or word.isdigit()}
+
+
+def _amounts(text) -> set:
+    return {amount.replace(",", "") for amount in re.findall(r"\d[\d,.]*", str(text or ""))}
+
+
+def agreement(fields: Dict, other: Dict) -> Optional[float]:
+    """
+    Compare two extractions of the same perk.
+
+    Returns:
+        0.0 - 1.0 (None if either side has nothing to compare)
+    """
+    if not field_filled("What you get", fields.get("What you get")) or \
+            not field_filled("What you get", other.get("What you get")):
+        return None
+    words, other_words = _words(fields["What you get"]), _words(other["What you get"])
+    score = len(words & other_words) / max(len(words | other_words), 1)
+
+    amounts, other_amounts = _amounts(fields.get("Value")), _amounts(other.get("Value"))
+    if amounts and other_amounts:
+        score = (score + (1.0 if amounts & other_amounts else 0.0)) / 2
+    return score
+
+
+def escalation_reason(fields: Dict, other: Optional[Dict] = None, text: Optional[str] = None,
+                      repaired: bool = False) -> Optional[str]:
+    """
+    Decide whether the strong model could improve an extraction.
+
+    Args:
+        fields: Extraction with the four perk fields
+        other: Extraction of the same perk by the other method, if available
+        text: Text the extraction was made from, for the missing-Value check
+        repaired: The output had to be repaired
+
+    Returns:
+        "repaired", "disagreement" or "missing_value", or None to keep the result
+    """
+    if repaired:
+        return "repaired"
+    if other:
+        agreed = agreement(fields, other)
+        if agreed is not None and agreed < MIN_AGREEMENT:
+            return "disagreement"
+    if text and not field_filled("Value", fields.get("Value")):
+        money = best_money(text, page=True)
+        if money and money.confidence >= MIN_CONFIDENCE:
+            return "missing_value"
+    return None
+
+
+def needs_escalation(fields: Dict, other: Optional[Dict] = None, text: Optional[str] = None) -> bool:
+    return CHEAP_MODEL != STRONG_MODEL and escalation_reason(fields, other, text) is not None
+
+
+def _escalate(fields: Dict, stage: str, other: Optional[Dict], text: Optional[str], repaired: bool) -> bool:
+    reason = escalation_reason(fields, other, text, repaired) if CHEAP_MODEL != STRONG_MODEL else None
+    if reason is None:
+        incr("model_routes", caller=stage, model=CHEAP_MODEL)
+        return False
+
+    print(f"Uncertain result ({reason}) from {CHEAP_MODEL} - escalating {stage} to {STRONG_MODEL}")
+    incr("model_escalations", caller=stage, reason=reason)
+    incr("model_routes", caller=stage, model=STRONG_MODEL)
+    return True
+
+
+def route(extract: Callable[[str], Dict], stage: str, other: Optional[Dict] = None, text: Optional[str] = None) -> Dict:
+    """
+    Run an extraction on the cheap model and escalate it to the strong model if uncertain.
+
+    Args:
+        extract: Function running the extraction for a given model id
+        stage: Name used in logs and metrics
+        other: Extraction by the other method, for the agreement check
+        text: Text the extraction is made from, for the missing-Value check
+
+    Returns:
+        The cheap result if nothing calls for the strong model, otherwise the strong model's result
+    """
+    with track_repairs() as repairs:
+        fields = extract(CHEAP_MODEL)
+    model = STRONG_MODEL if _escalate(fields, stage, other, text, bool(repairs)) else CHEAP_MODEL
+    _routed(model)
+    return extract(STRONG_MODEL) if model != CHEAP_MODEL else fields
+
+
+async def aroute(extract: Callable[[str], Awaitable[Dict]], stage: str, other: Optional[Dict] = None,
+                 text: Optional[str] = None) -> Dict:
+    """
+    Async version of route() for coroutine extractors.
+    """
+    with track_repairs() as repairs:
+        fields = await extract(CHEAP_MODEL)
+    model = STRONG_MODEL if _escalate(fields, stage, other, text, bool(repairs)) else CHEAP_MODEL
+    _routed(model)
+    return await extract(STRONG_MODEL) if model != CHEAP_MODEL else fields
@@ -0,0 +1,237 @@
+"""INFORMATION:
+Rule-based extraction of monetary values from text, no LLM involved.
+
+Recognised forms:
+1. Currency symbols and codes before or after the number: "$5,000", "€ 1.500", "5000 USD", "2k EUR", "10 million dollars"
+2. Thousands separators in US and European style: "1,000.50", "1.000,50", "1 000"
+3. Suffixes: "k", "K", "thousand", "M", "mn", "million", "bn", "billion"
+4. Ranges: "$1,000 - $5,000", "$1k to $5k", "between €500 and €2,000"
+5. Upper bounds: "up to $100,000", "as much as $5k"
+6. Credit amounts without a currency ("5,000 credits") are kept with a lower confidence; bare years ("2024 credits") are not
+7. Recurring prices ("$29/month", "€99 per year") are kept below MIN_CONFIDENCE: "Free for 12 months, then $29/month"
+   names a subscription price, not the perk's value
+
+Result (MoneyValue):
+1. amount - normalized number (upper end of a range)
+2. low / high - range bounds (equal for a single amount)
+3. currency - ISO code or None, confidence 0.0 - 1.0, and the matched text
+
+Usage:
+1. parse_money(value) on the LLM's "Value" field replaces the old digit joining ("$1,000 for 12 months" -> 1000, not 100012)
+2. best_money(page_text, page=True) finds the value directly in the scraped page text; on a page only amounts next to
+   a perk keyword (credits, worth, free, ...) reach MIN_CONFIDENCE, so prices and funding rounds are ignored
+3. fill_value(fields, page_text) fills a placeholder "Value" ("Not found", empty) from the page before the extraction
+   is scored, so a perk is not escalated to the stronger model just for its value; answers the LLM gave are kept
+4. combine_perk_dicts() prefers the Value with the most confidently parsed amount
+"""
+import re
+from typing import Dict, List, Optional
+
+from src.completeness import PLACEHOLDERS
+
+CURRENCY_SYMBOLS = {"$": "USD", "us$": "USD", "€": "EUR", "£": "GBP", "chf": "CHF"}
+CURRENCY_CODES = {"usd": "USD", "eur": "EUR", "gbp": "GBP", "chf": "CHF"}
+CURRENCY_WORDS = {"dollar": "USD", "dollars": "USD", "euro": "EUR", "euros": "EUR", "pound": "GBP", "pounds": "GBP"}
+SUFFIXES = {"k": 1e3, "thousand": 1e3, "m": 1e6, "mn": 1e6, "million": 1e6, "bn": 1e9, "billion": 1e9}
+CURRENCY_FORMAT = {"USD": "${}", "EUR": "€{}", "GBP": "£{}", "CHF": "CHF {}"}
+
+MIN_CONFIDENCE = 0.6  # below this a match is not used to fill or write a value
+PAGE_CONFIDENCE = 0.5  # page amounts without a perk keyword nearby (prices, funding rounds) - below MIN_CONFIDENCE
+VALUE_KEYWORDS = ("credit", "worth", "value", "save", "savings", "discount", "free", "grant", "funding", "off")
+_VALUE_CONTEXT = re.compile(r"\b(?:" + "|".join(VALUE_KEYWORDS) + r")(?:s|ed|ing)?\b", re.IGNORECASE)
+_YEAR = re.compile(r"(?:19|20)\d{2}")
+PRICE_CONFIDENCE = 0.4  # amounts followed by a billing period
+_PRICE_MARKER = re.compile(
+    r"\s*(?:/\s*|per\s+|a\s+)(?:month|mo|year|yr|annum|week|user|seat)\b|\s*(?:monthly|annually|yearly)\b",
+    re.IGNORECASE,
+)
+
+_NUMBER = r"\d{1,3}(?:[,.\s]\d{3})+(?:[.,]\d{1,2})?|\d+(?:[.,]\d+)?"
+_SUFFIX = r"(?:k|thousand|mn|million|bn|billion|m)\b"
+_PREFIX_CUR = r"(?:us\$|\$|€|£|chf\b|usd\b|eur\b|gbp\b)"
+_SUFFIX_CUR = r"(?:(?:usd|eur|gbp|chf|dollars?|euros?|pounds?)\b|€|\$)"
+
+
+def _amount_pattern(p: str) -> str:
+    return (
+        rf"(?P<{p}pre>{_PREFIX_CUR})?\s?(?P<{p}num>{_NUMBER})\s?(?P<{p}suf>{_SUFFIX})?"
+        rf"\s?(?P<{p}post>{_SUFFIX_CUR})?"
+    )
+
+
+MONEY_PATTERN = re.compile(
+    r"(?P<upto>up\s+to|as\s+much\s+as|maximum\s+of|max\.?)?\s*(?:between\s+)?"
+    + _amount_pattern("a")
+    + r"(?:\s*(?:-|–|—|to|and)\s*" + _amount_pattern("b") + r")?"
+    + r"(?P<credits>\s*(?:in\s+)?(?:\w+\s+)?credits?\b)?",
+    re.IGNORECASE,
+)
+
+
+class MoneyValue:
+    """
+    A normalized monetary amount found in text.
+    """
+
+    __slots__ = ("amount", "low", "high", "currency", "confidence", "upper_bound", "text")
+
+    def __init__(self, low: float, high: float, currency: Optional[str], confidence: float,
+                 upper_bound: bool = False, text: str = ""):
+        self.low = low
+        self.high = high
+        self.amount = high
+        self.currency = currency
+        self.confidence = confidence
+        self.upper_bound = upper_bound
+        self.text = text
+
+    def __repr__(self) -> str:
+        return f"MoneyValue({self.format()!r}, confidence={self.confidence})"
+
+    def format(self) -> str:
+        """
+        Returns:
+            A normalized display string, e.g. "up to $100,000" or "€1,000 - €5,000"
+        """
+        def fmt(number: float) -> str:
+            text = f"{number:,.0f}" if number.is_integer() else f"{number:,.2f}"
+            return CURRENCY_FORMAT.get(self.currency, "{} credits").format(text)
+
+        if self.low != self.high:
+            return f"{fmt(self.low)} - {fmt(self.high)}"
+        return f"up to {fmt(self.high)}" if self.upper_bound else fmt(self.high)
+
+
+def parse_number(text: str) -> Optional[float]:
+    """
+    Parse a number with US or European separators ("1,000.50", "1.000,50", "1 000").
+    """
+    text = text.replace(" ", "")
+    if "," in text and "." in text:
+        decimal = "," if text.rfind(",") > text.rfind(".") else "."
+        thousands = "." if decimal == "," else ","
+        text = text.replace(thousands, "").replace(decimal, ".")
+    elif "," in text or "." in text:
+        sep = "," if "," in text else "."
+        groups = text.split(sep)
+        if len(groups) > 2 or len(groups[-1]) == 3:
+            text = "".join(groups)  # thousands separator
+        else:
+            text = text.replace(sep, ".")  # decimal separator
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def _currency(*markers: Optional[str]) -> Optional[str]:
+    for marker in markers:
+        if not marker:
+            continue
+        marker = marker.strip().lower()
+        for table in (CURRENCY_SYMBOLS, CURRENCY_CODES, CURRENCY_WORDS):
+            if marker in table:
+                return table[marker]
+    return None
+
+
+def _amount(match, p: str) -> Optional[float]:
+    number = parse_number(match.group(f"{p}num"))
+    if number is None:
+        return None
+    suffix = match.group(f"{p}suf")
+    return number * SUFFIXES.get(suffix.lower(), 1) if suffix else number
+
+
+def find_money(text: Optional[str], page: bool = False) -> List[MoneyValue]:
+    """
+    Find every monetary amount in a text.
+
+    Args:
+        text: Page text or an extracted "Value" field
+        page: The text is a whole page - amounts count as perk values only next to a perk keyword
+
+    Returns:
+        MoneyValue matches in order of appearance (plain numbers without currency or "credits" are skipped)
+    """
+    if not text:
+        return []
+    values = []
+    for match in MONEY_PATTERN.finditer(text):
+        currency = _currency(match.group("apre"), match.group("apost"), match.group("bpre"), match.group("bpost"))
+        credits = bool(match.group("credits"))
+        if not currency and not credits:
+            continue
+        # "50%" is not money, even with a currency elsewhere in the match
+        if text[match.end():match.end() + 1] == "%":
+            continue
+
+        # "2024 credits" is a year, not an amount
+        if not currency and not match.group("asuf") and _YEAR.fullmatch(match.group("anum")):
+            continue
+
+        low = _amount(match, "a")
+        if low is None:
+            continue
+        high = _amount(match, "b") if match.group("bnum") else None
+        if high is not None and match.group("bsuf") and not match.group("asuf"):
+            low *= SUFFIXES.get(match.group("bsuf").lower(), 1)  # "$1-5k" means 1k to 5k
+        if high is None or high < low:
+            high = low
+
+        confidence = 0.9 if currency else 0.6
+        if match.group("apre") and match.group("apre").strip() in ("$",) and not match.group("asuf") and low < 10:
+            confidence -= 0.2  # "$5" is more likely a price than a perk value
+        in_context = bool(_VALUE_CONTEXT.search(text[max(0, match.start() - 40):match.end() + 40]))
+        if _PRICE_MARKER.match(text, match.end()):
+            confidence = min(confidence, PRICE_CONFIDENCE)  # a recurring price, whatever keyword is nearby
+        elif page and not in_context:
+            confidence = min(confidence, PAGE_CONFIDENCE)
+        elif in_context:
+            confidence += 0.05
+        values.append(MoneyValue(
+            low, high, currency or ("USD" if credits and "$" in match.group(0) else None),
+            round(min(confidence, 1.0), 2), upper_bound=bool(match.group("upto")), text=match.group(0).strip()
+        ))
+    return values
+
+
+def best_money(text: Optional[str], page: bool = False) -> Optional[MoneyValue]:
+    """
+    Pick the most likely perk value in a text: highest confidence, then largest amount.
+    """
+    values = find_money(text, page=page)
+    if not values:
+        return None
+    return max(values, key=lambda value: (value.confidence, value.amount))
+
+
+def parse_money(value: Optional[str]) -> Optional[MoneyValue]:
+    """
+    Parse an extracted "Value" field.
+
+    Returns:
+        The value if one was found with at least MIN_CONFIDENCE, else None
+    """
+    money = best_money(value)
+    return money if money and money.confidence >= MIN_CONFIDENCE else None
+
+
+def fill_value(fields: Dict, page_text: Optional[str]) -> Dict:
+    """
+    Fill or normalize the "Value" field of an extraction from rule-based matches.
+
+    Args:
+        fields: Extraction with the four perk fields
+        page_text: Text the extraction was made from
+
+    Returns:
+        The same dict; "Value" is filled only when the LLM gave a placeholder and the page has a perk amount
+    """
+    value = fields.get("Value")
+    if value is not None and str(value).strip().lower().rstrip(".") not in PLACEHOLDERS:
+        return fields  # an amount, or a non-money answer such as "50% off first year"
+    money = best_money(page_text, page=True)
+    if money and money.confidence >= MIN_CONFIDENCE:
+        fields["Value"] = money.format()
+    return fields
@@ -0,0 +1,131 @@
+"""INFORMATION:
+Compact in-memory model of the Airtable perks table used by the updater.
+
+PerkRecord:
+1. Holds only the fields the pipeline reads: record id, Name, Link, Status, Priority and Value
+2. Uses __slots__ (no per-instance __dict__), so tens of thousands of rows stay small in memory
+3. Derived values are computed once when the record is built:
+   - url: the link with a scheme added ("http://" when missing), None without a usable link (empty, an email or
+     malformed)
+   - normalized_url: canonical form of url (src/fetch_registry.py), used to spot perks sharing a page
+   - domain: host without "www." (src/metrics.py domain_label), interned - many perks share a provider domain
+   - status: lower-cased and interned ("active", "broken/expired", ...)
+
+PerkCollection:
+1. Keeps the records in table order and indexes them by record id, name and domain
+2. `collection.get(record_id)`, `collection.by_name(name)`, `collection.by_domain(domain)` are dict lookups
+3. `collection.select(ids)` returns the records with the given ids in table order (membership tests on id sets,
+   not on lists of names)
+
+Build with `PerkCollection.from_airtable(get_records())`; the raw pyairtable dicts are not kept.
+"""
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from src.fetch_registry import normalize_url
+from src.metrics import domain_label
+
+
+class PerkRecord:
+    """
+    One row of the perks table.
+    """
+    __slots__ = ("id", "name", "link", "url", "normalized_url", "domain", "status", "priority", "value")
+
+    def __init__(self, record_id: str, name: Optional[str], link: Optional[str] = None, status: Optional[str] = None,
+                 priority: Any = None, value: Any = None):
+        self.id = record_id
+        self.name = name
+        self.link = link
+        self.status = sys.intern((status or "").lower())
+        self.priority = priority
+        self.value = value
+
+        self.url = None
+        self.normalized_url = None
+        self.domain = None
+        if link and "@" not in link:
+            url = link if link.startswith(('http://', 'https://')) else 'http://' + link
+            try:
+                self.normalized_url = normalize_url(url)
+                self.domain = sys.intern(domain_label(url))
+                self.url = url
+            except ValueError:
+                # a malformed cell (e.g. "http://[foo") counts as no usable link instead of failing the whole table
+                print(f"WARNING: Ignoring malformed link of perk {name}: {link!r}")
+                self.normalized_url = None
+                self.domain = None
+
+    @classmethod
+    def from_airtable(cls, record: Dict[str, Any]) -> "PerkRecord":
+        """
+        Build a record from a pyairtable record dict ({"id": ..., "fields": {...}}).
+        """
+        fields = record.get("fields", {})
+        return cls(record["id"], fields.get("Name"), fields.get("Link"), fields.get("Status"),
+                   fields.get("Priority"), fields.get("Value"))
+
+    @property
+    def has_link(self) -> bool:
+        return self.url is not None
+
+    def __repr__(self) -> str:
+        return f"PerkRecord({self.id!r}, {self.name!r}, {self.url!r})"
+
+
+class PerkCollection:
+    """
+    Records of the perks table, indexed by id, name and domain.
+    """
+    __slots__ = ("records", "_by_id", "_by_name", "_by_domain")
+
+    def __init__(self, records: Iterable[PerkRecord] = ()):
+        self.records: List[PerkRecord] = []
+        self._by_id: Dict[str, PerkRecord] = {}
+        self._by_name: Dict[str, PerkRecord] = {}
+        self._by_domain: Dict[str, List[PerkRecord]] = {}
+        for record in records:
+            self.add(record)
+
+    @classmethod
+    def from_airtable(cls, records: Iterable[Dict[str, Any]]) -> "PerkCollection":
+        return cls(PerkRecord.from_airtable(record) for record in records)
+
+    def add(self, record: PerkRecord):
+        self.records.append(record)
+        self._by_id[record.id] = record
+        if record.name:
+            # duplicate names keep the first row, as update_perk_info() does
+            self._by_name.setdefault(record.name, record)
+        if record.domain:
+            self._by_domain.setdefault(record.domain, []).append(record)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[PerkRecord]:
+        return iter(self.records)
+
+    def __contains__(self, record_id: str) -> bool:
+        return record_id in self._by_id
+
+    def get(self, record_id: str) -> Optional[PerkRecord]:
+        return self._by_id.get(record_id)
+
+    def by_name(self, name: str) -> Optional[PerkRecord]:
+        return self._by_name.get(name)
+
+    def by_domain(self, domain: str) -> List[PerkRecord]:
+        """
+        Returns:
+            The records whose link is on the domain (host without "www.")
+        """
+        return list(self._by_domain.get(domain, ()))
+
+    def select(self, ids: Iterable[str]) -> List[PerkRecord]:
+        """
+        Returns:
+            The records with the given ids, in table order (unknown ids are ignored)
+        """
+        ids = ids if isinstance(ids, (set, frozenset)) else set(ids)
+        return [record for record in self.records if record.id in ids]
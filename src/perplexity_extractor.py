@@ -3,13 +3,17 @@
 Main Function: extract_perk_info() scrapes websites to extract information about company perks and discounts
 
 Crawling Process:
-1. Scrapes main URL with Selenium (handles JavaScript, cookies, popups)
-2. Finds and prioritizes relevant subpages (up to a configurable limit)
-3. Collects text content from all pages into a single document
+1. Scrapes main URL with Selenium (handles JavaScript, cookies, popups) and extracts from it first
+2. Stops right there if every required field is confidently filled (see src/completeness.py)
+3. Otherwise finds and prioritizes relevant subpages (up to a configurable limit), from the sitemap when available
+   and by rendering the landing page otherwise (see src/site_discovery.py); robots.txt rules and Crawl-delay are respected
+4. Extracts subpages in batches and stops as soon as the missing fields are filled
 
 Information Extraction:
-1. Uses GPT-4o to extract structured data about perks (provider, benefits, access instructions, value)
-2. Fields marked "Not found" indicate missing information
+1. Uses gpt-4o-mini to extract structured data about perks (provider, benefits, access instructions, value),
+   escalating uncertain results to GPT-4o (see src/model_router.py); subpage batches stay on gpt-4o-mini
+2. Pages are kept by reference in a budgeted Document (src/document.py); only the prompt window is materialized
+3. Fields marked "Not found" indicate missing information
 
 Perplexity Integration:
 1. Only triggered when information gaps exist after website extraction
@@ -22,39 +26,83 @@ Enrichment Process:
 3. Returns complete data with metadata about crawled pages
 
 Link Prioritization:
-1. Analyzes found links and prioritizes those containing keywords like "perk," "benefit," "discount"
-2. Ensures crawling focuses on the most relevant pages first
+1. Scores every same-domain link by anchor text, URL path, page region and position (see src/link_ranker.py)
+2. Learns from which crawled subpages filled missing fields in past runs
+3. Ensures crawling focuses on the most relevant pages first
+
+Shared Fetches:
+1. Pages, subpage lists and extractions go through src/fetch_registry.py
+2. Perks pointing at the same provider reuse the pages already rendered in this run
+3. Blocks repeated across a perk's pages are dropped before prompt assembly, and a page near-identical to one
+   already extracted in this run reuses that extraction (MinHash, see src/dedup.py)
+
+Async:
+1. aextract_perk_info() is the implementation; extract_perk_info() runs it on its own event loop
+2. LLM calls (aextract_with_gpt, aenrich_with_perplexity) and searches (asearch_perplexity) use the shared async
+   clients and semaphores of src/async_clients.py; Selenium renders run in worker threads, a few at a time
+3. Many perks can be extracted concurrently from one event loop (see scrap_website in perks_updater.py)
+4. Rendered and fetched HTML is parsed and cleaned in a process pool (src/html_worker.py), so parsing scales with cores
 
 Fallback Mechanisms:
 1. Regular requests as backup if Selenium fails
 2. Enhanced GPT extraction if Perplexity fails
-3. Robust error handling throughout
+3. Schema-constrained GPT output (src/structured.py) instead of regex JSON parsing; truncated output is repaired
+4. Robust error handling throughout
 """
 
 
+import asyncio
 import requests
 import json
 import re
 import time
-from bs4 import BeautifulSoup
-import os
-from typing import Dict, Any, Optional, List, Set
+from typing import Dict, Any, Optional, List
 from urllib.parse import urljoin, urlparse
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
 
-import config
-os.environ["OPENAI_API_KEY"] = config.OPENAI_API_KEY
-os.environ["PERPLEXITY_API_KEY"] = config.PERPLEXITY_API_KEY
+from src.settings import setting
+from src.metrics import timer, incr, observe, domain_label
+from src.usage import track_usage
+from src.structured import extract_fields, aextract_fields
+from src.model_router import route, aroute, CHEAP_MODEL
+from src.async_clients import openai_client, async_openai, async_http, limit, run
+from src.money import fill_value
+from src.completeness import completeness_score, is_complete, merge_extraction, missing_fields, field_filled
+from src.link_ranker import link_ranker
+from src.site_discovery import site_discovery
+from src.fetch_registry import fetch_registry, normalize_url
+from src.state_store import content_hash
+from src.document import Document
+from src.dedup import BlockDeduplicator, page_index
+from src.html_worker import html_pool
+
+EXTRACTION_WINDOW = 15000  # characters sent per extract_with_gpt() call
+LANDING_BUDGET = 6000  # characters of the landing page guaranteed a place in a multi-page prompt
+SUBPAGE_BUDGET = 3000  # per subpage
+PERPLEXITY_BUDGET = 4000  # for the Perplexity search results
+SUBPAGE_DISCOVERY = setting("SUBPAGE_DISCOVERY", "sitemap")  # "sitemap" (robots.txt + sitemap.xml first) or "render"
 
 
 def extract_perk_info(url: str, perplexity_api_key: Optional[str] = None, crawl_subpages: bool = True, max_subpages: int = 5) -> Dict[str, Any]:
     """
     Extract perk information from a URL and optionally its subpages, with Perplexity API integration.
+    Sync entry point; runs aextract_perk_info() on its own event loop.
+    
+    Args:
+        url: The URL to scrape for perk information
+        perplexity_api_key: Optional API key for Perplexity
+        crawl_subpages: Whether to crawl subpages of the website
+        max_subpages: Maximum number of subpages to crawl
+        
+    Returns:
+        A dictionary containing the extracted perk information
+    """
+    return run(aextract_perk_info(url, perplexity_api_key, crawl_subpages, max_subpages))
+
+
+async def aextract_perk_info(url: str, perplexity_api_key: Optional[str] = None, crawl_subpages: bool = True, max_subpages: int = 5) -> Dict[str, Any]:
+    """
+    Extract perk information from a URL and optionally its subpages, with Perplexity API integration.
+    Browser renders run in worker threads, LLM and search calls on the shared async clients.
     
     Args:
         url: The URL to scrape for perk information
@@ -66,81 +114,184 @@ def extract_perk_info(url: str, perplexity_api_key: Optional[str] = None, crawl_
         A dictionary containing the extracted perk information
     """
     # Step 1: Scrape the main URL
-    scraped_text = scrape_website_with_selenium(url)
+    scraped_text = await _render(url)
     if not scraped_text:
         return {
             "error": "Failed to scrape the website",
             "url": url
         }
     
-    # Step 2: Crawl subpages if requested
-    all_text = scraped_text
-    subpage_info = {}
+    # blocks repeated across the perk's pages (header, footer, cookie banner, pricing) reach the prompt once;
+    # only the budgeted part of each page counts as seen, the rest may not make it into the multi-page prompt
+    blocks = BlockDeduplicator()
+    scraped_text = blocks.dedupe(scraped_text, limit=min(LANDING_BUDGET, EXTRACTION_WINDOW))
     
-    if crawl_subpages:
-        print(f"Crawling subpages of {url}...")
-        subpages = find_subpages(url, max_pages=max_subpages)
-        
+    # Step 2: Extract from the landing page first - many perks are fully answered there
+    # pages are held by reference in a budgeted document; only the prompt slices are ever copied
+    document = Document()
+    document.add("landing", scraped_text, budget=LANDING_BUDGET)
+    subpage_urls = []
+    extracted_info = await aextract_with_gpt(scraped_text)
+    print(f"Landing page completeness: {completeness_score(extracted_info):.2f}")
+    early_exit = is_complete(extracted_info)
+    
+    # Step 3: Crawl subpages only while required fields are missing
+    if crawl_subpages and early_exit:
+        print("All required fields found on the landing page - skipping subpages")
+        incr("early_exits", stage="landing")
+    elif crawl_subpages:
+        print(f"Crawling subpages of {url}... (missing: {', '.join(missing_fields(extracted_info))})")
+        subpages = await afind_subpages(url, max_subpages)
+        
+        # drop the same page under other URLs (trailing slash, tracking params, http/https)
+        unique_subpages, seen = [], {normalize_url(url)}
+        for subpage_url in subpages:
+            if normalize_url(subpage_url) not in seen:
+                seen.add(normalize_url(subpage_url))
+                unique_subpages.append(subpage_url)
+        subpages = unique_subpages
+        
+        # subpages are extracted in batches that fill one extraction window
+        batch_urls = []
+        batch_chars = 0
         for idx, subpage_url in enumerate(subpages):
             #print(f"Scraping subpage {idx+1}/{len(subpages)}: {subpage_url}")
-            subpage_text = scrape_website_with_selenium(subpage_url)
-            if subpage_text:
-                subpage_info[subpage_url] = {
-                    "text": subpage_text[:5000],  # Store a truncated version for reference
-                    "full_text": subpage_text  # Store the full text for extraction
-                }
-                all_text += f"\n\n--- CONTENT FROM SUBPAGE: {subpage_url} ---\n\n{subpage_text}"
+            await site_discovery.await_crawl_delay(subpage_url)  # honour the site's Crawl-delay
+            segment = document.add(
+                subpage_url, blocks.dedupe(await _render(subpage_url), limit=SUBPAGE_BUDGET), budget=SUBPAGE_BUDGET,
+                header=f"--- CONTENT FROM SUBPAGE: {subpage_url} ---\n\n"
+            )
+            if segment:
+                subpage_urls.append(subpage_url)
+                batch_urls.append(subpage_url)
+                batch_chars += min(len(segment), SUBPAGE_BUDGET)
+            
+            last_page = idx == len(subpages) - 1
+            if batch_urls and (batch_chars >= EXTRACTION_WINDOW or last_page):
+                merged_info = merge_extraction(extracted_info, await aextract_with_gpt(document.render(EXTRACTION_WINDOW, batch_urls), escalate=False))
+                new_values = [merged_info[field] for field in missing_fields(extracted_info) if field_filled(field, merged_info.get(field))]
+                for batch_url in batch_urls:
+                    link_ranker.feedback(batch_url, page_contributed(document.get(batch_url).text, new_values))
+                extracted_info = merged_info
+                batch_urls = []
+                batch_chars = 0
+                print(f"Completeness after {len(subpage_urls)} subpage(s): {completeness_score(extracted_info):.2f}")
+                if is_complete(extracted_info):
+                    early_exit = True
+                    incr("early_exits", stage="subpages")
+                    print(f"All required fields found - skipping {len(subpages) - idx - 1} remaining subpage(s)")
+                    break
     
-    # Step 3: Try to extract information using GPT from all gathered text
-    extracted_info = extract_with_gpt(all_text)
+        await asyncio.to_thread(link_ranker.save)
     
     # Step 4: If we still have missing information, use Perplexity API
     if perplexity_api_key and has_missing_info(extracted_info):
         domain = extract_domain(url)
         company_name = extract_company_name(domain)
-        supplementary_info = search_perplexity(company_name, perplexity_api_key)
+        supplementary_info = await asearch_perplexity(company_name, perplexity_api_key)
         
         if supplementary_info:
-            # Combine all text for final extraction
-            combined_text = all_text + f"\n\nAdditional information from Perplexity search:\n{supplementary_info}"
+            # Landing page and search results first, then the subpages, within one extraction window
+            document.add(
+                "perplexity", supplementary_info, budget=PERPLEXITY_BUDGET,
+                header="Additional information from Perplexity search:\n"
+            )
             
             # Re-extract with all available information
-            final_info = extract_with_gpt(combined_text)
+            final_info = await aextract_with_gpt(document.render(EXTRACTION_WINDOW, ["landing", "perplexity", *subpage_urls]))
             
             # If there are still missing fields, use the enrichment function
             if has_missing_info(final_info):
-                return enrich_with_perplexity(final_info, supplementary_info)
+                return await aenrich_with_perplexity(final_info, supplementary_info)
             return final_info
     
     # Include metadata about the crawl
     result = extracted_info.copy()
     result["metadata"] = {
         "main_url": url,
-        "subpages_crawled": len(subpage_info) if crawl_subpages else 0,
-        "subpage_urls": list(subpage_info.keys()) if crawl_subpages else []
+        "subpages_crawled": len(subpage_urls),
+        "subpage_urls": subpage_urls,
+        "completeness": completeness_score(extracted_info),
+        "early_exit": early_exit
     }
     
     return result
 
 
-def find_subpages(url: str, max_pages: int = 5) -> List[str]:
+async def _render(url: str) -> str:
+    # Selenium is blocking: render in a worker thread, a few browsers at a time
+    async with limit("browser"):
+        return await asyncio.to_thread(scrape_website_with_selenium, url)
+
+
+def find_subpages(url: str, max_pages: int = 5, discovery: str = SUBPAGE_DISCOVERY) -> List[str]:
     """
-    Find subpages of a given URL.
+    Find subpages of a given URL. Perks sharing a landing page share one discovery per run.
     
     Args:
         url: The base URL to find subpages for
         max_pages: Maximum number of subpages to return
+        discovery: "sitemap" to try robots.txt / sitemap.xml first (no browser), "render" to always render the page
         
     Returns:
         A list of subpage URLs
     """
+    key = f"{normalize_url(url)}|{max_pages}|{discovery}"
+    return fetch_registry.memo("subpages", key, lambda: _find_subpages(url, max_pages, discovery))
+
+
+async def afind_subpages(url: str, max_pages: int = 5, discovery: str = SUBPAGE_DISCOVERY) -> List[str]:
+    """
+    Async version of find_subpages(). Only the render fallback takes a browser slot; reading robots.txt and the
+    sitemaps needs no browser. Shares its results with find_subpages().
+    """
+    key = f"{normalize_url(url)}|{max_pages}|{discovery}"
+    return await fetch_registry.amemo("subpages", key, lambda: _afind_subpages(url, max_pages, discovery))
+
+
+def _find_subpages(url: str, max_pages: int, discovery: str) -> List[str]:
+    if discovery == "sitemap":
+        subpages = _sitemap_subpages(url, max_pages)
+        if subpages:
+            return subpages
+    return _render_subpages(url, max_pages)
+
+
+async def _afind_subpages(url: str, max_pages: int, discovery: str) -> List[str]:
+    if discovery == "sitemap":
+        subpages = await asyncio.to_thread(_sitemap_subpages, url, max_pages)
+        if subpages:
+            return subpages
+    async with limit("browser"):
+        return await asyncio.to_thread(_render_subpages, url, max_pages)
+
+
+def _sitemap_subpages(url: str, max_pages: int) -> List[str]:
+    try:
+        subpages = site_discovery.discover_subpages(url, max_pages=max_pages)
+        if subpages:
+            print(f"Found {len(subpages)} candidate subpages in the sitemap")
+            return subpages
+        print("No usable sitemap - rendering the landing page to find links")
+    except Exception as e:
+        print(f"Error reading sitemap: {e}")
+    return []
+
+
+def _render_subpages(url: str, max_pages: int) -> List[str]:
     try:
         # Parse the base URL to get the domain
         parsed_url = urlparse(url)
         base_domain = parsed_url.netloc
         base_url = f"{parsed_url.scheme}://{parsed_url.netloc}"
         
-        # Use Selenium to get the page with JavaScript rendered
+        # Use Selenium to get the page with JavaScript rendered (imported here: only renders need a browser)
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.common.exceptions import TimeoutException, NoSuchElementException
         chrome_options = Options()
         chrome_options.add_argument("--headless")
         chrome_options.add_argument("--disable-gpu")
@@ -148,11 +299,14 @@ def find_subpages(url: str, max_pages: int = 5) -> List[str]:
         chrome_options.add_argument("--disable-dev-shm-usage")
         chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
         
-        driver = webdriver.Chrome(options=chrome_options)
-        driver.get(url)
-        
-        # Wait for page to load
-        time.sleep(3)
+        domain = domain_label(url)
+        with timer("browser_start", method="selenium"):
+            driver = webdriver.Chrome(options=chrome_options)
+        with timer("fetch", domain=domain, method="selenium"):
+            driver.get(url)
+            
+            # Wait for page to load
+            time.sleep(3)
         
         # Handle cookie banners
         try:
@@ -177,14 +331,14 @@ def find_subpages(url: str, max_pages: int = 5) -> List[str]:
             print(f"Error handling cookies: {e}")
         
         # Extract all links
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
+        page_source = driver.page_source
         driver.quit()
+        with timer("parse", domain=domain):
+            anchors = html_pool.parse(page_source, links=True)["links"]
         
-        # Find all links
-        subpages = set()
-        for link in soup.find_all('a', href=True):
-            href = link['href']
-            
+        # Collect every same-domain link with its anchor text, page region and DOM position
+        links = []
+        for position, (href, anchor_text, region) in enumerate(anchors):
             # Normalize the URL
             if href.startswith('/'):
                 full_url = urljoin(base_url, href)
@@ -198,47 +352,52 @@ def find_subpages(url: str, max_pages: int = 5) -> List[str]:
                 # Relative URL
                 full_url = urljoin(url, href)
             
-            # Exclude common non-relevant pages and fragments
-            if any(x in full_url for x in ['#', 'javascript:', 'mailto:', 'tel:']):
+            # Exclude common non-relevant pages
+            if any(x in full_url for x in ['javascript:', 'mailto:', 'tel:']):
                 continue
                 
             # Remove URL fragments
             full_url = full_url.split('#')[0]
             
-            # Add to set of subpages if it's different from the original URL
-            if full_url != url:
-                subpages.add(full_url)
-                
-                # Limit to max_pages
-                if len(subpages) >= max_pages:
-                    break
-        
-        # Prioritize pages that might contain perk information
-        prioritized_subpages = []
-        keywords = ['perk', 'benefit', 'discount', 'offer', 'deal', 'promo', 'special', 'reward']
+            # Skip the original URL itself
+            if full_url.rstrip('/') == url.rstrip('/'):
+                continue
+            
+            links.append((full_url, anchor_text, region, position / max(len(anchors) - 1, 1)))
+        incr("subpages_found", len({link[0] for link in links}), domain=domain)
         
-        # First add pages with relevant keywords
-        for subpage in subpages:
-            if any(keyword in subpage.lower() for keyword in keywords):
-                prioritized_subpages.append(subpage)
-                
-        # Then add other pages up to max_pages
-        remaining_slots = max_pages - len(prioritized_subpages)
-        for subpage in subpages:
-            if subpage not in prioritized_subpages and remaining_slots > 0:
-                prioritized_subpages.append(subpage)
-                remaining_slots -= 1
-                
-        return prioritized_subpages[:max_pages]
+        # Score all candidates (keywords, path, region, learned feedback) and keep the best
+        links = [link for link in links if site_discovery.can_fetch(link[0])]
+        return link_ranker.rank(links, max_pages)
         
     except Exception as e:
         print(f"Error finding subpages: {e}")
         return []
 
 
+def page_contributed(page_text: str, new_values: List[str]) -> bool:
+    """
+    Decide whether a crawled page supplied any of the newly filled field values.
+    
+    Args:
+        page_text: Text of the crawled page
+        new_values: Field values that were missing before the page's batch was extracted
+        
+    Returns:
+        True if at least half of the words of one of the values appear in the page
+    """
+    page_words = set(re.findall(r"\w+", page_text.lower()))
+    for value in new_values:
+        value_words = {word for word in re.findall(r"\w+", str(value).lower()) if len(word) > 3 or word.isdigit()}
+        if value_words and len(value_words & page_words) / len(value_words) >= 0.5:
+            return True
+    return False
+
+
 def scrape_website_with_selenium(url: str) -> str:
     """
     Scrape a website using Selenium to handle cookies and pop-ups.
+    Each normalized URL is rendered once per run; later calls reuse the cleaned text.
     
     Args:
         url: The URL to scrape
@@ -246,7 +405,18 @@ def scrape_website_with_selenium(url: str) -> str:
     Returns:
         The scraped text content
     """
+    return fetch_registry.fetch("selenium_text", url, _scrape_website_with_selenium)
+
+
+def _scrape_website_with_selenium(url: str) -> str:
     try:
+        # a missing selenium install falls back to regular scraping below
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.common.exceptions import TimeoutException, NoSuchElementException
         chrome_options = Options()
         chrome_options.add_argument("--headless")
         chrome_options.add_argument("--disable-gpu")
@@ -255,7 +425,10 @@ def scrape_website_with_selenium(url: str) -> str:
         chrome_options.add_argument("--window-size=1920,1080")
         chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
         
-        driver = webdriver.Chrome(options=chrome_options)
+        domain = domain_label(url)
+        with timer("browser_start", method="selenium"):
+            driver = webdriver.Chrome(options=chrome_options)
+        fetch_started = time.perf_counter()
         driver.get(url)
         
         # Wait for page to load
@@ -327,26 +500,20 @@ def scrape_website_with_selenium(url: str) -> str:
         time.sleep(1)
         driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
         time.sleep(1)
+        page_source = driver.page_source
+        observe("fetch", time.perf_counter() - fetch_started, domain=domain, method="selenium")
         
-        # Get page source and parse with BeautifulSoup
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        
-        # Remove script and style elements
-        for script in soup(["script", "style"]):
-            script.decompose()
-        
-        # Get text
-        text = soup.get_text(separator=' ', strip=True)
+        driver.quit()
         
-        # Clean up text - remove extra whitespace
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = ' '.join(chunk for chunk in chunks if chunk)
+        # Parse and clean the raw HTML in the worker pool (src/html_worker.py)
+        with timer("parse", domain=domain):
+            text = html_pool.parse(page_source, text=True)["text"]
         
-        driver.quit()
+        incr("pages_fetched", domain=domain, method="selenium")
         return text
     except Exception as e:
         print(f"Error scraping {url} with Selenium: {e}")
+        incr("fetch_failures", domain=domain_label(url), method="selenium")
         # Fallback to regular scraping if Selenium fails
         return scrape_website_regular(url)
 
@@ -365,105 +532,93 @@ def scrape_website_regular(url: str) -> str:
         headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         }
-        response = requests.get(url, headers=headers, timeout=10)
+        domain = domain_label(url)
+        with timer("fetch", domain=domain, method="requests"):
+            response = requests.get(url, headers=headers, timeout=10)
         response.raise_for_status()
         
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Remove script and style elements
-        for script in soup(["script", "style"]):
-            script.decompose()
-        
-        # Get text
-        text = soup.get_text(separator=' ', strip=True)
-        
-        # Clean up text - remove extra whitespace
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = ' '.join(chunk for chunk in chunks if chunk)
+        with timer("parse", domain=domain):
+            text = html_pool.parse(response.content, response.encoding, text=True)["text"]
         
+        incr("pages_fetched", domain=domain, method="requests")
         return text
     except Exception as e:
         print(f"Error scraping {url} with regular method: {e}")
+        incr("fetch_failures", domain=domain_label(url), method="requests")
         return ""
 
 
-def extract_with_gpt(text: str) -> Dict[str, str]:
+def extract_with_gpt(text: str, escalate: bool = True) -> Dict[str, str]:
     """
     Use OpenAI GPT to extract perk information from text.
+    Identical text (e.g. the same landing page of two perks) is only sent once per run,
+    near-identical text reuses the earlier result (src/dedup.py).
     
     Args:
         text: The text to analyze
+        escalate: Allow escalation to the strong model (False for partial-page batches)
         
     Returns:
         Extracted information
     """
-    try:
-        # For this function to work, you need to set up the OpenAI API client
-        from openai import OpenAI
-        client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
-        
-        prompt = f"""
+    text_hash = content_hash(text[:EXTRACTION_WINDOW]) or ""
+    
+    def extract(model: str) -> Dict[str, str]:
+        extracted = dict(fetch_registry.memo("extract_with_gpt", f"{model}:{text_hash}", lambda: page_index.reuse(
+            f"extract_with_gpt:{model}", text[:EXTRACTION_WINDOW], lambda: _extract_with_gpt(text, model)
+        )))
+        return fill_value(extracted, text[:EXTRACTION_WINDOW])  # rule-based Value if the LLM found none
+    
+    # cheap model first, escalated to the strong model only if the result is uncertain
+    if not escalate:
+        return extract(CHEAP_MODEL)
+    return route(extract, stage="extract_with_gpt", text=text[:EXTRACTION_WINDOW])
+
+
+def _extraction_prompt(text: str) -> str:
+    return f"""
 You are an information extraction assistant.
 
 Given the text below, extract the following fields:
 
-- "Provider Description": A very brief (1-2 sentences) description of the company or organization offering the perk.
-- "What You Get": Summarize clearly what the perk provides (discount, credits, service, etc.).
-- "How To Get It": Instructions on how someone can claim or access the perk.
-- "Money Value": The financial value of the perk (in USD or EUR if available). If no value is clear, return "Not found".
+- "Brief description of the provider": A very brief (1-2 sentences) description of the company or organization offering the perk.
+- "What you get": Summarize clearly what the perk provides (discount, credits, service, etc.).
+- "How to get it": Instructions on how someone can claim or access the perk.
+- "Value": The financial value of the perk (in USD or EUR if available).
 
 **Important rules**:
 - Do not invent missing information.
 - If a field cannot be found, respond exactly with "Not found".
-- Output only valid JSON, no commentary.
 
 Text to analyze:
 \"\"\"
-{text[:15000]}  # Limit text size to avoid token limits
+{text[:EXTRACTION_WINDOW]}
 \"\"\"
-
-Respond in this exact JSON format:
-{{
-    "Brief description of the provider": "",
-    "What you get": "",
-    "How to get it": "",
-    "Value": ""
-}}
 """
 
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.2
-        )
-        
-        content = response.choices[0].message.content.strip()
-        
-        # Extract the JSON part only
-        try:
-            json_str = re.search(r"\{.*\}", content, re.DOTALL).group()
-            extracted = json.loads(json_str)
-        except Exception as e:
-            print(f"⚠️ Parsing error: {e}")
-            extracted = {
-                "Brief description of the provider": "Error parsing",
-                "What you get": "Error parsing",
-                "How to get it": "Error parsing",
-                "Value": "Error parsing"
-            }
-        
-        return extracted
-    except Exception as e:
-        print(f"Error with GPT extraction: {e}")
-        return {
-            "Brief description of the provider": "Not found",
-            "What you get": "Not found",
-            "How to get it": "Not found",
-            "Value": "Not found"
-        }
+
+def _extract_with_gpt(text: str, model: str) -> Dict[str, str]:
+    # schema-constrained output, no JSON scraping needed
+    return extract_fields(openai_client(), model, _extraction_prompt(text), stage="extract_with_gpt")
+
+
+async def aextract_with_gpt(text: str, escalate: bool = True) -> Dict[str, str]:
+    """
+    Async version of extract_with_gpt() on the shared AsyncOpenAI client.
+    Shares the run's memo and near-duplicate index with the sync version.
+    """
+    text_hash = content_hash(text[:EXTRACTION_WINDOW]) or ""
+
+    async def extract(model: str) -> Dict[str, str]:
+        extracted = dict(await fetch_registry.amemo("extract_with_gpt", f"{model}:{text_hash}", lambda: page_index.areuse(
+            f"extract_with_gpt:{model}", text[:EXTRACTION_WINDOW],
+            lambda: aextract_fields(async_openai(), model, _extraction_prompt(text), stage="extract_with_gpt")
+        )))
+        return fill_value(extracted, text[:EXTRACTION_WINDOW])
+
+    if not escalate:
+        return await extract(CHEAP_MODEL)
+    return await aroute(extract, stage="extract_with_gpt", text=text[:EXTRACTION_WINDOW])
 
 
 def has_missing_info(extracted_info: Dict[str, str]) -> bool:
@@ -512,6 +667,57 @@ def extract_company_name(domain: str) -> str:
     return company
 
 
+PERPLEXITY_URL = "https://api.perplexity.ai/chat/completions"
+
+
+def _perplexity_request(query: str, api_key: str):
+    # Construct a query specifically about perks or benefits
+    enhanced_query = f"{query} company perks discounts benefits offers"
+    
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+    data = {
+        "model": "pplx-7b-online",  # Use the appropriate model
+        "messages": [
+            {
+                "role": "system",
+                "content": "You are a research assistant that helps find detailed information about company perks, discounts, and special offers. Focus on finding specific details about what benefits are offered, their value, and how to access them. Search the web for the most current information."
+            },
+            {
+                "role": "user",
+                "content": f"I need detailed information about perks, discounts, or special offers provided by {enhanced_query}. Please search for specific details about:\n1. What exactly is offered (discounts, credits, services, etc.)\n2. The financial value of these perks\n3. How someone can claim or access these perks\n4. Any eligibility requirements"
+            }
+        ]
+    }
+    return headers, data
+
+
+def _perplexity_text(json_response: Dict[str, Any]) -> str:
+    if "choices" in json_response and len(json_response["choices"]) > 0:
+        perplexity_text = json_response["choices"][0]["message"]["content"]
+        
+        # Extract sources if available
+        sources = []
+        if "links" in json_response:
+            sources = json_response["links"]
+        elif "sources" in json_response:
+            sources = json_response["sources"]
+        
+        # Combine the text and sources
+        result = perplexity_text
+        if sources:
+            result += "\n\nSources:\n"
+            for idx, source in enumerate(sources[:5]):  # Limit to first 5 sources
+                result += f"{idx+1}. {source}\n"
+        
+        return result
+    else:
+        print("Unexpected response structure from Perplexity API")
+        return ""
+
+
 def search_perplexity(query: str, api_key: str) -> str:
     """
     Search for information using the Perplexity API.
@@ -524,77 +730,38 @@ def search_perplexity(query: str, api_key: str) -> str:
         The search results text
     """
     try:
-        # Construct a query specifically about perks or benefits
-        enhanced_query = f"{query} company perks discounts benefits offers"
-        
-        url = "https://api.perplexity.ai/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
-        data = {
-            "model": "pplx-7b-online",  # Use the appropriate model
-            "messages": [
-                {
-                    "role": "system",
-                    "content": "You are a research assistant that helps find detailed information about company perks, discounts, and special offers. Focus on finding specific details about what benefits are offered, their value, and how to access them. Search the web for the most current information."
-                },
-                {
-                    "role": "user",
-                    "content": f"I need detailed information about perks, discounts, or special offers provided by {enhanced_query}. Please search for specific details about:\n1. What exactly is offered (discounts, credits, services, etc.)\n2. The financial value of these perks\n3. How someone can claim or access these perks\n4. Any eligibility requirements"
-                }
-            ]
-        }
-        
-        response = requests.post(url, headers=headers, json=data)
-        response.raise_for_status()
-        
-        json_response = response.json()
-        if "choices" in json_response and len(json_response["choices"]) > 0:
-            perplexity_text = json_response["choices"][0]["message"]["content"]
-            
-            # Extract sources if available
-            sources = []
-            if "links" in json_response:
-                sources = json_response["links"]
-            elif "sources" in json_response:
-                sources = json_response["sources"]
-            
-            # Combine the text and sources
-            result = perplexity_text
-            if sources:
-                result += "\n\nSources:\n"
-                for idx, source in enumerate(sources[:5]):  # Limit to first 5 sources
-                    result += f"{idx+1}. {source}\n"
-            
-            return result
-        else:
-            print("Unexpected response structure from Perplexity API")
-            return ""
+        headers, data = _perplexity_request(query, api_key)
+        with track_usage("perplexity", data["model"], stage="search_perplexity", kind="search") as call:
+            response = requests.post(PERPLEXITY_URL, headers=headers, json=data)
+            response.raise_for_status()
+            json_response = response.json()
+            call.usage = json_response.get("usage")
+        return _perplexity_text(json_response)
     except Exception as e:
         print(f"Error with Perplexity search: {e}")
         return ""
 
 
-def enrich_with_perplexity(extracted_info: Dict[str, str], perplexity_text: str) -> Dict[str, str]:
+async def asearch_perplexity(query: str, api_key: str) -> str:
     """
-    Enrich the extracted information with data from Perplexity.
-    
-    Args:
-        extracted_info: The original extracted information
-        perplexity_text: The text from Perplexity API
-        
-    Returns:
-        Enriched information dictionary
+    Async version of search_perplexity() on the shared httpx client, holding a "perplexity" concurrency slot.
     """
-    if not perplexity_text:
-        return extracted_info
-    
     try:
-        from openai import OpenAI
-        client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
-        
-        prompt = f"""
+        headers, data = _perplexity_request(query, api_key)
+        async with limit("perplexity"):
+            with track_usage("perplexity", data["model"], stage="search_perplexity", kind="search") as call:
+                response = await async_http().post(PERPLEXITY_URL, headers=headers, json=data)
+                response.raise_for_status()
+                json_response = response.json()
+                call.usage = json_response.get("usage")
+        return _perplexity_text(json_response)
+    except Exception as e:
+        print(f"Error with Perplexity search: {e}")
+        return ""
+
+
+def _enrichment_prompt(extracted_info: Dict[str, str], perplexity_text: str) -> str:
+    return f"""
 You are an information enrichment assistant. You have two sources of information about a company perk:
 
 1. Initial extracted data:
@@ -608,31 +775,42 @@ Important rules:
 - Only add information that is clearly stated in the additional information.
 - Do not modify fields that already have content (not "Not found").
 - If you cannot find information to fill a "Not found" field, keep it as "Not found".
-- Output only valid JSON, no commentary.
-
-Respond with the updated JSON:
 """
 
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.2
-        )
-        
-        content = response.choices[0].message.content.strip()
+
+def enrich_with_perplexity(extracted_info: Dict[str, str], perplexity_text: str) -> Dict[str, str]:
+    """
+    Enrich the extracted information with data from Perplexity.
+    
+    Args:
+        extracted_info: The original extracted information
+        perplexity_text: The text from Perplexity API
         
-        # Extract the JSON part
-        try:
-            json_str = re.search(r"\{.*\}", content, re.DOTALL).group()
-            enriched = json.loads(json_str)
-            return enriched
-        except Exception as e:
-            print(f"⚠️ Parsing error during enrichment: {e}")
-            return extracted_info
-    except Exception as e:
-        print(f"Error enriching with Perplexity data: {e}")
+    Returns:
+        Enriched information dictionary
+    """
+    if not perplexity_text:
         return extracted_info
+    
+    client = openai_client()
+    prompt = _enrichment_prompt(extracted_info, perplexity_text)
+
+    # on a failed call the initial data is kept as it is
+    return route(
+        lambda model: extract_fields(client, model, prompt, stage="enrich_with_perplexity", fallback=extracted_info),
+        stage="enrich_with_perplexity", text=perplexity_text
+    )
+
 
+async def aenrich_with_perplexity(extracted_info: Dict[str, str], perplexity_text: str) -> Dict[str, str]:
+    """
+    Async version of enrich_with_perplexity() on the shared AsyncOpenAI client.
+    """
+    if not perplexity_text:
+        return extracted_info
+    prompt = _enrichment_prompt(extracted_info, perplexity_text)
 
+    return await aroute(
+        lambda model: aextract_fields(async_openai(), model, prompt, stage="enrich_with_perplexity", fallback=extracted_info),
+        stage="enrich_with_perplexity", text=perplexity_text
+    )
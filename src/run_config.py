@@ -0,0 +1,211 @@
+"""INFORMATION:
+Command line and run profiles for perks_updater.py.
+
+Precedence (highest first):
+1. Command line flags, e.g. `python perks_updater.py --max-subpages 3 --perk-concurrency 4`
+2. The run profile (--profile, or RUN_PROFILE in config.py / the environment)
+3. Settings in config.py or the environment (MAX_PERKS_PER_RUN, MAX_SUBPAGES, CACHE_MODE, ...)
+4. Built-in defaults - a plain run scrapes and writes the due active perks without re-checking their status
+
+Stages (--stages, comma-separated):
+1. status     - re-check link status of perks last checked more than STATUS_MAX_AGE_HOURS ago, update Airtable
+2. bs_gpt     - method 1, BeautifulSoup + GPT on the landing page
+3. perplexity - method 2, subpage crawl + Perplexity enrichment
+4. write      - write combined results to Airtable; without it results stay in the run journal and the next run
+                that includes "write" resumes and writes them ("--stages write" alone writes them without scraping)
+
+Record selection:
+1. --ids, --name (substring) and --domain narrow the candidates; only active perks are scraped
+2. --due-only (default) keeps the perks due per src/scheduler.py, --no-due-only scrapes every selected active perk
+3. Perks left half-done by an interrupted run always go first
+
+Budgets: --max-perks, --max-cost, --max-seconds, --max-tokens per run (src/scheduler.py Budget) and
+--max-subpages per perk.
+
+Concurrency: --perk-concurrency, --openai-concurrency, --perplexity-concurrency, --browser-concurrency
+(src/async_clients.py) and --html-workers (src/html_worker.py).
+
+Cache modes (--cache):
+1. use     - default; pages and extractions are shared within the run, the sitemap cache is reused across runs
+2. refresh - the saved sitemap/robots cache is ignored and rebuilt
+3. off     - nothing is shared or saved: every page is fetched and extracted for each perk
+
+Dry run (--dry-run): no Airtable writes (status or perk info), no run journal, no state store updates, no saved
+link ranker or sitemap cache and no run metrics export (the summary is printed); LLM and search calls still run and
+are recorded in the usage ledger, since they are billed.
+"""
+import argparse
+from typing import Any, Dict, List, Optional, Union
+
+from src.settings import setting
+from src.perk_record import PerkCollection, PerkRecord
+
+STAGES = ("status", "bs_gpt", "perplexity", "write")
+SCRAPE_STAGES = ("bs_gpt", "perplexity")
+CACHE_MODES = ("use", "refresh", "off")
+
+PROFILES: Dict[str, Dict[str, Any]] = {
+    # settings from config.py / the environment
+    "default": {},
+    # status re-check followed by the full scrape
+    "full": {"stages": list(STAGES)},
+    # link status only, no scraping
+    "status": {"stages": ["status"]},
+    # small, cheap runs: few subpages and perks per run
+    "quick": {"max_subpages": 3, "max_perks": 20, "perk_concurrency": 4},
+    # try a change end to end on a handful of perks without touching Airtable or the local state
+    "smoke": {"max_perks": 3, "max_subpages": 2, "due_only": False, "dry_run": True, "cache": "off"},
+}
+
+
+def defaults() -> Dict[str, Any]:
+    """
+    Returns:
+        Built-in defaults overlaid with config.py / environment settings (read on call, not at import)
+    """
+    from src.async_clients import PERK_CONCURRENCY, LIMITS
+    from src.html_worker import HTML_WORKERS
+
+    return {
+        "stages": _stage_list(setting("RUN_STAGES", "bs_gpt,perplexity,write")),
+        "due_only": True,
+        "dry_run": False,
+        "max_perks": setting("MAX_PERKS_PER_RUN", cast=int),
+        "max_cost": setting("MAX_COST_PER_RUN", cast=float),
+        "max_seconds": setting("MAX_SECONDS_PER_RUN", cast=float),
+        "max_tokens": setting("MAX_TOKENS_PER_RUN", cast=int),
+        "max_subpages": setting("MAX_SUBPAGES", 10),
+        "status_max_age_hours": setting("STATUS_MAX_AGE_HOURS", 24.0),
+        "perk_concurrency": PERK_CONCURRENCY,
+        "openai_concurrency": LIMITS["openai"],
+        "perplexity_concurrency": LIMITS["perplexity"],
+        "browser_concurrency": LIMITS["browser"],
+        "html_workers": HTML_WORKERS,
+        "cache": setting("CACHE_MODE", "use"),
+    }
+
+
+def _stage_list(value: Union[str, List[str]]) -> List[str]:
+    # a comma-separated string from the command line / environment, or a list in config.py
+    parts = value.split(",") if isinstance(value, str) else value
+    stages = [stage.strip() for stage in parts if stage.strip()]
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown stage(s) {', '.join(unknown)} - choose from {', '.join(STAGES)}")
+    return stages
+
+
+def build_parser() -> argparse.ArgumentParser:
+    # every option defaults to None so unset flags fall through to the profile and the settings
+    parser = argparse.ArgumentParser(description="Check perk links and refresh perk information in Airtable.")
+    parser.add_argument("--profile", default=None, choices=sorted(PROFILES),
+                        help="Run profile (default: RUN_PROFILE setting or 'default')")
+    parser.add_argument("--stages", type=_stage_list, default=None,
+                        help=f"Comma-separated stages to run, from {','.join(STAGES)}")
+    parser.add_argument("--dry-run", action=argparse.BooleanOptionalAction, default=None,
+                        help="Extract but do not write Airtable, the run journal or the state store")
+
+    selection = parser.add_argument_group("record selection")
+    selection.add_argument("--ids", nargs="+", default=None, metavar="RECORD_ID", help="Only these Airtable record ids")
+    selection.add_argument("--name", dest="names", action="append", default=None, metavar="TEXT",
+                           help="Only perks whose name contains this text (repeatable)")
+    selection.add_argument("--domain", dest="domains", action="append", default=None, metavar="DOMAIN",
+                           help="Only perks linking to this domain, without www. (repeatable)")
+    selection.add_argument("--due-only", action=argparse.BooleanOptionalAction, default=None,
+                           help="Only scrape perks due per the scheduler (default: yes)")
+
+    budgets = parser.add_argument_group("budgets")
+    budgets.add_argument("--max-perks", type=int, default=None, help="Perks scraped per run")
+    budgets.add_argument("--max-cost", type=float, default=None, help="Estimated API spend (USD) per run")
+    budgets.add_argument("--max-seconds", type=float, default=None, help="Wall time per run")
+    budgets.add_argument("--max-tokens", type=int, default=None, help="LLM / search tokens per run")
+    budgets.add_argument("--max-subpages", type=int, default=None, help="Subpages crawled per perk by method 2")
+    budgets.add_argument("--status-max-age-hours", type=float, default=None,
+                         help="Re-check the status of perks last checked longer ago than this")
+
+    concurrency = parser.add_argument_group("concurrency")
+    concurrency.add_argument("--perk-concurrency", type=int, default=None, help="Perks scraped at once")
+    concurrency.add_argument("--openai-concurrency", type=int, default=None, help="OpenAI requests in flight")
+    concurrency.add_argument("--perplexity-concurrency", type=int, default=None, help="Perplexity searches in flight")
+    concurrency.add_argument("--browser-concurrency", type=int, default=None, help="Selenium renders at once")
+    concurrency.add_argument("--html-workers", type=int, default=None, help="HTML parsing processes (0 = inline)")
+
+    parser.add_argument("--cache", default=None, choices=CACHE_MODES, help="Cache mode (default: use)")
+    return parser
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """
+    Parse the command line and fill unset options from the profile, then the settings.
+
+    Args:
+        argv: Arguments (defaults to sys.argv[1:])
+
+    Returns:
+        Namespace with every option set
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    args.profile = args.profile or setting("RUN_PROFILE", "default")
+    if args.profile not in PROFILES:
+        parser.error(f"unknown profile {args.profile!r} - choose from {', '.join(sorted(PROFILES))}")
+    resolved = defaults()
+    resolved.update(PROFILES[args.profile])
+    for key, value in resolved.items():
+        if getattr(args, key) is None:
+            setattr(args, key, value)
+    if args.cache not in CACHE_MODES:
+        parser.error(f"unknown cache mode {args.cache!r} - choose from {', '.join(CACHE_MODES)}")
+    return args
+
+
+def configure(args: argparse.Namespace):
+    """
+    Apply the concurrency, cache and dry-run options to the shared clients, pools and caches.
+    """
+    from src.async_clients import set_limits
+    from src.html_worker import html_pool
+    from src.fetch_registry import fetch_registry
+    from src.dedup import page_index
+    from src.site_discovery import site_discovery
+    from src.link_ranker import link_ranker
+
+    set_limits(openai=args.openai_concurrency, perplexity=args.perplexity_concurrency,
+               browser=args.browser_concurrency)
+    html_pool.workers = args.html_workers
+
+    fetch_registry.enabled = args.cache != "off"
+    page_index.enabled = args.cache != "off"
+    site_discovery.set_cache_mode(args.cache)
+
+    # a dry run leaves the files it would otherwise update untouched
+    if args.dry_run:
+        site_discovery.persist = False
+    link_ranker.persist = not args.dry_run
+
+
+def select_records(records: PerkCollection, args: argparse.Namespace) -> List[PerkRecord]:
+    """
+    Narrow the table to the records picked by --ids, --name and --domain (all of them when none is given).
+
+    Returns:
+        The selected records in table order
+    """
+    selected = records.select(args.ids) if args.ids else list(records)
+    if args.names:
+        names = [name.lower() for name in args.names]
+        selected = [record for record in selected if record.name and any(name in record.name.lower() for name in names)]
+    if args.domains:
+        domain_ids = {record.id for domain in args.domains for record in records.by_domain(domain.lower().removeprefix("www."))}
+        selected = [record for record in selected if record.id in domain_ids]
+    return selected
+
+
+def print_config(args: argparse.Namespace):
+    print(f"Profile: {args.profile}  Stages: {','.join(args.stages) or '-'}  Cache: {args.cache}"
+          f"{'  DRY RUN' if args.dry_run else ''}")
+    print(f"Budgets: perks={args.max_perks} cost={args.max_cost} seconds={args.max_seconds} tokens={args.max_tokens} "
+          f"subpages/perk={args.max_subpages}")
+    print(f"Concurrency: perks={args.perk_concurrency} openai={args.openai_concurrency} "
+          f"perplexity={args.perplexity_concurrency} browser={args.browser_concurrency} html_workers={args.html_workers}")
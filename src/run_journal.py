@@ -0,0 +1,154 @@
+"""INFORMATION:
+Persisted per-perk stage state so an interrupted updater run can resume.
+
+Stages (in order):
+1. status_checked - URL status verified and written to Airtable
+2. scraped        - method 1 (BeautifulSoup + GPT) result stored
+3. extracted      - method 2 (Perplexity crawl) result stored (method 1 result updated if it was re-extracted)
+4. written        - combined result and its per-field confidence written to Airtable
+
+Persistence:
+1. The journal is an append-only JSONL file: a header line with the run start, then one line per stage change
+   ({"id": record ID, "stages": {stage: time}, "data": {...}}), so a mark costs one short write, not a rewrite
+2. Every line is flushed as it is written, so a crash or Ctrl-C loses at most the perk in progress;
+   a line cut off by a crash is skipped when the journal is replayed on load
+3. compact() rewrites the log as one line per perk (temp file + os.replace), e.g. at the end of an unfinished run
+4. A finished run is archived, so the next run starts fresh
+"""
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+STAGES = ("status_checked", "scraped", "extracted", "written")
+
+
+class RunJournal:
+    """
+    Per-perk stage journal for one updater run.
+    """
+
+    def __init__(self, path: str = "run_journal.jsonl"):
+        self.path = path
+        self.state: Dict[str, Any] = {"started_at": time.time(), "perks": {}}
+        self.resumed = False
+        self._lock = threading.Lock()
+        self._logged = False  # the file holds this journal's header (written with the first mark)
+
+        if os.path.exists(path):
+            try:
+                self._replay()
+                self.resumed = self._logged = True
+                done = sum(1 for perk in self.state["perks"].values() if "written" in perk["stages"])
+                started = time.strftime("%Y-%m-%d %H:%M", time.localtime(self.state["started_at"]))
+                print(f"Resuming run started at {started}: {len(self.state['perks'])} perks in journal, {done} already written.")
+            except (ValueError, KeyError) as e:
+                print(f"WARNING: Ignoring unreadable run journal {path}: {e}")
+                self.state = {"started_at": time.time(), "perks": {}}
+
+    def _perk(self, record_id: str) -> Dict[str, Any]:
+        return self.state["perks"].setdefault(record_id, {"stages": {}, "data": {}})
+
+    def _replay(self):
+        with open(self.path) as f:
+            lines = f.read().splitlines()
+        self.state = {"started_at": json.loads(lines[0])["started_at"], "perks": {}}
+        for number, line in enumerate(lines[1:], start=2):
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # only the last line can be cut off by a crash
+                if number == len(lines):
+                    print(f"WARNING: Skipping incomplete last line of run journal {self.path}")
+                    continue
+                raise
+            perk = self._perk(entry["id"])
+            perk["stages"].update(entry["stages"])
+            perk["data"].update(entry["data"])
+
+    def _write_log(self):
+        # header plus one line per perk, replacing the file atomically
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(json.dumps({"started_at": self.state["started_at"]}) + "\n")
+            for record_id, perk in self.state["perks"].items():
+                f.write(json.dumps({"id": record_id, "stages": perk["stages"], "data": perk["data"]}) + "\n")
+        os.replace(tmp_path, self.path)
+
+    def is_done(self, record_id: str, stage: str) -> bool:
+        """
+        Returns:
+            True if the given stage was completed for this record in the current run
+        """
+        perk = self.state["perks"].get(record_id)
+        return bool(perk) and stage in perk["stages"]
+
+    def last_stage(self, record_id: str) -> Optional[str]:
+        """
+        Returns:
+            The furthest completed stage for this record, or None
+        """
+        perk = self.state["perks"].get(record_id)
+        if not perk:
+            return None
+        done = [stage for stage in STAGES if stage in perk["stages"]]
+        return done[-1] if done else None
+
+    def pending_ids(self):
+        """
+        Returns:
+            Record IDs that were scraped or extracted in this run but not yet written
+        """
+        return [
+            record_id for record_id, perk in self.state["perks"].items()
+            if ("scraped" in perk["stages"] or "extracted" in perk["stages"]) and "written" not in perk["stages"]
+        ]
+
+    def mark(self, record_id: str, stage: str, **data):
+        """
+        Mark a stage as completed for a record and persist any stage results.
+
+        Args:
+            record_id: Airtable record ID
+            stage: One of STAGES
+            **data: JSON-serialisable results to keep for resuming (e.g. extraction dicts)
+        """
+        if stage not in STAGES:
+            raise ValueError(f"Unknown journal stage: {stage}")
+        stages = {stage: time.time()}
+        line = json.dumps({"id": record_id, "stages": stages, "data": data}) + "\n"
+        with self._lock:
+            perk = self._perk(record_id)
+            perk["stages"].update(stages)
+            perk["data"].update(data)
+            if not self._logged:
+                self._write_log()
+                self._logged = True
+                return
+            with open(self.path, "a") as f:
+                f.write(line)
+
+    def get(self, record_id: str, key: str, default: Any = None) -> Any:
+        perk = self.state["perks"].get(record_id)
+        if not perk:
+            return default
+        return perk["data"].get(key, default)
+
+    def compact(self):
+        """
+        Rewrite the log as one line per perk, so the next run replays a short file.
+        """
+        with self._lock:
+            if self._logged:
+                self._write_log()
+
+    def finish(self):
+        """
+        Archive the journal once every stage of the run has completed.
+        """
+        if not os.path.exists(self.path):
+            return
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.state["started_at"]))
+        root, ext = os.path.splitext(self.path)
+        os.replace(self.path, f"{root}.{stamp}.done{ext}")
@@ -0,0 +1,166 @@
+"""INFORMATION:
+Staleness-based scheduling: decide which perks are due for a re-check / re-scrape.
+
+Next due time per record:
+1. Starts from BASE_INTERVAL_HOURS after the last scrape (never-scraped perks are due immediately)
+2. Backs off exponentially while the scraped content stays unchanged (stable pages are visited less)
+3. Shrinks for perks whose content changes often or whose status flips (volatile perks are visited more)
+4. Shrinks for important perks (high monetary value or an explicit "Priority" field)
+5. Is clamped between MIN_INTERVAL_HOURS and MAX_INTERVAL_HOURS
+
+Budget:
+1. max_perks   - maximum number of perks processed per run
+2. max_cost    - maximum estimated API spend (USD) per run, read from the usage ledger
+3. max_seconds - maximum wall time per run
+4. max_tokens  - maximum LLM / search tokens (prompt + completion) per run, read from the usage ledger
+The most overdue perks are processed first, so a budget cut always drops the least urgent ones.
+"""
+import math
+import time
+from typing import Dict, List, Optional
+
+from src.usage import ledger
+from src.money import parse_money
+from src.perk_record import PerkRecord
+
+BASE_INTERVAL_HOURS = 24 * 7
+MIN_INTERVAL_HOURS = 24
+MAX_INTERVAL_HOURS = 24 * 90
+MAX_BACKOFF_STEPS = 4
+
+
+def importance(record: PerkRecord) -> float:
+    """
+    Score how important a perk is to keep fresh (0 = normal).
+
+    Args:
+        record: Perk record
+
+    Returns:
+        Importance score, roughly 0-3
+    """
+    score = 0.0
+
+    priority = record.priority
+    if isinstance(priority, (int, float)):
+        score += float(priority)
+    elif isinstance(priority, str) and priority.strip().lower() in ("high", "top"):
+        score += 1.0
+
+    value = record.value
+    if isinstance(value, str):
+        money = parse_money(value)
+        value = money.amount if money else None
+    if isinstance(value, (int, float)) and value > 0:
+        # $1k -> 0.5, $10k -> 1, $100k -> 1.5
+        score += max(0.0, (math.log10(value) - 2) / 2)
+
+    return min(score, 3.0)
+
+
+def interval_hours(state: Optional[Dict], record_importance: float = 0.0) -> float:
+    """
+    Compute the re-scrape interval for a record from its stored history.
+
+    Args:
+        state: Row from PerkStateStore (None if the perk was never seen)
+        record_importance: Score from importance()
+
+    Returns:
+        Interval in hours
+    """
+    interval = BASE_INTERVAL_HOURS
+    if state:
+        # stable content: double the interval for each unchanged scrape in a row
+        interval *= 2 ** min(state.get("unchanged_streak") or 0, MAX_BACKOFF_STEPS)
+
+        # volatile content: pages that changed on most scrapes are revisited sooner
+        scrapes = (state.get("change_count") or 0) + (state.get("unchanged_streak") or 0)
+        if scrapes >= 3 and (state.get("change_count") or 0) / scrapes > 0.5:
+            interval /= 2
+
+        # status flips (active <-> broken) are a sign the perk is being reworked
+        interval /= 1 + min(state.get("status_changes") or 0, 3)
+
+    interval /= 1 + record_importance
+    return max(MIN_INTERVAL_HOURS, min(MAX_INTERVAL_HOURS, interval))
+
+
+def next_due_at(state: Optional[Dict], record_importance: float = 0.0) -> float:
+    """
+    Returns:
+        Unix timestamp when the record is next due (0 if it was never scraped)
+    """
+    if not state or not state.get("last_scraped_at"):
+        return 0.0
+    return state["last_scraped_at"] + interval_hours(state, record_importance) * 3600
+
+
+class Budget:
+    """
+    Per-run limits on number of perks, estimated API spend, wall time and tokens.
+    None disables a limit.
+    """
+
+    def __init__(self, max_perks: Optional[int] = None, max_cost: Optional[float] = None,
+                 max_seconds: Optional[float] = None, max_tokens: Optional[int] = None):
+        self.max_perks = max_perks
+        self.max_cost = max_cost
+        self.max_seconds = max_seconds
+        self.max_tokens = max_tokens
+        self.started_at = time.time()
+        self.cost_at_start = ledger.spent()
+        self.tokens_at_start = ledger.tokens()
+        self.perks_done = 0
+
+    def spent(self) -> float:
+        return ledger.spent() - self.cost_at_start
+
+    def tokens(self) -> int:
+        return ledger.tokens() - self.tokens_at_start
+
+    def exhausted(self) -> Optional[str]:
+        """
+        Returns:
+            The reason the budget is used up, or None if work may continue
+        """
+        if self.max_perks is not None and self.perks_done >= self.max_perks:
+            return f"max perks reached ({self.max_perks})"
+        if self.max_cost is not None and self.spent() >= self.max_cost:
+            return f"max API spend reached (${self.spent():.2f} of ${self.max_cost:.2f})"
+        if self.max_seconds is not None and time.time() - self.started_at >= self.max_seconds:
+            return f"max wall time reached ({self.max_seconds:.0f}s)"
+        if self.max_tokens is not None and self.tokens() >= self.max_tokens:
+            return f"max tokens reached ({self.tokens()} of {self.max_tokens})"
+        return None
+
+
+def select_due(records: List[PerkRecord], states: Dict[str, Dict], now: Optional[float] = None,
+               max_perks: Optional[int] = None) -> List[PerkRecord]:
+    """
+    Pick the records that are due, most overdue first.
+
+    Args:
+        records: Perk records (already filtered to the candidates, e.g. active perks)
+        states: PerkStateStore.all_states()
+        now: Current Unix timestamp (defaults to now)
+        max_perks: Optional cap on the number of returned records
+
+    Returns:
+        The due records, ordered by how overdue they are relative to their interval
+    """
+    now = now or time.time()
+    due = []
+    for record in records:
+        state = states.get(record.id)
+        record_importance = importance(record)
+        due_at = next_due_at(state, record_importance)
+        if due_at > now:
+            continue
+        # never-scraped perks first, then by overdue time as a multiple of the interval
+        overdue = math.inf if due_at == 0 else (now - due_at) / (interval_hours(state, record_importance) * 3600)
+        due.append((overdue, record_importance, record))
+
+    due.sort(key=lambda item: (-item[0], -item[1]))
+    selected = [record for _, _, record in due]
+    return selected[:max_perks] if max_perks is not None else selected
@@ -0,0 +1,64 @@
+"""INFORMATION:
+Settings lookup shared by the src modules.
+
+Lookup order for setting(name, default):
+1. The attribute of config.py, imported on first use (not at module import)
+2. The environment variable of the same name (scrape_analyze.py and tests run without a config.py)
+3. The given default
+
+Notes:
+1. Modules read their settings through setting() instead of `import config`, so they can be imported without
+   a config.py or credentials; a missing key only fails the call that needs it
+2. Environment values are strings; they are converted to the type of the default (int, float, bool),
+   or with cast= for settings without a default (e.g. setting("MAX_COST_PER_RUN", cast=float))
+"""
+import os
+from typing import Any, Callable, Optional
+
+_UNSET = object()
+_config: Any = _UNSET
+
+
+def _load_config():
+    global _config
+    if _config is _UNSET:
+        try:
+            import config
+            _config = config
+        except ImportError:
+            _config = None
+    return _config
+
+
+def _convert(value: str, default: Any) -> Any:
+    if isinstance(default, bool):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    if isinstance(default, (int, float)):
+        try:
+            return type(default)(value)
+        except ValueError:
+            return default
+    return value
+
+
+def setting(name: str, default: Any = None, cast: Optional[Callable[[str], Any]] = None) -> Any:
+    """
+    Look up a setting in config.py, then in the environment.
+
+    Args:
+        name: Setting name, e.g. "OPENAI_API_KEY" or "MAX_CONNECTIONS"
+        default: Value used when neither defines it
+        cast: Conversion for environment values when there is no typed default
+
+    Returns:
+        The setting value
+    """
+    config = _load_config()
+    if config is not None and hasattr(config, name):
+        return getattr(config, name)
+    value: Optional[str] = os.environ.get(name)
+    if value is None or value == "":
+        return default
+    if cast is not None:
+        return cast(value)
+    return _convert(value, default) if default is not None else value
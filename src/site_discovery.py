@@ -0,0 +1,271 @@
+"""INFORMATION:
+Subpage discovery from robots.txt and sitemap.xml with plain HTTP (no browser).
+
+robots.txt:
+1. Fetched once per domain and parsed with urllib.robotparser
+2. Disallowed URLs are never returned, and Crawl-delay is honoured between requests to the same domain
+   (`wait()` from fetch threads, `await await_crawl_delay()` from the event loop)
+3. "Sitemap:" lines are used as sitemap locations (falls back to /sitemap.xml)
+
+Sitemaps:
+1. Streamed with requests + ElementTree.iterparse, so large sitemaps are never held in memory
+2. Sitemap indexes are followed, most perk-like child sitemaps first, up to MAX_SITEMAPS per domain
+3. Gzipped sitemaps (.xml.gz) are decompressed on the fly
+
+Caching:
+1. Robots rules and sitemap URLs are cached per domain in memory and in a JSON file for CACHE_TTL_HOURS
+2. A second perk on the same domain costs no requests at all; perks discovering the same domain at the same time
+   share one fetch (src/fetch_registry.py)
+3. The cache is updated and saved under a lock, so concurrent discoveries never write the file over each other
+4. `site_discovery.set_cache_mode("refresh")` ignores the saved entries (they are re-fetched and saved again),
+   "off" also stops saving; robots.txt is still fetched once per domain and run
+
+Ranking:
+1. Candidate URLs are scored by src.link_ranker (path tokens + learned weights), top-K are returned
+2. An empty result means the site has no usable sitemap; callers fall back to rendering the landing page
+"""
+import asyncio
+import gzip
+import json
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+import requests
+
+from src.metrics import timer, incr, domain_label
+from src.fetch_registry import fetch_registry
+from src.link_ranker import link_ranker, tokenize, PRIOR_WEIGHTS
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+CACHE_TTL_HOURS = 24 * 7
+MAX_SITEMAPS = 5
+MAX_SITEMAP_URLS = 5000
+MAX_CRAWL_DELAY = 30  # seconds; longer delays are capped so one site cannot stall the run
+REQUEST_TIMEOUT = 10
+
+
+def _bare_domain(netloc: str) -> str:
+    return netloc.lower().removeprefix("www.")
+
+
+def _sitemap_priority(sitemap_url: str) -> float:
+    """
+    Score a child sitemap of an index by its path, e.g. "sitemap-startups.xml" before "sitemap-blog.xml".
+    """
+    return sum(PRIOR_WEIGHTS.get(token, 0.0) for token in tokenize(urlparse(sitemap_url).path))
+
+
+class SiteDiscovery:
+    """
+    Per-domain robots.txt / sitemap cache with crawl-delay bookkeeping.
+    """
+
+    def __init__(self, cache_path: str = "site_discovery_cache.json"):
+        self.cache_path = cache_path
+        self.cache: Dict[str, Dict] = {}  # domain -> {"robots": str, "sitemap_urls": [...], "fetched_at": float}
+        self._parsers: Dict[str, RobotFileParser] = {}
+        self._last_request: Dict[str, float] = {}
+        self._lock = threading.Lock()  # cache and crawl-delay bookkeeping, shared by the discovery worker threads
+        self._save_lock = threading.Lock()
+        self.persist = True
+        if os.path.exists(cache_path):
+            try:
+                with open(cache_path) as f:
+                    self.cache = json.load(f)
+            except ValueError as e:
+                print(f"WARNING: Ignoring unreadable discovery cache {cache_path}: {e}")
+
+    # --- Politeness ---
+
+    def _robots(self, url: str) -> RobotFileParser:
+        domain = urlparse(url).netloc
+        if domain not in self._parsers:
+            parser = RobotFileParser()
+            parser.parse(self._domain_entry(url)["robots"].splitlines())
+            self._parsers[domain] = parser
+        return self._parsers[domain]
+
+    def can_fetch(self, url: str) -> bool:
+        return self._robots(url).can_fetch(USER_AGENT, url)
+
+    def crawl_delay(self, url: str) -> float:
+        robots = self._robots(url)
+        delay = robots.crawl_delay(USER_AGENT) or robots.crawl_delay("*") or 0
+        return min(float(delay), MAX_CRAWL_DELAY)
+
+    def _reserve(self, url: str) -> float:
+        """
+        Book the next request slot for the URL's domain.
+
+        Returns:
+            Seconds to wait before the request (0 if the Crawl-delay has already passed)
+        """
+        domain = urlparse(url).netloc
+        delay = self.crawl_delay(url)
+        with self._lock:
+            wait_for = self._last_request.get(domain, 0) + delay - time.time()
+            self._last_request[domain] = time.time() + max(wait_for, 0)
+        if wait_for > 0:
+            incr("crawl_delay_waits", domain=domain_label(url))
+        return max(wait_for, 0)
+
+    def wait(self, url: str):
+        """
+        Sleep until the domain's Crawl-delay has passed since the previous request to it.
+        """
+        wait_for = self._reserve(url)
+        if wait_for > 0:
+            time.sleep(wait_for)
+
+    async def await_crawl_delay(self, url: str):
+        """
+        Async version of wait(): the delay is awaited on the event loop, no worker thread sleeps through it.
+        """
+        # the slot is booked in a worker thread: the robots.txt of a new domain is fetched on first use
+        wait_for = await asyncio.to_thread(self._reserve, url)
+        if wait_for > 0:
+            await asyncio.sleep(wait_for)
+
+    # --- Fetching ---
+
+    def _get(self, url: str, stream: bool = False) -> Optional[requests.Response]:
+        if urlparse(url).netloc in self._parsers:
+            self.wait(url)  # robots.txt itself is fetched before any delay is known
+        try:
+            response = requests.get(url, headers={"User-Agent": USER_AGENT}, timeout=REQUEST_TIMEOUT, stream=stream)
+        except requests.RequestException as e:
+            print(f"INFO: Could not fetch {url}: {e}")
+            return None
+        if response.status_code != 200:
+            response.close()
+            return None
+        return response
+
+    def _fetch_robots(self, base_url: str) -> str:
+        with timer("fetch", domain=domain_label(base_url), method="robots"):
+            response = self._get(f"{base_url}/robots.txt")
+        return response.text if response is not None else ""
+
+    def _iter_sitemap(self, sitemap_url: str):
+        """
+        Stream one sitemap file.
+
+        Yields:
+            ("url", loc) for page entries and ("sitemap", loc) for child sitemaps of an index
+        """
+        with timer("fetch", domain=domain_label(sitemap_url), method="sitemap"):
+            response = self._get(sitemap_url, stream=True)
+        if response is None:
+            return
+        try:
+            response.raw.decode_content = True
+            source = gzip.GzipFile(fileobj=response.raw) if sitemap_url.endswith(".gz") else response.raw
+            for _, elem in ET.iterparse(source, events=("end",)):
+                tag = elem.tag.rsplit("}", 1)[-1]
+                if tag in ("url", "sitemap"):
+                    loc = next((child.text for child in elem if child.tag.rsplit("}", 1)[-1] == "loc"), None)
+                    if loc:
+                        yield tag, loc.strip()
+                    elem.clear()
+        except (ET.ParseError, OSError) as e:
+            print(f"INFO: Could not parse sitemap {sitemap_url}: {e}")
+        finally:
+            response.close()
+
+    def _collect_sitemap_urls(self, sitemap_urls: List[str], domain: str) -> List[str]:
+        pending = list(sitemap_urls)
+        seen_sitemaps, page_urls = set(), []
+        while pending and len(seen_sitemaps) < MAX_SITEMAPS and len(page_urls) < MAX_SITEMAP_URLS:
+            sitemap_url = pending.pop(0)
+            if sitemap_url in seen_sitemaps:
+                continue
+            seen_sitemaps.add(sitemap_url)
+            children = []
+            for kind, loc in self._iter_sitemap(sitemap_url):
+                if kind == "sitemap":
+                    children.append(loc)
+                elif _bare_domain(urlparse(loc).netloc) == _bare_domain(domain):
+                    page_urls.append(loc)
+                    if len(page_urls) >= MAX_SITEMAP_URLS:
+                        break
+            # most promising child sitemaps of an index first
+            pending = sorted(children, key=_sitemap_priority, reverse=True) + pending
+        return page_urls
+
+    def _domain_entry(self, url: str) -> Dict:
+        parsed = urlparse(url)
+        domain = parsed.netloc
+        with self._lock:
+            entry = self.cache.get(domain)
+        if entry and time.time() - entry["fetched_at"] < CACHE_TTL_HOURS * 3600:
+            return entry
+        # perks on the same domain discovering at the same time wait for one fetch
+        return fetch_registry.memo("site_discovery", domain, lambda: self._fetch_entry(parsed.scheme, domain))
+
+    def _fetch_entry(self, scheme: str, domain: str) -> Dict:
+        base_url = f"{scheme}://{domain}"
+        robots_text = self._fetch_robots(base_url)
+        parser = RobotFileParser()
+        parser.parse(robots_text.splitlines())
+        self._parsers[domain] = parser
+
+        sitemap_urls = parser.site_maps() or [f"{base_url}/sitemap.xml"]
+        entry = {
+            "robots": robots_text,
+            "sitemap_urls": self._collect_sitemap_urls(sitemap_urls, domain),
+            "fetched_at": time.time(),
+        }
+        with self._lock:
+            self.cache[domain] = entry
+        self._save()
+        return entry
+
+    def set_cache_mode(self, mode: str):
+        """
+        Args:
+            mode: "use" (default), "refresh" (drop the saved entries) or "off" (drop them and do not save)
+        """
+        if mode != "use":
+            with self._lock:
+                self.cache = {}
+        self.persist = mode != "off"
+
+    def _save(self):
+        if not self.persist:
+            return
+        with self._lock:
+            data = json.dumps(self.cache)
+        with self._save_lock:
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(data)
+            os.replace(tmp_path, self.cache_path)
+
+    # --- Discovery ---
+
+    def discover_subpages(self, url: str, max_pages: int = 5) -> List[str]:
+        """
+        Pick candidate perk pages for a URL from its site's sitemap, without rendering anything.
+
+        Args:
+            url: The perk's landing page
+            max_pages: Maximum number of subpages to return
+
+        Returns:
+            Ranked subpage URLs allowed by robots.txt (empty if the site has no usable sitemap)
+        """
+        entry = self._domain_entry(url)
+        candidates = [
+            (page_url, "", None, None) for page_url in entry["sitemap_urls"]
+            if page_url.rstrip("/") != url.rstrip("/") and self.can_fetch(page_url)
+        ]
+        incr("subpages_found", len(candidates), domain=domain_label(url), method="sitemap")
+        return link_ranker.rank(candidates, max_pages)
+
+
+site_discovery = SiteDiscovery()
@@ -0,0 +1,196 @@
+"""INFORMATION:
+Local SQLite store with the last known state of every perk, keyed by Airtable record ID.
+
+Stored per record:
+1. Name and URL (for reporting only - lookups are always by record ID)
+2. Last status ("active", "broken/expired", "no_link"), HTTP code and check time
+3. Hash of the last scraped page text and scrape time
+4. Change history for scheduling: number of content changes, consecutive unchanged scrapes and
+   number of status flips; due times are derived from it on every run (src/scheduler.py), not stored
+
+Queries:
+1. active_ids() returns a set, so filtering records is O(1) per record
+2. stale_ids(max_age) returns records never checked or last checked before now - max_age
+3. get(record_id) returns the full row as a dict
+
+Migration:
+1. import_active_names() seeds an empty store from the legacy perks_active.txt name list
+"""
+import hashlib
+import sqlite3
+import time
+from typing import Dict, Iterable, Optional, Set
+
+from src.perk_record import PerkRecord
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS perk_state (
+    record_id       TEXT PRIMARY KEY,
+    name            TEXT,
+    url             TEXT,
+    last_status     TEXT,
+    http_code       INTEGER,
+    last_checked_at REAL,
+    content_hash    TEXT,
+    last_scraped_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_perk_state_status ON perk_state (last_status);
+CREATE INDEX IF NOT EXISTS idx_perk_state_checked ON perk_state (last_checked_at);
+"""
+
+# Columns added after the first version of the schema, created on open if missing
+MIGRATIONS = {
+    "change_count": "INTEGER NOT NULL DEFAULT 0",
+    "unchanged_streak": "INTEGER NOT NULL DEFAULT 0",
+    "status_changes": "INTEGER NOT NULL DEFAULT 0",
+}
+
+
+def content_hash(text: Optional[str]) -> Optional[str]:
+    """
+    Returns:
+        A short sha256 hex digest of the text, or None for empty text
+    """
+    if not text:
+        return None
+    return hashlib.sha256(text.encode("utf-8", errors="ignore")).hexdigest()[:32]
+
+
+class PerkStateStore:
+    """
+    Thin wrapper around a single-table SQLite database.
+    """
+
+    def __init__(self, path: str = "perks_state.db"):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(perk_state)")}
+        for column, definition in MIGRATIONS.items():
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE perk_state ADD COLUMN {column} {definition}")
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def is_empty(self) -> bool:
+        return self.conn.execute("SELECT 1 FROM perk_state LIMIT 1").fetchone() is None
+
+    def record_status(self, record_id: str, name: str, url: Optional[str], status: str,
+                      http_code: Optional[int] = None, checked_at: Optional[float] = None):
+        """
+        Store the result of a URL status check.
+
+        Args:
+            record_id: Airtable record ID
+            name: Perk name
+            url: Perk URL that was checked
+            status: "active", "broken/expired" or "no_link"
+            http_code: HTTP status code (None if the URL was unreachable)
+            checked_at: Unix timestamp of the check (defaults to now)
+        """
+        self.conn.execute(
+            """
+            INSERT INTO perk_state (record_id, name, url, last_status, http_code, last_checked_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(record_id) DO UPDATE SET
+                name = excluded.name,
+                url = excluded.url,
+                status_changes = status_changes + (
+                    perk_state.last_status IS NOT NULL AND perk_state.last_status != excluded.last_status
+                ),
+                last_status = excluded.last_status,
+                http_code = excluded.http_code,
+                last_checked_at = excluded.last_checked_at
+            """,
+            (record_id, name, url, status, http_code, time.time() if checked_at is None else checked_at),
+        )
+        self.conn.commit()
+
+    def record_scrape(self, record_id: str, page_text: Optional[str]) -> bool:
+        """
+        Store the hash of freshly scraped page text.
+
+        Returns:
+            True if the content changed since the previous scrape (or was never scraped)
+        """
+        new_hash = content_hash(page_text)
+        row = self.conn.execute(
+            "SELECT content_hash FROM perk_state WHERE record_id = ?", (record_id,)
+        ).fetchone()
+        changed = row is None or row["content_hash"] != new_hash
+        self.conn.execute(
+            """
+            INSERT INTO perk_state (record_id, content_hash, last_scraped_at, change_count) VALUES (?, ?, ?, 1)
+            ON CONFLICT(record_id) DO UPDATE SET
+                content_hash = excluded.content_hash,
+                last_scraped_at = excluded.last_scraped_at,
+                change_count = change_count + ?,
+                unchanged_streak = CASE WHEN ? THEN 0 ELSE unchanged_streak + 1 END
+            """,
+            (record_id, new_hash, time.time(), int(changed), int(changed)),
+        )
+        self.conn.commit()
+        return changed
+
+    def all_states(self) -> Dict[str, Dict]:
+        """
+        Returns:
+            Every stored row as a dict, keyed by record ID
+        """
+        return {row["record_id"]: dict(row) for row in self.conn.execute("SELECT * FROM perk_state")}
+
+    def get(self, record_id: str) -> Optional[Dict]:
+        row = self.conn.execute("SELECT * FROM perk_state WHERE record_id = ?", (record_id,)).fetchone()
+        return dict(row) if row else None
+
+    def active_ids(self) -> Set[str]:
+        """
+        Returns:
+            Set of record IDs whose last status check found the link active
+        """
+        rows = self.conn.execute("SELECT record_id FROM perk_state WHERE last_status = 'active'")
+        return {row["record_id"] for row in rows}
+
+    def stale_ids(self, max_age: float, now: Optional[float] = None) -> Set[str]:
+        """
+        Args:
+            max_age: Maximum age of the last status check, in seconds
+
+        Returns:
+            Set of record IDs checked longer ago than max_age (records never checked are not in the
+            store and must be treated as stale by the caller)
+        """
+        cutoff = (now or time.time()) - max_age
+        rows = self.conn.execute(
+            "SELECT record_id FROM perk_state WHERE last_checked_at IS NULL OR last_checked_at < ?",
+            (cutoff,),
+        )
+        return {row["record_id"] for row in rows}
+
+    def checked_ids(self) -> Set[str]:
+        rows = self.conn.execute("SELECT record_id FROM perk_state WHERE last_checked_at IS NOT NULL")
+        return {row["record_id"] for row in rows}
+
+    def import_active_names(self, records: Iterable[PerkRecord], path: str = "perks_active.txt") -> int:
+        """
+        Seed the store from the legacy perks_active.txt file (one perk name per line).
+
+        Returns:
+            Number of records imported as active
+        """
+        try:
+            with open(path) as f:
+                active_names = {line.strip() for line in f if line.strip()}
+        except FileNotFoundError:
+            return 0
+
+        imported = 0
+        for record in records:
+            if record.name in active_names:
+                # checked_at = 0 keeps the import "stale" so the next status run re-checks it
+                self.record_status(record.id, record.name, record.link, "active", checked_at=0)
+                imported += 1
+        return imported
@@ -0,0 +1,220 @@
+"""INFORMATION:
+Schema-validated extraction of the four perk fields with OpenAI structured outputs.
+
+Schema:
+1. One compact JSON schema (PERK_SCHEMA) for "Brief description of the provider", "What you get", "How to get it" and "Value"
+2. Sent as response_format json_schema with strict=True, so the model can only emit valid JSON with exactly these keys
+3. Replaces the regex JSON scraping (re.search(r"\{.*\}")) and its "Error parsing" results
+
+Streaming:
+1. Responses are streamed; StreamingJSONParser accumulates the deltas and can return the fields seen so far at any point
+2. Token usage is read from the final stream chunk (stream_options include_usage) and recorded in the usage ledger
+
+Repair:
+1. A response cut off by max_tokens or a dropped stream is repaired cheaply (close the open string, drop a dangling key, close the object)
+2. Fields that are still missing after repair are set to "Not found" instead of failing the whole extraction
+3. Only a failed API call returns the caller's fallback - one round trip per extraction, no re-ask retries
+4. Repairs made inside a `with track_repairs() as repairs:` block are listed in `repairs`, so src/model_router.py
+   can escalate truncated output to the strong model
+
+Async:
+1. aextract_fields() does the same over the shared AsyncOpenAI client (src/async_clients.py)
+"""
+import contextvars
+import json
+import re
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from src.async_clients import limit
+from src.metrics import incr
+from src.usage import track_usage
+
+PERK_FIELDS = ["Brief description of the provider", "What you get", "How to get it", "Value"]
+NOT_FOUND = "Not found"
+
+PERK_SCHEMA = {
+    "type": "object",
+    "properties": {field: {"type": "string"} for field in PERK_FIELDS},
+    "required": PERK_FIELDS,
+    "additionalProperties": False,
+}
+PERK_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "perk_info", "strict": True, "schema": PERK_SCHEMA},
+}
+
+_DANGLING_KEY = re.compile(r',?\s*"[^"]*"\s*:?\s*$')
+
+_repairs: contextvars.ContextVar[Optional[List[str]]] = contextvars.ContextVar("structured_repairs", default=None)
+
+
+@contextmanager
+def track_repairs() -> Iterator[List[str]]:
+    """
+    Collect the stages whose output had to be repaired inside the block (same thread or asyncio task).
+    """
+    repairs: List[str] = []
+    token = _repairs.set(repairs)
+    try:
+        yield repairs
+    finally:
+        _repairs.reset(token)
+
+
+def _repaired(stage: str):
+    incr("llm_repairs", caller=stage)
+    repairs = _repairs.get()
+    if repairs is not None:
+        repairs.append(stage)
+
+
+def repair_json(text: str) -> Optional[Dict]:
+    """
+    Parse a possibly truncated JSON object.
+
+    Args:
+        text: Raw (partial) model output
+
+    Returns:
+        The parsed object, or None if it cannot be repaired
+    """
+    text = text.strip()
+    start = text.find("{")
+    if start == -1:
+        return None
+    text = text[start:]
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+
+    # close an unterminated string (an odd number of unescaped quotes)
+    if len(re.findall(r'(?<!\\)"', text)) % 2:
+        text += '"'
+    # drop a trailing comma or a key without a value, then close the object
+    candidate = text.rstrip().rstrip(",")
+    for attempt in (candidate + "}", _DANGLING_KEY.sub("", candidate) + "}"):
+        try:
+            return json.loads(attempt)
+        except ValueError:
+            continue
+    return None
+
+
+class StreamingJSONParser:
+    """
+    Accumulates streamed content deltas of one JSON object.
+    """
+
+    def __init__(self):
+        self._chunks: List[str] = []
+
+    def feed(self, delta: Optional[str]):
+        if delta:
+            self._chunks.append(delta)
+
+    @property
+    def text(self) -> str:
+        return "".join(self._chunks)
+
+    def partial(self) -> Optional[Dict]:
+        """
+        Returns:
+            The fields received so far (repaired), or None if nothing parseable arrived yet
+        """
+        return repair_json(self.text)
+
+
+def normalize_fields(data: Optional[Dict]) -> Dict[str, str]:
+    """
+    Keep exactly the four perk fields; missing or empty ones become "Not found".
+    """
+    data = data or {}
+    return {field: str(data.get(field) or NOT_FOUND).strip() or NOT_FOUND for field in PERK_FIELDS}
+
+
+def _request(model: str, prompt: str, temperature: float, max_tokens: int) -> Dict:
+    return {
+        "model": model,
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "response_format": PERK_RESPONSE_FORMAT,
+        "stream": True,
+        "stream_options": {"include_usage": True},
+    }
+
+
+def _read_chunk(chunk, parser: StreamingJSONParser, call, finish_reason: Optional[str]) -> Optional[str]:
+    if chunk.usage:
+        call.usage = chunk.usage
+    if chunk.choices:
+        parser.feed(chunk.choices[0].delta.content)
+        return chunk.choices[0].finish_reason or finish_reason
+    return finish_reason
+
+
+def _failed(parser: StreamingJSONParser, stage: str, error: Exception, fallback: Optional[Dict]) -> Dict[str, str]:
+    print(f"Error with structured extraction ({stage}): {error}")
+    if parser.text:
+        _repaired(stage)
+        return normalize_fields(parser.partial())
+    return dict(fallback) if fallback else normalize_fields(None)
+
+
+def _finish(parser: StreamingJSONParser, stage: str, finish_reason: Optional[str]) -> Dict[str, str]:
+    data = parser.partial()
+    if finish_reason not in (None, "stop") or data is None:
+        print(f"⚠️ Structured output ended with '{finish_reason}', using repaired fields")
+        _repaired(stage)
+    if data is None:
+        incr("llm_parse_errors", provider="openai", caller=stage)
+    return normalize_fields(data)
+
+
+def extract_fields(client, model: str, prompt: str, stage: str, fallback: Optional[Dict] = None,
+                   temperature: float = 0.2, max_tokens: int = 800) -> Dict[str, str]:
+    """
+    Run one streamed structured-output call and return the four perk fields.
+
+    Args:
+        client: OpenAI client
+        model: Model id
+        prompt: User prompt describing the extraction
+        stage: Stage name for the usage ledger and metrics
+        fallback: Value returned if the API call itself fails (defaults to all "Not found")
+        temperature: Sampling temperature
+        max_tokens: Completion token cap
+
+    Returns:
+        Dict with exactly the PERK_FIELDS keys
+    """
+    parser = StreamingJSONParser()
+    finish_reason = None
+    try:
+        with track_usage("openai", model, stage=stage) as call:
+            stream = client.chat.completions.create(**_request(model, prompt, temperature, max_tokens))
+            for chunk in stream:
+                finish_reason = _read_chunk(chunk, parser, call, finish_reason)
+    except Exception as e:
+        return _failed(parser, stage, e, fallback)
+    return _finish(parser, stage, finish_reason)
+
+
+async def aextract_fields(client, model: str, prompt: str, stage: str, fallback: Optional[Dict] = None,
+                          temperature: float = 0.2, max_tokens: int = 800) -> Dict[str, str]:
+    """
+    Async version of extract_fields() for an AsyncOpenAI client; holds an "openai" concurrency slot while streaming.
+    """
+    parser = StreamingJSONParser()
+    finish_reason = None
+    try:
+        async with limit("openai"):
+            with track_usage("openai", model, stage=stage) as call:
+                stream = await client.chat.completions.create(**_request(model, prompt, temperature, max_tokens))
+                async for chunk in stream:
+                    finish_reason = _read_chunk(chunk, parser, call, finish_reason)
+    except Exception as e:
+        return _failed(parser, stage, e, fallback)
+    return _finish(parser, stage, finish_reason)
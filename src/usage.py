@@ -0,0 +1,269 @@
+"""INFORMATION:
+Token and cost ledger for every LLM and search call made by the updater.
+
+Recording:
+1. Wrap a call with `with track_usage("openai", "gpt-4o", stage="extract_with_gpt") as call:`
+2. Assign the SDK response (`call.response = response`) or a raw usage dict (`call.usage = {...}`)
+3. Prompt/completion tokens, latency and estimated cost are stored with the current perk and run id
+4. The same latency is reported to src.metrics under the "llm" or "search" stage
+
+Perk attribution:
+1. `with perk_context(perk_name):` tags every call made inside the block
+2. Uses contextvars, so it is safe for threads and asyncio tasks
+
+Querying:
+1. `ledger.totals()`, `ledger.group_by("perk")`, `ledger.group_by("stage")`, `ledger.top("perk")`
+2. `ledger.save(path)` appends the run to a JSONL file
+3. `python -m src.usage usage_ledger.jsonl --by perk` reports on a saved ledger after the run
+"""
+import argparse
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.metrics import observe, incr
+
+# USD per 1M tokens (input, output), shared with the dashboard API (perks_scrapper/app/usage.py).
+# Unknown models are costed at 0 and flagged.
+MODEL_PRICING_PATH = os.path.join(os.path.dirname(__file__), '..', 'model_pricing.json')
+
+
+def _load_pricing(path: str) -> Dict[str, tuple]:
+    with open(path) as f:
+        return {model: tuple(prices) for model, prices in json.load(f).items()}
+
+
+MODEL_PRICING = _load_pricing(MODEL_PRICING_PATH)
+
+# USD charged per request on top of tokens (search providers)
+REQUEST_FEES = {
+    "perplexity": 0.005,
+}
+
+_current_perk: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_perk", default=None)
+
+
+def estimate_cost(provider: str, model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """
+    Estimate the USD cost of a single call from the pricing tables.
+    """
+    input_price, output_price = MODEL_PRICING.get(model, (0.0, 0.0))
+    cost = (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+    return cost + REQUEST_FEES.get(provider, 0.0)
+
+
+def _read_usage(usage: Any) -> Dict[str, int]:
+    """
+    Normalise an OpenAI usage object or a raw usage dict into token counts.
+    """
+    if usage is None:
+        return {"prompt_tokens": 0, "completion_tokens": 0}
+    if hasattr(usage, "model_dump"):
+        usage = usage.model_dump()
+    prompt_tokens = usage.get("prompt_tokens", usage.get("input_tokens", 0)) or 0
+    completion_tokens = usage.get("completion_tokens", usage.get("output_tokens", 0)) or 0
+    return {"prompt_tokens": int(prompt_tokens), "completion_tokens": int(completion_tokens)}
+
+
+class UsageCall:
+    """
+    Handle yielded by track_usage(); set `response` or `usage` inside the block.
+    """
+    __slots__ = ("response", "usage")
+
+    def __init__(self):
+        self.response = None
+        self.usage = None
+
+
+class UsageLedger:
+    """
+    In-memory list of usage entries for one run, with simple group-by queries.
+    """
+
+    def __init__(self, run_id: Optional[str] = None):
+        self.run_id = run_id or time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+        self.entries: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def record(self, provider: str, model: str, stage: str, usage: Any = None,
+               latency: float = 0.0, perk: Optional[str] = None, ok: bool = True) -> Dict[str, Any]:
+        """
+        Add one call to the ledger.
+
+        Args:
+            provider: "openai" or "perplexity"
+            model: Model id used for the call
+            stage: Pipeline stage / calling function
+            usage: Usage object or dict from the API response
+            latency: Wall time of the call in seconds
+            perk: Perk name (defaults to the active perk_context)
+            ok: Whether the call succeeded
+
+        Returns:
+            The stored entry
+        """
+        tokens = _read_usage(usage)
+        entry = {
+            "run_id": self.run_id,
+            "timestamp": time.time(),
+            "perk": perk or _current_perk.get(),
+            "stage": stage,
+            "provider": provider,
+            "model": model,
+            "prompt_tokens": tokens["prompt_tokens"],
+            "completion_tokens": tokens["completion_tokens"],
+            "total_tokens": tokens["prompt_tokens"] + tokens["completion_tokens"],
+            "latency": round(latency, 4),
+            "cost": round(estimate_cost(provider, model, tokens["prompt_tokens"], tokens["completion_tokens"]), 6),
+            "ok": ok,
+        }
+        if model not in MODEL_PRICING:
+            incr("usage_unpriced_model", provider=provider, model=model)
+        with self._lock:
+            self.entries.append(entry)
+        return entry
+
+    def totals(self, entries: Optional[List[Dict[str, Any]]] = None) -> Dict[str, float]:
+        entries = self.entries if entries is None else entries
+        return {
+            "calls": len(entries),
+            "prompt_tokens": sum(e["prompt_tokens"] for e in entries),
+            "completion_tokens": sum(e["completion_tokens"] for e in entries),
+            "total_tokens": sum(e["total_tokens"] for e in entries),
+            "latency": round(sum(e["latency"] for e in entries), 3),
+            "cost": round(sum(e["cost"] for e in entries), 6),
+        }
+
+    def group_by(self, key: str) -> Dict[str, Dict[str, float]]:
+        """
+        Aggregate entries by a field such as "perk", "stage", "model" or "run_id".
+        """
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        for entry in self.entries:
+            groups.setdefault(str(entry.get(key)), []).append(entry)
+        return {name: self.totals(items) for name, items in groups.items()}
+
+    def top(self, key: str = "perk", n: int = 10, metric: str = "cost"):
+        """
+        Returns:
+            The n groups with the highest total for the given metric
+        """
+        grouped = self.group_by(key)
+        return sorted(grouped.items(), key=lambda item: -item[1][metric])[:n]
+
+    def spent(self) -> float:
+        with self._lock:
+            return sum(e["cost"] for e in self.entries)
+
+    def tokens(self) -> int:
+        with self._lock:
+            return sum(e["total_tokens"] for e in self.entries)
+
+    def save(self, path: str):
+        """
+        Append this run's entries to a JSONL file.
+        """
+        with open(path, "a") as f:
+            for entry in self.entries:
+                f.write(json.dumps(entry) + "\n")
+
+    @classmethod
+    def load(cls, path: str, run_id: Optional[str] = None) -> "UsageLedger":
+        """
+        Load a saved JSONL ledger, optionally restricted to one run.
+        """
+        ledger = cls(run_id=run_id or "loaded")
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if run_id is None or entry.get("run_id") == run_id:
+                    ledger.entries.append(entry)
+        return ledger
+
+    def print_summary(self, top_n: int = 10):
+        totals = self.totals()
+        print(f"\n{'-' * 75}\nLLM / search usage\n{'-' * 75}")
+        print(f"Calls: {totals['calls']}  Tokens: {totals['total_tokens']} "
+              f"(prompt {totals['prompt_tokens']}, completion {totals['completion_tokens']})  "
+              f"Est. cost: ${totals['cost']:.4f}")
+        for key in ("stage", "perk"):
+            print(f"By {key}:")
+            for name, group in self.top(key, n=top_n):
+                print(f"  {name:<40} calls={group['calls']:<4} tokens={group['total_tokens']:<8} ${group['cost']:.4f}")
+
+
+# Default ledger for the current process / run
+ledger = UsageLedger()
+
+
+@contextmanager
+def perk_context(perk: Optional[str]) -> Iterator[None]:
+    """
+    Attribute every call made inside the block to the given perk.
+    """
+    token = _current_perk.set(perk)
+    try:
+        yield
+    finally:
+        _current_perk.reset(token)
+
+
+def current_perk() -> Optional[str]:
+    return _current_perk.get()
+
+
+@contextmanager
+def track_usage(provider: str, model: str, stage: str, kind: str = "llm") -> Iterator[UsageCall]:
+    """
+    Time an API call and record its token usage in the default ledger.
+
+    Args:
+        provider: "openai" or "perplexity"
+        model: Model id used for the call
+        stage: Pipeline stage / calling function
+        kind: Metrics stage to report latency under ("llm" or "search")
+    """
+    call = UsageCall()
+    start = time.perf_counter()
+    ok = True
+    try:
+        yield call
+    except Exception:
+        ok = False
+        incr(f"{kind}_errors", provider=provider, model=model, caller=stage)
+        raise
+    finally:
+        latency = time.perf_counter() - start
+        usage = call.usage
+        if usage is None and call.response is not None:
+            usage = getattr(call.response, "usage", None)
+        ledger.record(provider, model, stage, usage=usage, latency=latency, ok=ok)
+        observe(kind, latency, provider=provider, model=model, caller=stage)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report on a saved usage ledger.")
+    parser.add_argument("path", help="JSONL file written by UsageLedger.save()")
+    parser.add_argument("--run", default=None, help="Restrict to one run id")
+    parser.add_argument("--by", default="perk", choices=["perk", "stage", "model", "provider", "run_id"])
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    saved = UsageLedger.load(args.path, run_id=args.run)
+    totals = saved.totals()
+    print(f"Calls: {totals['calls']}  Tokens: {totals['total_tokens']}  Est. cost: ${totals['cost']:.4f}")
+    for name, group in saved.top(args.by, n=args.top):
+        print(f"{name:<40} calls={group['calls']:<4} prompt={group['prompt_tokens']:<8} "
+              f"completion={group['completion_tokens']:<8} latency={group['latency']:<8} ${group['cost']:.4f}")
+
+
+if __name__ == "__main__":
+    main()
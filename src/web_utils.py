@@ -1,41 +1,57 @@
 import requests
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+
+from src.metrics import timer, incr, domain_label
+from src.fetch_registry import fetch_registry
+from src.html_worker import html_pool
 
 # checks for 200 code from url
 def is_url_alive(url):
     try:
-        response = requests.get(url, timeout=10)
+        with timer("fetch", domain=domain_label(url), method="requests"):
+            response = requests.get(url, timeout=10)
         return response.status_code == 200
     except Exception:
         return False
 
-# gets text from url
+# gets text from url, once per normalized url and run
 def scraper_beautiful_soup(url):
+    return fetch_registry.fetch("requests_text", url, _scraper_beautiful_soup)
+
+def _scraper_beautiful_soup(url):
+    domain = domain_label(url)
     try:
-        response = requests.get(url, timeout=10)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        texts = soup.find_all(['h1', 'h2', 'p', 'li'])
-        page_text = "\n".join(t.get_text(strip=True) for t in texts)
+        with timer("fetch", domain=domain, method="requests"):
+            response = requests.get(url, timeout=10)
+        with timer("parse", domain=domain):
+            # h1/h2/p/li texts, parsed in the worker pool (src/html_worker.py)
+            page_text = html_pool.parse(response.content, response.encoding, blocks=True)["blocks"]
+        incr("pages_fetched", domain=domain, method="requests")
         return page_text
     except Exception:
+        incr("fetch_failures", domain=domain, method="requests")
         return 
 
 # deals with pages that have cookies to allow scraping
 def access_page_with_cookies(url):
+    # selenium is only imported by the runs that need a browser
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
     chrome_options = Options()
     chrome_options.add_argument("--headless")
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--disable-dev-shm-usage")
     
-    driver = webdriver.Chrome(options=chrome_options)
+    domain = domain_label(url)
+    with timer("browser_start", method="selenium"):
+        driver = webdriver.Chrome(options=chrome_options)
     
     try:
-        driver.get(url)
+        with timer("fetch", domain=domain, method="selenium"):
+            driver.get(url)
         
         try:
             cookie_button = WebDriverWait(driver, 5).until(
@@ -47,7 +63,9 @@ def access_page_with_cookies(url):
             print("INFO: No cookie banner detected")
         
         page_source = driver.page_source
-        if is_fake_404(page_source):
+        with timer("parse", domain=domain):
+            fake_404 = is_fake_404(page_source)
+        if fake_404:
             print("ERROR: Detected 404-like error inside page (Selenium)")
             return 404
         
@@ -60,24 +78,8 @@ def access_page_with_cookies(url):
 
 # checks if pages with 200 code are in reality active
 def is_fake_404(html_text):
-    soup = BeautifulSoup(html_text, "html.parser")
-    
-    # Check <title>
-    if soup.title and any(word in soup.title.text.lower() for word in ["404", "page not found", "not found", "error"]):
-        return True
-    
-    # Check main heading
-    h1 = soup.find("h1")
-    if h1 and any(word in h1.text.lower() for word in ["404", "page not found", "not found", "error"]):
-        return True
-    
-    # Optional: check for known error container divs/classes
-    error_keywords = ["error-page", "not-found", "404"]
-    for keyword in error_keywords:
-        if soup.find(class_=lambda x: x and keyword in x):
-            return True
-    
-    return False
+    # title, main heading and error container checks run in the worker pool (src/html_worker.py)
+    return html_pool.parse(html_text, fake_404=True)["fake_404"]
 
 # gets the status code from each page
 def get_url_status_code(url):
@@ -93,15 +95,18 @@ def get_url_status_code(url):
     
     session = requests.Session()
     session.headers.update(headers)
+    domain = domain_label(url)
 
     try:
         # HEAD request first
-        response = session.head(url, allow_redirects=True, timeout=5)
+        with timer("fetch", domain=domain, method="head"):
+            response = session.head(url, allow_redirects=True, timeout=5)
         
         # If HEAD gives bad result, retry GET anyway
         if response.status_code >= 400:
             print("ERROR: HEAD request failed or returned error, retrying with GET...")
-            response = session.get(url, allow_redirects=True, timeout=10)
+            with timer("fetch", domain=domain, method="requests"):
+                response = session.get(url, allow_redirects=True, timeout=10)
 
         # After GET:
 
@@ -120,7 +125,9 @@ def get_url_status_code(url):
             return selenium_result
         
         # If 200 OK, double-check page content
-        if is_fake_404(response.text):
+        with timer("parse", domain=domain):
+            fake_404 = is_fake_404(response.text)
+        if fake_404:
             print("ERROR: Detected 404-like error inside page (GET content)")
             return 404
         
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the tests import the updater modules as `src.*`, like perks_updater.py run from the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
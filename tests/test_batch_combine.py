@@ -0,0 +1,61 @@
+from src.batch_combine import NOT_FOUND, STANDARD_KEYS, combine_batch, combine_pair
+
+DESCRIPTION = "Cloud hosting platform for web applications and databases"
+OTHER_DESCRIPTION = "Managed cloud platform that hosts web apps, APIs and databases"
+
+
+def test_empty_batch():
+    assert combine_batch([]) == ([], [])
+
+
+def test_neither_method_filled():
+    combined, scores = combine_pair({"Value": "Not found", "What you get": ""}, None)
+    assert combined == {key: NOT_FOUND for key in STANDARD_KEYS}
+    assert scores == {key: 0.0 for key in STANDARD_KEYS}
+
+
+def test_placeholder_loses_to_a_value():
+    combined, scores = combine_pair({"Brief description of the provider": "Not found"},
+                                    {"Brief description of the provider": DESCRIPTION})
+    assert combined["Brief description of the provider"] == DESCRIPTION
+    assert scores["Brief description of the provider"] == 0.5
+
+
+def test_tie_goes_to_method_2():
+    combined, scores = combine_pair({"What you get": "Free credits A"}, {"What you get": "Free credits B"})
+    assert combined["What you get"] == "Free credits A"
+    assert 0.0 < scores["What you get"] <= 0.5
+
+
+def test_longest_text_wins():
+    combined, scores = combine_pair({"Brief description of the provider": DESCRIPTION},
+                                    {"Brief description of the provider": OTHER_DESCRIPTION})
+    assert combined["Brief description of the provider"] == OTHER_DESCRIPTION
+    assert 0.5 < scores["Brief description of the provider"] <= 1.0
+
+
+def test_key_name_variations():
+    combined, _ = combine_pair({"Provider Description": DESCRIPTION}, {"Money Value": "$5,000"})
+    assert combined["Brief description of the provider"] == DESCRIPTION
+    assert combined["Value"] == "$5,000"
+
+
+def test_value_prefers_parsed_then_larger_amount():
+    combined, _ = combine_pair({"Value": "Lots of credits"}, {"Value": "$5,000"})
+    assert combined["Value"] == "$5,000"
+    combined, _ = combine_pair({"Value": "$1,000"}, {"Value": "$5,000"})
+    assert combined["Value"] == "$5,000"
+
+
+def test_agreeing_values_are_confident():
+    _, agree = combine_pair({"Value": "$5,000"}, {"Value": "$5,000 in credits"})
+    _, differ = combine_pair({"Value": "$1,000 in credits"}, {"Value": "$5,000 in credits"})
+    assert agree["Value"] > 0.9
+    assert differ["Value"] < agree["Value"]
+
+
+def test_batch_keeps_order():
+    pairs = [({"Value": "$100"}, None), (None, {"Value": "$200"}), (None, None)]
+    combined, scores = combine_batch(pairs)
+    assert [row["Value"] for row in combined] == ["$100", "$200", NOT_FOUND]
+    assert scores[2]["Value"] == 0.0
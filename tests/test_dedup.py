@@ -0,0 +1,35 @@
+from src.dedup import BlockDeduplicator
+
+FOOTER = "Copyright 2024 Example Inc. All rights reserved. Terms of service and privacy policy apply here."
+PERK = "Startups in the program receive $5,000 in cloud credits valid for twelve months after approval."
+OTHER = "Eligible companies must be under five years old and have raised less than ten million dollars."
+
+
+def test_unique_text_is_unchanged():
+    text = f"{PERK}\n{OTHER}"
+    assert BlockDeduplicator().dedupe(text) is text
+
+
+def test_empty_text():
+    assert BlockDeduplicator().dedupe(None) is None
+    assert BlockDeduplicator().dedupe("") == ""
+
+
+def test_repeated_block_is_dropped():
+    dedup = BlockDeduplicator()
+    dedup.dedupe(f"{PERK}\n{FOOTER}")
+    assert dedup.dedupe(f"{OTHER}\n{FOOTER}") == OTHER
+
+
+def test_short_blocks_need_an_exact_repeat():
+    dedup = BlockDeduplicator()
+    dedup.dedupe(f"{PERK}\nSign up today")
+    assert dedup.dedupe(f"{OTHER}\nSign up today!") == OTHER
+    assert dedup.dedupe("Sign up now") == "Sign up now"
+
+
+def test_blocks_beyond_limit_are_not_remembered():
+    dedup = BlockDeduplicator()
+    dedup.dedupe(f"{PERK}\n{FOOTER}", limit=len(PERK))
+    assert dedup.dedupe(f"{OTHER}\n{FOOTER}") == f"{OTHER}\n{FOOTER}"
+    assert dedup.dedupe(PERK) == ""
@@ -0,0 +1,85 @@
+from src.money import PRICE_CONFIDENCE, MIN_CONFIDENCE, best_money, fill_value, find_money, parse_money, parse_number
+
+
+def test_recurring_price_is_not_a_perk_value():
+    money = best_money("Free for 12 months, then $29/month", page=True)
+    assert money.amount == 29
+    assert money.confidence == PRICE_CONFIDENCE < MIN_CONFIDENCE
+
+
+def test_fill_value_ignores_subscription_price():
+    fields = fill_value({"Value": "Not found"}, "Free for 12 months, then $29/month")
+    assert fields["Value"] == "Not found"
+
+
+def test_price_markers():
+    for text in ("€99 per year", "$49 monthly", "$10 / user", "$15/mo"):
+        assert find_money(text, page=True)[0].confidence == PRICE_CONFIDENCE
+
+
+def test_credits_next_to_a_price_win():
+    money = best_money("Get $5,000 in AWS credits, then $29 per month", page=True)
+    assert money.amount == 5000
+
+
+def test_parse_number_separators():
+    assert parse_number("1,000.50") == 1000.5
+    assert parse_number("1.000,50") == 1000.5
+    assert parse_number("1 000") == 1000
+    assert parse_number("1.500") == 1500
+    assert parse_number("2,5") == 2.5
+
+
+def test_european_amount():
+    money = best_money("€ 1.500 Guthaben")
+    assert (money.amount, money.currency) == (1500, "EUR")
+
+
+def test_suffixes_and_currency_words():
+    assert best_money("2k EUR").amount == 2000
+    assert best_money("10 million dollars").amount == 10_000_000
+
+
+def test_ranges():
+    money = best_money("$1,000 - $5,000")
+    assert (money.low, money.high) == (1000, 5000)
+    money = best_money("$1-5k")
+    assert (money.low, money.high) == (1000, 5000)
+    assert best_money("between €500 and €2,000").format() == "€500 - €2,000"
+
+
+def test_upper_bound():
+    money = best_money("up to $100,000 in credits")
+    assert money.upper_bound
+    assert money.format() == "up to $100,000"
+
+
+def test_credits_without_currency():
+    money = best_money("5,000 credits")
+    assert money.amount == 5000
+    assert money.currency is None
+    assert money.confidence >= MIN_CONFIDENCE
+
+
+def test_year_is_not_an_amount():
+    assert find_money("2024 credits") == []
+
+
+def test_percentages_are_not_money():
+    assert find_money("50% off for $ customers") == []
+
+
+def test_value_field_with_duration():
+    assert parse_money("$1,000 for 12 months").amount == 1000
+
+
+def test_page_amount_needs_perk_keyword():
+    assert best_money("We raised $20 million in our Series B", page=True).confidence < MIN_CONFIDENCE
+    assert best_money("Startups get $20,000 in credits", page=True).confidence >= MIN_CONFIDENCE
+
+
+def test_fill_value_keeps_llm_answer():
+    fields = fill_value({"Value": "50% off first year"}, "Save $5,000 with credits")
+    assert fields["Value"] == "50% off first year"
+    fields = fill_value({"Value": "Not found"}, "Save $5,000 with credits")
+    assert fields["Value"] == "$5,000"
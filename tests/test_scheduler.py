@@ -0,0 +1,64 @@
+from src.perk_record import PerkRecord
+from src.scheduler import (
+    BASE_INTERVAL_HOURS, MAX_BACKOFF_STEPS, MAX_INTERVAL_HOURS, MIN_INTERVAL_HOURS,
+    importance, interval_hours, next_due_at, select_due,
+)
+
+HOUR = 3600
+NOW = 1_000_000_000.0
+
+
+def test_base_interval():
+    assert interval_hours(None) == BASE_INTERVAL_HOURS
+    assert interval_hours({"unchanged_streak": 0}) == BASE_INTERVAL_HOURS
+
+
+def test_backoff_doubles_per_unchanged_scrape():
+    assert interval_hours({"unchanged_streak": 1}) == 2 * BASE_INTERVAL_HOURS
+    assert interval_hours({"unchanged_streak": 2}) == 4 * BASE_INTERVAL_HOURS
+
+
+def test_backoff_is_clamped():
+    capped = BASE_INTERVAL_HOURS * 2 ** MAX_BACKOFF_STEPS
+    assert interval_hours({"unchanged_streak": MAX_BACKOFF_STEPS + 10}) == min(capped, MAX_INTERVAL_HOURS)
+    assert interval_hours({"unchanged_streak": 100}) <= MAX_INTERVAL_HOURS
+
+
+def test_volatile_perks_are_revisited_sooner():
+    assert interval_hours({"change_count": 3}) == BASE_INTERVAL_HOURS / 2
+    assert interval_hours({"status_changes": 1}) == BASE_INTERVAL_HOURS / 2
+    assert interval_hours(None, record_importance=1.0) == BASE_INTERVAL_HOURS / 2
+
+
+def test_minimum_interval():
+    state = {"change_count": 5, "status_changes": 10}
+    assert interval_hours(state, record_importance=3.0) == MIN_INTERVAL_HOURS
+
+
+def test_next_due_at():
+    assert next_due_at(None) == 0.0
+    assert next_due_at({"last_scraped_at": None}) == 0.0
+    assert next_due_at({"last_scraped_at": NOW}) == NOW + BASE_INTERVAL_HOURS * HOUR
+
+
+def test_importance():
+    assert importance(PerkRecord("rec1", "A")) == 0.0
+    assert importance(PerkRecord("rec1", "A", priority="High")) == 1.0
+    assert importance(PerkRecord("rec1", "A", value=1_000)) == 0.5
+    assert importance(PerkRecord("rec1", "A", value="$10,000")) == 1.0
+    assert importance(PerkRecord("rec1", "A", priority=5, value=100_000)) == 3.0
+
+
+def test_select_due_order():
+    never = PerkRecord("rec_never", "Never")
+    overdue = PerkRecord("rec_overdue", "Overdue")
+    late = PerkRecord("rec_late", "Late")
+    fresh = PerkRecord("rec_fresh", "Fresh")
+    states = {
+        "rec_overdue": {"last_scraped_at": NOW - 3 * BASE_INTERVAL_HOURS * HOUR},
+        "rec_late": {"last_scraped_at": NOW - 2 * BASE_INTERVAL_HOURS * HOUR},
+        "rec_fresh": {"last_scraped_at": NOW - HOUR},
+    }
+    records = [fresh, late, overdue, never]
+    assert select_due(records, states, now=NOW) == [never, overdue, late]
+    assert select_due(records, states, now=NOW, max_perks=2) == [never, overdue]